@@ -0,0 +1 @@
+"""Benchmarks for fnOS Mock Server."""
@@ -0,0 +1,400 @@
+"""Microbenchmarks of the request hot path with a regression gate.
+
+在进程内测量热点函数的单次耗时（纳秒）：``parse_request``、``route_request``、
+``replace_reqid``、``load_json_response``、各 ``build_*_response`` 构建函数、
+``handle_message``、严格模式下的签名验证（``verify_signature`` 与
+``handle_message/signed``，与 ``handle_message`` 对比即为验证的开销），以及
+经由内存连接（``InMemoryConnection``，与真实传输相同的 ``serve_messages``
+循环）的完整请求往返。请求与响应覆盖三种规模：``ping``（小）、
+``appcgi.resmon.cpu``（中）、``appcgi.sac.entry.v1.appStoreList``（大）。
+
+每个用例先校准循环次数，使每轮至少运行 ``--min-time`` 秒，所有用例交替
+运行 ``--repeat`` 轮，取最小值作为结果（最不受调度噪声影响），同时记录中位数。
+
+每次运行还测量一个与项目代码无关的固定工作负载（``calibration``），各用例
+同时记录相对它的耗时（``relative``）。``compare`` 比较相对耗时，因此基线
+可以在一台机器上生成、在另一台（更快或更慢的）机器上比较；缺少校准数据的
+旧基线退回到比较绝对耗时。
+
+用法::
+
+    # 运行并保存基线
+    python -m benchmarks.bench_hotpath run --output benchmarks/baseline.json
+    # 与基线比较，任一用例变慢超过 25% 时以非零状态退出（变慢的用例会先重新测量）
+    python -m benchmarks.bench_hotpath compare benchmarks/baseline.json --threshold 0.25
+    # 比较两个已保存的结果
+    python -m benchmarks.bench_hotpath compare baseline.json current.json
+"""
+
+import argparse
+import asyncio
+import base64
+import fnmatch
+import hashlib
+import hmac
+import json
+import logging
+import platform
+import random
+import statistics
+import sys
+import time
+import timeit
+from typing import Any, Callable
+
+
+# 三种规模的请求类型
+SIZES = {
+    'small': 'ping',
+    'medium': 'appcgi.resmon.cpu',
+    'large': 'appcgi.sac.entry.v1.appStoreList',
+}
+
+# pyfnos 发送的帧在 JSON 前拼接 44 个字符的 base64 HMAC 签名
+SIGNATURE = 'x' * 43 + '='
+
+# 签名验证用例的会话密钥
+SESSION_SECRET = b's' * 32
+
+DEFAULT_THRESHOLD = 0.25
+
+# 判定为变慢的用例在失败前重新测量的次数（取各次中的最小值）
+CONFIRM_RUNS = 2
+
+# 校准用例的名称，不参与退化判定
+CALIBRATION = 'calibration'
+
+
+Timer = Callable[[int], float]
+
+
+def _calibrate(timer: Timer, min_time: float) -> int:
+    """Return a loop count that runs for at least ``min_time`` seconds."""
+    number = 1
+    while True:
+        elapsed = timer(number)
+        if elapsed >= min_time:
+            return number
+        number *= 2 if elapsed <= 0 else max(2, min(10, int(min_time / elapsed) + 1))
+
+
+def measure_all(timers: dict[str, Timer], repeat: int, min_time: float) -> dict[str, Any]:
+    """Time every case, interleaving the rounds of all cases.
+
+    各用例的每一轮交替运行，一段时间内的系统噪声（CPU 降频、其他进程）会
+    分散到所有用例上，而不是集中影响连续运行的几个用例。
+
+    Returns:
+        Per-call timings in nanoseconds keyed by case name
+    """
+    loops = {}
+    for name, timer in timers.items():
+        loops[name] = _calibrate(timer, min_time)
+    samples: dict[str, list[float]] = {name: [] for name in timers}
+    for _ in range(repeat):
+        for name, timer in timers.items():
+            samples[name].append(timer(loops[name]) / loops[name] * 1e9)
+    return {
+        name: {
+            'ns': round(min(per_call), 1),
+            'median_ns': round(statistics.median(per_call), 1),
+            'loops': loops[name],
+        }
+        for name, per_call in samples.items()
+    }
+
+
+def _sync_timer(func: Callable[[], Any]) -> Timer:
+    timer = timeit.Timer(func)
+    return timer.timeit
+
+
+def _frame(req: str, reqid: str = '0123456789abcdef') -> str:
+    """Build a request frame as pyfnos sends it (signature + JSON)."""
+    if req == 'ping':
+        return '{"req":"ping"}'
+    return SIGNATURE + json.dumps({'req': req, 'reqid': reqid}, separators=(',', ':'))
+
+
+def _signed_frame(req: str, reqid: str = '0123456789abcdef') -> str:
+    """Build a request frame with a valid signature for ``SESSION_SECRET``."""
+    body = json.dumps({'req': req, 'reqid': reqid}, separators=(',', ':'))
+    digest = hmac.new(SESSION_SECRET, body.encode('utf-8'), hashlib.sha256).digest()
+    return base64.b64encode(digest).decode('utf-8') + body
+
+
+def _calibration_workload() -> Callable[[], Any]:
+    """Build a fixed workload that exercises the interpreter like the hot path.
+
+    标准库 JSON 的序列化与解析、字典与字符串操作，只依赖解释器与机器，
+    不随项目代码变化。
+    """
+    rng = random.Random(0)
+    document = {
+        f'key{i}': {'id': i, 'name': f'item-{rng.random():.6f}', 'tags': ['a', 'b'] * 3}
+        for i in range(40)
+    }
+
+    def workload() -> None:
+        decoded = json.loads(json.dumps(document, separators=(',', ':')))
+        decoded['reqid'] = 'fedcba9876543210'
+        sorted(k.upper() for k in decoded)
+    return workload
+
+
+def build_cases() -> dict[str, Timer]:
+    """Build the synchronous benchmark cases."""
+    from server import responses
+    from server import signatures
+    from server.handlers import handle_message, parse_request, route_request
+    from server.responses import (
+        build_error_response,
+        build_get_hostname_response,
+        build_get_rsa_pub_response,
+        build_login_response,
+        build_ping_response,
+        get_response_file_path,
+        load_json_response,
+        replace_reqid,
+    )
+
+    cases: dict[str, Timer] = {CALIBRATION: _sync_timer(_calibration_workload())}
+    for size, req in SIZES.items():
+        frame = _frame(req)
+        request = parse_request(frame)
+        cases[f'parse_request/{size}'] = _sync_timer(lambda f=frame: parse_request(f))
+        cases[f'route_request/{size}'] = _sync_timer(lambda r=request: route_request(r))
+        cases[f'handle_message/{size}'] = _sync_timer(lambda f=frame: handle_message(f, 1))
+        if req == 'ping':
+            continue
+
+        # 严格模式：验证器只在各自的用例内启用，不影响其他用例
+        verifier = signatures.SignatureVerifier()
+        verifier.establish(1, SESSION_SECRET)
+        signed = _signed_frame(req)
+        cases[f'verify_signature/{size}'] = _sync_timer(
+            lambda f=signed, v=verifier: v.verify(f, 1)
+        )
+
+        def handle_signed(f: str = signed, v: signatures.SignatureVerifier = verifier) -> None:
+            signatures._verifier = v
+            try:
+                handle_message(f, 1)
+            finally:
+                signatures._verifier = None
+        cases[f'handle_message/signed/{size}'] = _sync_timer(handle_signed)
+
+        path = get_response_file_path(req)
+        fixture = load_json_response(path)
+        cases[f'replace_reqid/{size}'] = _sync_timer(
+            lambda r=fixture: replace_reqid(r, 'fedcba9876543210')
+        )
+        cases[f'load_json_response/cached/{size}'] = _sync_timer(
+            lambda p=path: load_json_response(p)
+        )
+
+        def load_cold(p: str = path) -> None:
+            responses._response_cache.pop(p, None)
+            load_json_response(p)
+        cases[f'load_json_response/cold/{size}'] = _sync_timer(load_cold)
+
+    cases['build_ping_response'] = _sync_timer(build_ping_response)
+    cases['build_error_response'] = _sync_timer(lambda: build_error_response('1', 'Error'))
+    cases['build_get_hostname_response'] = _sync_timer(lambda: build_get_hostname_response('1'))
+    cases['build_get_rsa_pub_response'] = _sync_timer(lambda: build_get_rsa_pub_response('1'))
+    cases['build_login_response'] = _sync_timer(lambda: build_login_response('1'))
+    return cases
+
+
+def run_benchmarks(pattern: str, repeat: int, min_time: float,
+                   names: set[str] | None = None) -> dict[str, Any]:
+    """Run every case matching ``pattern`` (and in ``names`` when given)."""
+    from server import codec
+    from server.pytest_plugin import InMemoryConnection
+    from server.responses import preload_responses
+
+    preload_responses()
+    timers = build_cases()
+
+    # 经由内存连接的完整往返（serve_messages、写任务、队列）
+    loop = asyncio.new_event_loop()
+    connection = loop.run_until_complete(_connect(InMemoryConnection))
+    for size, req in SIZES.items():
+        def timer(number: int, frame: str = _frame(req)) -> float:
+            return loop.run_until_complete(_round_trips(connection, frame, number))
+        timers[f'round_trip/{size}'] = timer
+
+    # 校准用例总是运行
+    timers = {
+        name: t for name, t in timers.items()
+        if name == CALIBRATION
+        or (fnmatch.fnmatchcase(name, pattern) and (names is None or name in names))
+    }
+    try:
+        results = measure_all(timers, repeat, min_time)
+    finally:
+        loop.run_until_complete(connection.close())
+        loop.close()
+    calibration = results[CALIBRATION]['ns']
+    for result in results.values():
+        result['relative'] = round(result['ns'] / calibration, 4)
+
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'codec': codec.name,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': results,
+    }
+
+
+async def _connect(factory: Callable[[], Any]) -> Any:
+    connection = factory()
+    await asyncio.sleep(0)
+    return connection
+
+
+async def _round_trips(connection: Any, frame: str, number: int) -> float:
+    """Send ``number`` requests one after another and return the elapsed time."""
+    start = time.perf_counter()
+    for _ in range(number):
+        await connection.send(frame)
+        await connection.recv()
+    return time.perf_counter() - start
+
+
+def _calibrated(baseline: dict[str, Any], current: dict[str, Any]) -> bool:
+    """Whether both results carry calibration-relative timings."""
+    return CALIBRATION in baseline['results'] and CALIBRATION in current['results']
+
+
+def _change(base: dict[str, Any], result: dict[str, Any], calibrated: bool) -> float:
+    """Relative slowdown of one case (calibration-relative when available)."""
+    key = 'relative' if calibrated else 'ns'
+    return result[key] / base[key] - 1
+
+
+def regressed(baseline: dict[str, Any], current: dict[str, Any], threshold: float) -> list[str]:
+    """Return the cases more than ``threshold`` slower than the baseline."""
+    calibrated = _calibrated(baseline, current)
+    return [
+        name for name, result in current['results'].items()
+        if name != CALIBRATION and name in baseline['results']
+        and _change(baseline['results'][name], result, calibrated) > threshold
+    ]
+
+
+def confirm(baseline: dict[str, Any], current: dict[str, Any], threshold: float,
+            args: argparse.Namespace) -> None:
+    """Re-measure regressed cases, keeping the fastest result of each.
+
+    单次测量中的变慢可能来自系统噪声；真正的退化在重新测量后依然存在。
+    """
+    for _ in range(CONFIRM_RUNS):
+        names = set(regressed(baseline, current, threshold))
+        if not names:
+            return
+        print(f'Re-measuring {len(names)} slower case(s)...', file=sys.stderr)
+        rerun = run_benchmarks(args.filter, args.repeat, args.min_time, names)
+        for name in names:
+            # 重新测量的结果相对本次运行的校准用例，与首次测量可以直接比较
+            result = rerun['results'][name]
+            if result['relative'] < current['results'][name]['relative']:
+                current['results'][name] = result
+
+
+def compare(baseline: dict[str, Any], current: dict[str, Any], threshold: float) -> list[str]:
+    """Print a comparison table and return the regressed cases."""
+    if baseline['meta'].get('codec') != current['meta'].get('codec'):
+        print(f'warning: baseline codec {baseline["meta"].get("codec")} differs from '
+              f'{current["meta"].get("codec")}', file=sys.stderr)
+
+    calibrated = _calibrated(baseline, current)
+    if calibrated:
+        speed = current['results'][CALIBRATION]['ns'] / baseline['results'][CALIBRATION]['ns']
+        print(f'calibration: this machine runs the reference workload {speed:.2f}x '
+              'the baseline time; changes are relative to it', file=sys.stderr)
+    else:
+        print('warning: no calibration case, comparing absolute timings', file=sys.stderr)
+
+    regressions = []
+    print(f'{"case":<42} {"baseline":>12} {"current":>12} {"change":>8}')
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if name == CALIBRATION:
+            continue
+        if base is None:
+            print(f'{name:<42} {"-":>12} {result["ns"]:>12.1f} {"new":>8}')
+            continue
+        change = _change(base, result, calibrated)
+        status = ''
+        if change > threshold:
+            status = '  REGRESSION'
+            regressions.append(name)
+        print(f'{name:<42} {base["ns"]:>12.1f} {result["ns"]:>12.1f} {change:>+8.1%}{status}')
+    return regressions
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Hot path microbenchmarks')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    def add_run_options(sub: argparse.ArgumentParser) -> None:
+        sub.add_argument('--filter', default='*',
+                         help='Only run cases matching this wildcard (default: all)')
+        sub.add_argument('--repeat', type=int, default=15,
+                         help='Timing rounds per case (default: 15)')
+        sub.add_argument('--min-time', type=float, default=0.02,
+                         help='Minimum seconds per round (default: 0.02)')
+
+    run = subparsers.add_parser('run', help='Run the benchmarks')
+    add_run_options(run)
+    run.add_argument('--output', help='Save the results to this JSON file')
+
+    cmp = subparsers.add_parser('compare', help='Fail when slower than a baseline')
+    cmp.add_argument('baseline', help='Baseline JSON file')
+    cmp.add_argument('current', nargs='?',
+                     help='Saved results to compare (default: run the benchmarks now)')
+    cmp.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                     help='Allowed slowdown as a fraction (default: 0.25)')
+    add_run_options(cmp)
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Main entry point."""
+    args = parse_args()
+    # 热点路径上的日志不应计入耗时
+    logging.disable(logging.WARNING)
+
+    if args.command == 'run':
+        results = run_benchmarks(args.filter, args.repeat, args.min_time)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+                f.write('\n')
+        else:
+            print(json.dumps(results, indent=2))
+        return
+
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    if args.current:
+        with open(args.current, 'r', encoding='utf-8') as f:
+            current = json.load(f)
+    else:
+        current = run_benchmarks(args.filter, args.repeat, args.min_time)
+        confirm(baseline, current, args.threshold, args)
+
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print(f'{len(regressions)} case(s) regressed by more than {args.threshold:.0%}: '
+              f'{", ".join(regressions)}', file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+"""Measure server memory with many idle WebSocket connections.
+
+启动一个 mock 服务器子进程，分批建立 ``--connections`` 指定数量（如 10000、
+50000）的空闲连接，报告服务器 RSS 增量与单连接内存，并可验证空闲超时回收。
+
+客户端只完成 WebSocket 握手后保持 TCP 连接，不创建完整的 WebSocket 客户端
+对象，以便单个进程能持有数万个连接；为突破单个目的地址的临时端口数量限制，
+连接轮流使用 127.0.0.1~127.0.0.N 作为源地址。需要足够的文件描述符上限
+（``ulimit -n``），脚本会把软限制提升到硬限制。
+
+用法::
+
+    python -m benchmarks.bench_idle --connections 10000 50000 --transport raw
+    python -m benchmarks.bench_idle --connections 10000 --idle-timeout 30
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import urllib.request
+
+from benchmarks.bench_transport import ROOT, _free_port, _rss_kib
+
+
+# 每个源地址最多使用的连接数（临时端口范围约 28000 个）
+CONNECTIONS_PER_SOURCE = 20000
+
+# 空闲回收后等待服务器释放连接的时间（秒）
+CLOSE_GRACE = 12.0
+
+
+def _raise_fd_limit() -> int:
+    """Raise the soft file descriptor limit to the hard limit and return it."""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft != hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    return hard
+
+
+def start_server(transport: str, port: int, *extra: str) -> subprocess.Popen:
+    """Start a mock server subprocess and wait until /health reports ready."""
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'server.main', '--host', '127.0.0.1', '-p', str(port),
+         '--transport', transport, '--log-level', 'WARNING', '--lag-interval', '0', *extra],
+        cwd=ROOT,
+        preexec_fn=_raise_fd_limit,
+    )
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        try:
+            _get_json(port, '/health')
+            return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError(f'{transport} server did not start on port {port}')
+
+
+def _get_json(port: int, path: str, method: str = 'GET') -> dict:
+    """Call a JSON admin endpoint of the server (``POST`` for state-changing ones)."""
+    request = urllib.request.Request(
+        f'http://127.0.0.1:{port}{path}', data=b'' if method == 'POST' else None, method=method
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return json.loads(response.read())
+
+
+async def open_idle(
+    port: int, source: str = '127.0.0.1'
+) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    """Open one WebSocket connection and keep it idle.
+
+    Raises:
+        RuntimeError: If the server rejects the handshake
+    """
+    reader, writer = await asyncio.open_connection('127.0.0.1', port, local_addr=(source, 0))
+    key = base64.b64encode(os.urandom(16)).decode()
+    writer.write((
+        'GET /websocket HTTP/1.1\r\n'
+        f'Host: 127.0.0.1:{port}\r\n'
+        'Upgrade: websocket\r\n'
+        'Connection: Upgrade\r\n'
+        f'Sec-WebSocket-Key: {key}\r\n'
+        'Sec-WebSocket-Version: 13\r\n\r\n'
+    ).encode())
+    status = await reader.readuntil(b'\r\n\r\n')
+    if not status.startswith(b'HTTP/1.1 101'):
+        writer.transport.abort()
+        raise RuntimeError(f'Handshake failed: {status[:40]!r}')
+    return reader, writer
+
+
+async def open_connections(
+    port: int, count: int, batch: int
+) -> list[tuple[asyncio.StreamReader, asyncio.StreamWriter]]:
+    """Open ``count`` idle connections, ``batch`` handshakes at a time."""
+    connections: list[tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+    for start in range(0, count, batch):
+        sources = [
+            f'127.0.0.{1 + index // CONNECTIONS_PER_SOURCE}'
+            for index in range(start, min(start + batch, count))
+        ]
+        connections.extend(await asyncio.gather(*(open_idle(port, s) for s in sources)))
+    return connections
+
+
+async def run(transport: str, count: int, args: argparse.Namespace) -> dict:
+    """Measure one transport at one connection count."""
+    port = _free_port()
+    proc = start_server(transport, port, '--idle-timeout', str(args.idle_timeout))
+    writers: list[asyncio.StreamWriter] = []
+    try:
+        before = _rss_kib(proc.pid)
+        start = time.perf_counter()
+        writers = [w for _, w in await open_connections(port, count, args.batch)]
+        connect_seconds = time.perf_counter() - start
+        # 等待服务器完成所有握手
+        await asyncio.sleep(1.0)
+        after = _rss_kib(proc.pid)
+        report = _get_json(port, '/debug/connections?limit=0')
+
+        result = {
+            'transport': transport,
+            'connections': report['connections'],
+            'connect_per_sec': round(count / connect_seconds, 1),
+            'rss_before_kib': before,
+            'rss_after_kib': after,
+            'kib_per_connection': round((after - before) / count, 2),
+        }
+        if args.idle_timeout:
+            # 客户端不回应关闭帧，服务器在关闭超时（10 秒）后才释放连接
+            await asyncio.sleep(args.idle_timeout + CLOSE_GRACE)
+            remaining = _get_json(port, '/debug/connections?limit=0')['connections']
+            result['after_idle_timeout'] = remaining
+        return result
+    finally:
+        for writer in writers:
+            writer.transport.abort()
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Measure memory of idle connections')
+    parser.add_argument('--connections', type=int, nargs='+', default=[10000, 50000],
+                        help='Idle connection counts to measure (default: 10000 50000)')
+    parser.add_argument('--transport', nargs='+', default=['raw'],
+                        choices=['fastapi', 'raw'], help='Transports to measure (default: raw)')
+    parser.add_argument('--batch', type=int, default=500,
+                        help='Concurrent handshakes (default: 500)')
+    parser.add_argument('--idle-timeout', type=float, default=0,
+                        help='Server idle timeout, longer than the time to open all '
+                             'connections; also checks that connections are reaped')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Main entry point."""
+    args = parse_args()
+    limit = _raise_fd_limit()
+    results = []
+    for transport in args.transport:
+        for count in args.connections:
+            if count + 100 > limit:
+                print(f'Skipping {count} connections: file descriptor limit is {limit}',
+                      file=sys.stderr)
+                continue
+            results.append(asyncio.run(run(transport, count, args)))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f'{"transport":<10} {"conns":>8} {"conn/s":>10} {"RSS KiB":>10} {"KiB/conn":>10}')
+    for r in results:
+        print(f'{r["transport"]:<10} {r["connections"]:>8} {r["connect_per_sec"]:>10.1f} '
+              f'{r["rss_after_kib"]:>10} {r["kib_per_connection"]:>10.2f}'
+              + (f'  (after idle timeout: {r["after_idle_timeout"]})'
+                 if 'after_idle_timeout' in r else ''))
+
+
+if __name__ == '__main__':
+    os.chdir(ROOT)
+    main()
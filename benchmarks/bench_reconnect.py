@@ -0,0 +1,170 @@
+"""Simulate a reconnect storm against the mock server.
+
+建立 ``--clients`` 个空闲连接后调用 ``POST /debug/faults/restart`` 模拟一次 NAS
+重启：服务器断开所有连接，并在 ``--refuse`` 秒内拒绝新连接。每个客户端在
+断开后按“指数退避 + 全抖动”重连，直到成功。报告全部客户端恢复所需的时间、
+重连尝试次数与服务器统计的峰值接入速率。
+
+用法::
+
+    python -m benchmarks.bench_reconnect --clients 2000 --refuse 2 --transport raw
+    python -m benchmarks.bench_reconnect --clients 2000 --no-jitter
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+from benchmarks.bench_idle import (
+    CONNECTIONS_PER_SOURCE,
+    _get_json,
+    _raise_fd_limit,
+    open_idle,
+    open_connections,
+    start_server,
+)
+from benchmarks.bench_transport import ROOT, _free_port
+
+
+class StormStats:
+    """Client-side counters of one storm."""
+
+    def __init__(self) -> None:
+        self.attempts = 0
+        self.failures = 0
+        self.recovery: list[float] = []
+
+
+async def _reconnect_client(
+    port: int,
+    source: str,
+    reader: asyncio.StreamReader,
+    args: argparse.Namespace,
+    stats: StormStats,
+    rng: random.Random,
+) -> None:
+    """Wait until the connection drops, then reconnect with backoff."""
+    try:
+        # 服务器不会主动发送数据，收到任何数据（关闭帧）或 EOF 都视为断开
+        await reader.read(1024)
+    except OSError:
+        pass
+    dropped = time.perf_counter()
+
+    attempt = 0
+    while True:
+        delay = min(args.max_backoff, args.backoff * 2 ** attempt)
+        await asyncio.sleep(rng.uniform(0, delay) if args.jitter else delay)
+        attempt += 1
+        stats.attempts += 1
+        try:
+            _, writer = await open_idle(port, source)
+        except (OSError, RuntimeError, asyncio.IncompleteReadError):
+            stats.failures += 1
+            continue
+        stats.recovery.append(time.perf_counter() - dropped)
+        writer.transport.abort()
+        return
+
+
+async def run(transport: str, args: argparse.Namespace) -> dict:
+    """Run one storm against one transport."""
+    port = _free_port()
+    proc = start_server(transport, port)
+    connections: list[tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+    try:
+        connections = await open_connections(port, args.clients, 500)
+        stats = StormStats()
+        rng = random.Random(0)
+        clients = [
+            asyncio.create_task(_reconnect_client(
+                port,
+                f'127.0.0.{1 + index // CONNECTIONS_PER_SOURCE}',
+                reader,
+                args,
+                stats,
+                rng,
+            ))
+            for index, (reader, _) in enumerate(connections)
+        ]
+        await asyncio.sleep(0.5)
+
+        start = time.perf_counter()
+        restart = await asyncio.to_thread(
+            _get_json, port, f'/debug/faults/restart?drop=1&refuse={args.refuse}', 'POST'
+        )
+        await asyncio.wait_for(asyncio.gather(*clients), args.timeout)
+        elapsed = time.perf_counter() - start
+        faults = await asyncio.to_thread(_get_json, port, '/debug/faults')
+
+        recovery = sorted(stats.recovery)
+        return {
+            'transport': transport,
+            'clients': args.clients,
+            'dropped': restart['dropped'],
+            'recovered_seconds': round(elapsed, 2),
+            'attempts': stats.attempts,
+            'failed_attempts': stats.failures,
+            'recovery_p50': round(statistics.median(recovery), 3),
+            'recovery_p99': round(recovery[int(len(recovery) * 0.99) - 1], 3),
+            'server_refused': faults['counters']['refused'],
+            'peak_connects_per_sec': faults['connects']['peakPerSec'],
+            'peak_accepts_per_sec': faults['accepts']['peakPerSec'],
+        }
+    finally:
+        for _, writer in connections:
+            writer.transport.abort()
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Simulate a reconnect storm')
+    parser.add_argument('--clients', type=int, default=2000,
+                        help='Connected clients (default: 2000)')
+    parser.add_argument('--transport', nargs='+', default=['raw'],
+                        choices=['fastapi', 'raw'], help='Transports to measure (default: raw)')
+    parser.add_argument('--refuse', type=float, default=2.0,
+                        help='Seconds the restarted server refuses connections (default: 2)')
+    parser.add_argument('--backoff', type=float, default=0.1,
+                        help='Initial reconnect backoff in seconds (default: 0.1)')
+    parser.add_argument('--max-backoff', type=float, default=5.0,
+                        help='Maximum reconnect backoff in seconds (default: 5)')
+    parser.add_argument('--no-jitter', dest='jitter', action='store_false',
+                        help='Retry at exactly the backoff delay (synchronized clients)')
+    parser.add_argument('--timeout', type=float, default=120.0,
+                        help='Give up after this many seconds (default: 120)')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Main entry point."""
+    args = parse_args()
+    limit = _raise_fd_limit()
+    if 2 * args.clients + 100 > limit:
+        sys.exit(f'{args.clients} clients need more file descriptors than {limit}')
+    results = [asyncio.run(run(transport, args)) for transport in args.transport]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    for r in results:
+        print(f'{r["transport"]}: {r["dropped"]} dropped, all reconnected in '
+              f'{r["recovered_seconds"]}s ({r["attempts"]} attempts, '
+              f'{r["failed_attempts"]} failed, {r["server_refused"]} refused by server)')
+        print(f'  recovery p50 {r["recovery_p50"]}s, p99 {r["recovery_p99"]}s; '
+              f'peak {r["peak_connects_per_sec"]} connects/s, '
+              f'{r["peak_accepts_per_sec"]} accepts/s')
+
+
+if __name__ == '__main__':
+    os.chdir(ROOT)
+    main()
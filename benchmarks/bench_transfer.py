@@ -0,0 +1,127 @@
+"""Measure the throughput of the file download/upload endpoints.
+
+启动一个带 ``--transfer-port`` 的 mock 服务器子进程，由 ``--clients`` 个并发
+客户端各下载、上传 ``--size`` 字节，报告总吞吐量（MB/s）。上传的内容由
+客户端循环发送同一个缓冲区生成，服务器端丢弃。
+
+用法::
+
+    python -m benchmarks.bench_transfer --size 4G --clients 4
+"""
+
+import argparse
+import asyncio
+import json
+import socket
+import subprocess
+import sys
+import time
+
+from benchmarks.bench_transport import ROOT, _free_port
+from server.transfers import parse_size
+
+
+# 客户端每次读取/写入的字节数
+CHUNK = 1024 * 1024
+
+
+def start_server(port: int, transfer_port: int) -> subprocess.Popen:
+    """Start a mock server subprocess and wait until the transfer port accepts connections."""
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'server.main', '--host', '127.0.0.1', '-p', str(port),
+         '--transfer-port', str(transfer_port), '--log-level', 'WARNING'],
+        cwd=ROOT,
+    )
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', transfer_port), timeout=0.2):
+                return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError('Server did not start')
+
+
+async def _read_head(reader: asyncio.StreamReader) -> None:
+    """Read a response head and fail unless the status is 2xx."""
+    head = await reader.readuntil(b'\r\n\r\n')
+    status = int(head.split(b' ', 2)[1])
+    if not 200 <= status < 300:
+        raise RuntimeError(f'Unexpected HTTP status {status}')
+
+
+async def download(port: int, size: int) -> None:
+    """Download ``size`` bytes and discard them."""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port, limit=CHUNK)
+    writer.write(f'GET /files/bench.bin?size={size} HTTP/1.1\r\nHost: bench\r\n'
+                 'Connection: close\r\n\r\n'.encode())
+    await _read_head(reader)
+    remaining = size
+    while remaining:
+        chunk = await reader.read(min(CHUNK, remaining))
+        if not chunk:
+            raise RuntimeError(f'Download ended {remaining} bytes early')
+        remaining -= len(chunk)
+    writer.close()
+
+
+async def upload(port: int, size: int) -> None:
+    """Upload ``size`` bytes."""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f'PUT /files/bench.bin HTTP/1.1\r\nHost: bench\r\nContent-Length: {size}\r\n'
+                 'Connection: close\r\n\r\n'.encode())
+    buffer = memoryview(bytes(CHUNK))
+    remaining = size
+    while remaining:
+        n = min(CHUNK, remaining)
+        writer.write(buffer[:n])
+        await writer.drain()
+        remaining -= n
+    await _read_head(reader)
+    writer.close()
+
+
+async def measure(transfer: str, port: int, size: int, clients: int) -> float:
+    """Run ``clients`` concurrent transfers and return the total MB/s."""
+    func = download if transfer == 'download' else upload
+    start = time.perf_counter()
+    await asyncio.gather(*(func(port, size) for _ in range(clients)))
+    return size * clients / (time.perf_counter() - start) / 1e6
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Measure transfer endpoint throughput')
+    parser.add_argument('--size', type=str, default='1G',
+                        help='Bytes per transfer, e.g. 4G (default: 1G)')
+    parser.add_argument('--clients', type=int, default=1,
+                        help='Concurrent transfers (default: 1)')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Main entry point."""
+    args = parse_args()
+    size = parse_size(args.size)
+    transfer_port = _free_port()
+    proc = start_server(_free_port(), transfer_port)
+    try:
+        results = {
+            transfer: round(asyncio.run(measure(transfer, transfer_port, size, args.clients)), 1)
+            for transfer in ('download', 'upload')
+        }
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for transfer, mbps in results.items():
+        print(f'{transfer:<10} {args.clients} x {args.size}: {mbps:>10.1f} MB/s')
+
+
+if __name__ == '__main__':
+    main()
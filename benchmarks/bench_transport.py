@@ -0,0 +1,164 @@
+"""Compare the FastAPI and raw WebSocket transports.
+
+对每种传输分别启动一个 mock 服务器子进程，测量：
+
+- 吞吐量：多个客户端并发发送请求（每个客户端保持 ``--window`` 个在途请求），
+  统计每秒处理的消息数；
+- 单连接内存：建立 ``--idle-connections`` 个空闲连接前后服务器进程的 RSS 差值。
+
+用法::
+
+    python -m benchmarks.bench_transport --messages 20000 --clients 8
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from websockets.asyncio.client import connect
+
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _free_port() -> int:
+    """Return a free TCP port on localhost."""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _rss_kib(pid: int) -> int:
+    """Return resident set size of a process in KiB (Linux only)."""
+    try:
+        with open(f'/proc/{pid}/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def start_server(transport: str, port: int) -> subprocess.Popen:
+    """Start a mock server subprocess and wait until it accepts connections."""
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'server.main', '--host', '127.0.0.1', '-p', str(port),
+         '--transport', transport, '--log-level', 'WARNING'],
+        cwd=ROOT,
+    )
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.2):
+                return proc
+        except OSError:
+            time.sleep(0.05)
+    proc.kill()
+    raise RuntimeError(f'{transport} server did not start on port {port}')
+
+
+async def _client(uri: str, count: int, window: int, req: str) -> None:
+    """Send ``count`` requests keeping ``window`` of them in flight."""
+    async with connect(uri, max_size=None) as ws:
+        sent = 0
+        received = 0
+        while received < count:
+            while sent < count and sent - received < window:
+                await ws.send(json.dumps({'req': req, 'reqid': str(sent)}))
+                sent += 1
+            await ws.recv()
+            received += 1
+
+
+async def measure_throughput(uri: str, messages: int, clients: int, window: int,
+                             req: str) -> float:
+    """Return processed messages per second."""
+    per_client = messages // clients
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(uri, per_client, window, req) for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+    return per_client * clients / elapsed
+
+
+async def measure_connection_memory(uri: str, pid: int, connections: int) -> float:
+    """Return server RSS growth per idle connection in KiB."""
+    before = _rss_kib(pid)
+    sockets = []
+    try:
+        for _ in range(connections):
+            sockets.append(await connect(uri, ping_interval=None))
+        # 等待服务器完成所有握手
+        await asyncio.sleep(0.5)
+        after = _rss_kib(pid)
+    finally:
+        await asyncio.gather(*(ws.close() for ws in sockets), return_exceptions=True)
+    return (after - before) / connections if connections else 0.0
+
+
+async def run_transport(transport: str, args: argparse.Namespace) -> dict:
+    """Benchmark one transport."""
+    port = _free_port()
+    proc = start_server(transport, port)
+    uri = f'ws://127.0.0.1:{port}/websocket?type=main'
+    try:
+        # 预热：加载响应文件缓存
+        await measure_throughput(uri, args.clients * 10, args.clients, args.window, args.req)
+        msgs_per_sec = await measure_throughput(
+            uri, args.messages, args.clients, args.window, args.req
+        )
+        per_conn_kib = await measure_connection_memory(uri, proc.pid, args.idle_connections)
+        return {
+            'transport': transport,
+            'msgs_per_sec': round(msgs_per_sec, 1),
+            'kib_per_connection': round(per_conn_kib, 2),
+            'rss_kib': _rss_kib(proc.pid),
+        }
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Compare fastapi and raw transports')
+    parser.add_argument('--messages', type=int, default=20000,
+                        help='Total requests per transport (default: 20000)')
+    parser.add_argument('--clients', type=int, default=8,
+                        help='Concurrent client connections (default: 8)')
+    parser.add_argument('--window', type=int, default=16,
+                        help='In-flight requests per client (default: 16)')
+    parser.add_argument('--idle-connections', type=int, default=500,
+                        help='Idle connections for the memory measurement (default: 500)')
+    parser.add_argument('--req', type=str, default='appcgi.resmon.cpu',
+                        help='Request type to send (default: appcgi.resmon.cpu)')
+    parser.add_argument('--transports', nargs='+', default=['fastapi', 'raw'],
+                        choices=['fastapi', 'raw'], help='Transports to benchmark')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Main entry point."""
+    args = parse_args()
+    results = [asyncio.run(run_transport(t, args)) for t in args.transports]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f'{"transport":<10} {"msgs/sec":>12} {"KiB/conn":>10} {"RSS KiB":>10}')
+    for r in results:
+        print(f'{r["transport"]:<10} {r["msgs_per_sec"]:>12.1f} '
+              f'{r["kib_per_connection"]:>10.2f} {r["rss_kib"]:>10}')
+
+
+if __name__ == '__main__':
+    os.chdir(ROOT)
+    main()
@@ -0,0 +1,225 @@
+"""Sampled, asynchronous access log for fnOS Mock Server.
+
+每个请求可以生成一条紧凑的访问记录（JSON Lines）。请求处理路径上只做采样
+判断并把记录元组放入队列，格式化与写入由后台线程批量完成，因此访问日志
+不会阻塞事件循环；未启用时处理路径上只有一次 ``None`` 判断。
+
+采样率按 ``req`` 配置，支持通配符，例如 ``"ping=0,user.*=0.1,*=1"``。
+"""
+
+import atexit
+import fnmatch
+import functools
+import json
+import logging
+import queue
+import random
+import sys
+import threading
+import time
+from typing import TextIO
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_QUEUE_SIZE = 65536
+
+# 后台线程单次最多合并写入的记录数
+WRITE_BATCH = 1024
+
+# 缓存采样率的 req 数（客户端可以发送任意 req，缓存需有上限）
+RATE_CACHE_SIZE = 1024
+
+_STOP = object()
+
+
+def parse_sample_rates(spec: str | None) -> dict[str, float]:
+    """Parse a per-req sampling spec.
+
+    Args:
+        spec: Comma separated ``pattern=rate`` pairs, a bare rate applies to ``*``
+
+    Returns:
+        Pattern to sampling rate (0-1)
+
+    Raises:
+        ValueError: If a rate is not a number in [0, 1]
+    """
+    rates: dict[str, float] = {}
+    for part in (spec or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        pattern, sep, value = part.rpartition('=')
+        if not sep:
+            pattern = '*'
+        rate = float(value)
+        if not 0.0 <= rate <= 1.0:
+            raise ValueError(f'Sampling rate must be between 0 and 1: {part}')
+        rates[pattern.strip() or '*'] = rate
+    return rates
+
+
+class AccessLog:
+    """Queue-backed access log with per-req sampling."""
+
+    def __init__(
+        self,
+        stream: TextIO,
+        rates: dict[str, float] | None = None,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        close_stream: bool = False,
+    ) -> None:
+        """Create the access log and start its writer thread.
+
+        Args:
+            stream: Output stream (JSON lines)
+            rates: Pattern to sampling rate; unmatched requests use ``*`` (default 1)
+            queue_size: Maximum queued records before records are dropped
+            close_stream: Close ``stream`` when the writer thread stops
+        """
+        self._stream = stream
+        self._close_stream = close_stream
+        self._patterns = dict(rates or {})
+        self._default_rate = self._patterns.pop('*', 1.0)
+        # 每种 req 的采样率在首次出现时解析，缓存最近使用的 RATE_CACHE_SIZE 种
+        self.rate_for = functools.lru_cache(maxsize=RATE_CACHE_SIZE)(self._match_rate)
+        self._queue: queue.Queue = queue.Queue(queue_size)
+        self._random = random.random
+        self.written = 0
+        self.dropped = 0
+
+        self._writer = threading.Thread(target=self._run, name='access-log', daemon=True)
+        self._writer.start()
+
+    def _match_rate(self, req: str) -> float:
+        """Return the sampling rate of a request type (see ``rate_for``)."""
+        for pattern, value in self._patterns.items():
+            if fnmatch.fnmatchcase(req, pattern):
+                return value
+        return self._default_rate
+
+    def record(
+        self,
+        client_id: int,
+        device_id: str | None,
+        req: str | None,
+        reqid: str | None,
+        result: str | None,
+        bytes_in: int,
+        bytes_out: int,
+        start: float,
+    ) -> None:
+        """Sample and enqueue one access record.
+
+        Args:
+            client_id: Connection identifier
+            device_id: Emulated device ID
+            req: Request type
+            reqid: Request ID
+            result: ``result`` field of the response
+            bytes_in: Request frame length
+            bytes_out: Response frame length
+            start: ``time.perf_counter()`` when the request was received
+        """
+        rate = self.rate_for(req or '')
+        if rate < 1.0 and (rate <= 0.0 or self._random() >= rate):
+            return
+
+        duration = time.perf_counter() - start
+        try:
+            self._queue.put_nowait((
+                time.time(), client_id, device_id, req, reqid, result,
+                bytes_in, bytes_out, duration,
+            ))
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        """Drain the queue and write JSON lines in batches."""
+        get = self._queue.get
+        get_nowait = self._queue.get_nowait
+        while True:
+            items = [get()]
+            try:
+                while len(items) < WRITE_BATCH:
+                    items.append(get_nowait())
+            except queue.Empty:
+                pass
+
+            stop = False
+            lines = []
+            for item in items:
+                if item is _STOP:
+                    stop = True
+                    continue
+                ts, client_id, device_id, req, reqid, result, bytes_in, bytes_out, duration = item
+                lines.append(json.dumps({
+                    'ts': round(ts, 6),
+                    'client': client_id,
+                    'device': device_id,
+                    'req': req,
+                    'reqid': reqid,
+                    'result': result,
+                    'in': bytes_in,
+                    'out': bytes_out,
+                    'us': int(duration * 1_000_000),
+                }, ensure_ascii=False, separators=(',', ':')))
+
+            if lines:
+                try:
+                    self._stream.write('\n'.join(lines) + '\n')
+                    self._stream.flush()
+                    self.written += len(lines)
+                except (OSError, ValueError) as e:
+                    logger.error(f'Error writing access log: {e}')
+            if stop:
+                if self._close_stream:
+                    self._stream.close()
+                return
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Flush pending records and stop the writer thread."""
+        if not self._writer.is_alive():
+            return
+        self._queue.put(_STOP)
+        self._writer.join(timeout)
+        if self.dropped:
+            logger.warning(f'Access log dropped {self.dropped} records (queue full)')
+
+
+_access_log: AccessLog | None = None
+
+
+def get_access_log() -> AccessLog | None:
+    """Get the configured access log."""
+    return _access_log
+
+
+def configure_access_log(
+    target: str | None = None,
+    sample: str | None = None,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+) -> None:
+    """Configure the access log.
+
+    Args:
+        target: Output file path, ``-`` for stdout, or None to disable
+        sample: Per-req sampling spec, see ``parse_sample_rates``
+        queue_size: Maximum queued records
+    """
+    global _access_log
+    if _access_log is not None:
+        _access_log.close()
+        _access_log = None
+    if not target:
+        return
+
+    if target == '-':
+        _access_log = AccessLog(sys.stdout, parse_sample_rates(sample), queue_size)
+    else:
+        stream = open(target, 'a', encoding='utf-8')
+        _access_log = AccessLog(stream, parse_sample_rates(sample), queue_size, close_stream=True)
+    atexit.register(_access_log.close)
+    logger.info(f'Access log enabled: {target}')
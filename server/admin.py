@@ -0,0 +1,308 @@
+"""Admin HTTP endpoints shared by both transports.
+
+诊断端点以 ``GET`` 路由注册在 ``ADMIN_ROUTES`` 中，FastAPI 传输与 raw 传输
+（在 WebSocket 握手前的 ``process_request`` 中）使用同一份实现。处理函数返回
+状态码与响应体：字典作为 JSON 返回，字符串作为纯文本返回；耗时的处理函数
+可以是协程，在事件循环之外完成实际工作。
+
+会改变服务器状态的端点（断开连接、重新加载响应文件）注册在
+``ADMIN_ACTIONS`` 中，只接受 ``POST``：管理端点没有认证，默认监听所有地址，
+爬虫、探测或浏览器预取发出的 ``GET`` 不应断开所有客户端。raw 传输的 HTTP
+解析可能只接受 ``GET``（取决于 websockets 版本），此时可以用
+``--admin-get-actions`` 显式允许以 ``GET`` 调用。
+
+``OVERRIDES_PATH`` 下的响应覆盖 API 还支持 ``PUT``/``PATCH``/``DELETE``。
+raw 传输的 HTTP 解析（websockets）不接受请求体，只能使用 ``GET`` 与
+``DELETE``。
+"""
+
+import asyncio
+import inspect
+import json
+import threading
+from http import HTTPStatus
+from typing import Any, Awaitable, Callable
+
+from server.connections import get_connection_manager
+from server.devices import clear_rendered_responses
+from server.handlers import route_request
+from server.faults import get_fault_injector
+from server.health import build_health
+from server.overrides import (
+    JsonPatchTestFailed,
+    delete_override,
+    get_overrides,
+    patch_override,
+    put_override,
+)
+from server.profiler import DEFAULT_INTERVAL, profile_thread
+from server.ratelimit import get_rate_limiter
+from server.responses import get_response_index, preload_responses, reload_responses
+from server.tracing import get_tracer
+from server.transfers import get_transfer_server
+from server.utils import get_int_param
+from server.writer import writer_metrics
+
+
+AdminResult = tuple[HTTPStatus, Any]
+AdminHandler = Callable[[dict[str, str]], AdminResult | Awaitable[AdminResult]]
+
+
+def _get_float_param(params: dict[str, str], name: str) -> float | None:
+    """Read an optional float query parameter."""
+    value = params.get(name)
+    return float(value) if value else None
+
+
+def slow_requests(params: dict[str, str]) -> tuple[HTTPStatus, Any]:
+    """List captured slow requests (``?limit=N``)."""
+    tracer = get_tracer()
+    if tracer is None:
+        return HTTPStatus.NOT_FOUND, {'detail': 'Tracing is disabled (use --trace-threshold)'}
+    return HTTPStatus.OK, {
+        'thresholdMs': tracer.threshold * 1000,
+        'total': tracer.total,
+        'slow': tracer.slow,
+        'requests': tracer.slow_requests(get_int_param(params, 'limit', None)),
+    }
+
+
+def chrome_trace(params: dict[str, str]) -> tuple[HTTPStatus, Any]:
+    """Export captured slow requests as Chrome trace events (``?window=SECONDS``)."""
+    tracer = get_tracer()
+    if tracer is None:
+        return HTTPStatus.NOT_FOUND, {'detail': 'Tracing is disabled (use --trace-threshold)'}
+    return HTTPStatus.OK, tracer.chrome_trace(_get_float_param(params, 'window'))
+
+
+async def profile(params: dict[str, str]) -> tuple[HTTPStatus, Any]:
+    """Sample the event loop thread (``?seconds=N&interval=MS&format=json``).
+
+    默认返回折叠栈文本，可直接交给 flamegraph.pl 或 speedscope。
+    """
+    seconds = _get_float_param(params, 'seconds')
+    seconds = 10.0 if seconds is None else seconds
+    interval_ms = _get_float_param(params, 'interval')
+    interval = interval_ms / 1000 if interval_ms else DEFAULT_INTERVAL
+
+    # 当前协程运行在事件循环线程上，采样在线程池中进行
+    try:
+        profiler = await asyncio.to_thread(
+            profile_thread, threading.get_ident(), seconds, interval, route_request.__code__
+        )
+    except RuntimeError as e:
+        return HTTPStatus.CONFLICT, {'detail': str(e)}
+
+    if params.get('format') == 'json':
+        return HTTPStatus.OK, {
+            'samples': profiler.samples,
+            'intervalMs': interval * 1000,
+            'stacks': dict(profiler.stacks.most_common()),
+        }
+    return HTTPStatus.OK, profiler.collapsed()
+
+
+def health(params: dict[str, str]) -> tuple[HTTPStatus, Any]:
+    """Report readiness, loop lag and connection count (503 when unhealthy)."""
+    healthy, report = build_health(get_connection_manager().count)
+    return (HTTPStatus.OK if healthy else HTTPStatus.SERVICE_UNAVAILABLE), report
+
+
+def write_queues(params: dict[str, str]) -> tuple[HTTPStatus, Any]:
+    """Report outbound queue depths and write counters."""
+    return HTTPStatus.OK, writer_metrics()
+
+
+def rate_limits(params: dict[str, str]) -> tuple[HTTPStatus, Any]:
+    """Report rate limit configuration and counters."""
+    limiter = get_rate_limiter()
+    if limiter is None:
+        return HTTPStatus.NOT_FOUND, {'detail': 'Rate limiting is disabled'}
+    return HTTPStatus.OK, limiter.stats()
+
+
+def connections(params: dict[str, str]) -> tuple[HTTPStatus, Any]:
+    """Report open connections, idle times and memory (``?limit=N``)."""
+    limit = get_int_param(params, 'limit', 20)
+    return HTTPStatus.OK, get_connection_manager().summary(limit)
+
+
+def faults(params: dict[str, str]) -> tuple[HTTPStatus, Any]:
+    """Report injected faults and connect/accept rates."""
+    return HTTPStatus.OK, get_fault_injector().summary()
+
+
+def restart(params: dict[str, str]) -> tuple[HTTPStatus, Any]:
+    """Simulate a server restart (``?drop=FRACTION&refuse=SECONDS``)."""
+    drop = _get_float_param(params, 'drop')
+    drop = 1.0 if drop is None else drop
+    refuse = _get_float_param(params, 'refuse') or 0.0
+    if not 0 <= drop <= 1 or refuse < 0:
+        raise ValueError('drop must be within [0, 1] and refuse must not be negative')
+    dropped = get_fault_injector().restart(drop, refuse)
+    return HTTPStatus.OK, {'dropped': dropped, 'refuseSeconds': refuse}
+
+
+def fixtures(params: dict[str, str]) -> tuple[HTTPStatus, Any]:
+    """Report the response directory layers and the merged index."""
+    return HTTPStatus.OK, get_response_index().to_dict()
+
+
+def transfers(params: dict[str, str]) -> tuple[HTTPStatus, Any]:
+    """Report download/upload counters, throughput and transfers in progress."""
+    server = get_transfer_server()
+    if server is None:
+        return HTTPStatus.NOT_FOUND, {'detail': 'Transfers are disabled (use --transfer-port)'}
+    return HTTPStatus.OK, {
+        'port': server.port,
+        'zeroCopy': server.zero_copy,
+        'store': {'capacity': server.store.capacity, 'used': server.store.used},
+        **server.stats.summary(),
+    }
+
+
+async def reload_fixtures(params: dict[str, str]) -> tuple[HTTPStatus, Any]:
+    """Re-resolve the response directory layers and reload the files."""
+    index = reload_responses()
+    clear_rendered_responses()
+    preloaded = await asyncio.to_thread(preload_responses)
+    return HTTPStatus.OK, {**index.to_dict(), 'preloaded': preloaded}
+
+
+ADMIN_ROUTES: dict[str, AdminHandler] = {
+    '/health': health,
+    '/debug/slow-requests': slow_requests,
+    '/debug/trace': chrome_trace,
+    '/debug/profile': profile,
+    '/debug/write-queues': write_queues,
+    '/debug/rate-limits': rate_limits,
+    '/debug/connections': connections,
+    '/debug/faults': faults,
+    '/debug/fixtures': fixtures,
+    '/debug/transfers': transfers,
+}
+
+# 改变服务器状态的端点，只接受 POST（见模块说明）
+ADMIN_ACTIONS: dict[str, AdminHandler] = {
+    '/debug/faults/restart': restart,
+    '/debug/fixtures/reload': reload_fixtures,
+}
+
+_settings = {'get_actions': False}
+
+
+def configure_admin(get_actions: bool = False) -> None:
+    """Configure the admin endpoints.
+
+    Args:
+        get_actions: Also accept ``GET`` for the state-changing ``ADMIN_ACTIONS``
+    """
+    _settings['get_actions'] = get_actions
+
+
+OVERRIDES_PATH = '/admin/responses'
+
+OVERRIDE_METHODS = ('GET', 'PUT', 'PATCH', 'DELETE')
+
+
+def _override_scope(params: dict[str, str]) -> tuple[str | None, int | None]:
+    """Read the ``device`` and ``connection`` scope of an override request."""
+    connection = get_int_param(params, 'connection', None)
+    return params.get('device') or None, connection
+
+
+def response_overrides(
+    method: str,
+    req: str | None,
+    params: dict[str, str],
+    body: bytes,
+) -> tuple[HTTPStatus, Any]:
+    """Manage response overrides.
+
+    - ``GET /admin/responses``：列出所有覆盖与当前版本；
+    - ``GET /admin/responses/{req}``：查看作用域内生效的覆盖；
+    - ``PUT /admin/responses/{req}``：以请求体（JSON 对象）作为响应；
+    - ``PATCH /admin/responses/{req}``：对当前响应应用 JSON Patch（RFC 6902）；
+    - ``DELETE /admin/responses[/{req}]``：删除覆盖。
+
+    ``?device=ID`` 或 ``?connection=CLIENT`` 指定作用域，缺省为全局。
+    """
+    device, connection = _override_scope(params)
+    if method == 'GET':
+        snapshot = get_overrides()
+        if req is None:
+            return HTTPStatus.OK, snapshot.to_dict()
+        override = snapshot.lookup(req, connection, device)
+        if override is None:
+            return HTTPStatus.NOT_FOUND, {'detail': f'No override for {req}'}
+        return HTTPStatus.OK, {
+            'req': req,
+            'version': override.version,
+            'response': override.response,
+        }
+
+    if method == 'DELETE':
+        removed = delete_override(req, device, connection)
+        return HTTPStatus.OK, {'removed': removed, 'version': get_overrides().version}
+
+    if req is None:
+        return HTTPStatus.METHOD_NOT_ALLOWED, {'detail': f'{method} requires a request type'}
+    try:
+        payload = json.loads(body or b'null')
+    except ValueError:
+        raise ValueError('Request body must be JSON') from None
+    try:
+        if method == 'PUT':
+            override = put_override(req, payload, device, connection)
+        else:
+            override = patch_override(req, payload, device, connection)
+    except JsonPatchTestFailed as e:
+        return HTTPStatus.CONFLICT, {'detail': str(e)}
+    except LookupError as e:
+        return HTTPStatus.NOT_FOUND, {'detail': str(e.args[0])}
+    return HTTPStatus.OK, {'req': req, 'version': override.version}
+
+
+async def handle_admin_request(
+    path: str,
+    params: dict[str, str],
+    method: str = 'GET',
+    body: bytes = b'',
+) -> tuple[HTTPStatus, Any] | None:
+    """Dispatch an admin request.
+
+    Args:
+        path: Request path without query string
+        params: Query parameters
+        method: HTTP method
+        body: Request body
+
+    Returns:
+        Status and body, or None if ``path`` is not an admin route
+    """
+    if path == OVERRIDES_PATH or path.startswith(OVERRIDES_PATH + '/'):
+        req = path[len(OVERRIDES_PATH) + 1:] or None
+        if method not in OVERRIDE_METHODS:
+            return HTTPStatus.METHOD_NOT_ALLOWED, {'detail': f'Method not allowed: {method}'}
+        try:
+            return response_overrides(method, req, params, body)
+        except ValueError as e:
+            return HTTPStatus.BAD_REQUEST, {'detail': str(e)}
+
+    handler = ADMIN_ROUTES.get(path)
+    if handler is not None:
+        allowed = method == 'GET'
+    else:
+        handler = ADMIN_ACTIONS.get(path)
+        if handler is None:
+            return None
+        allowed = method == 'POST' or (method == 'GET' and _settings['get_actions'])
+    if not allowed:
+        return HTTPStatus.METHOD_NOT_ALLOWED, {'detail': f'Method not allowed: {method}'}
+    try:
+        result = handler(params)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+    except ValueError as e:
+        return HTTPStatus.BAD_REQUEST, {'detail': str(e)}
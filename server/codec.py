@@ -0,0 +1,126 @@
+"""Pluggable JSON codec for fnOS Mock Server.
+
+请求解析、响应序列化与响应文件加载都经由本模块，后端按以下顺序自动选择
+（也可以用 ``--json-codec`` 指定）：
+
+- ``orjson``（``pip install fnos-mock-server[codec]``）；
+- ``msgspec``；
+- ``stdlib``：标准库 ``json``。
+
+所有后端的输出与 ``json.dumps(obj, ensure_ascii=False, separators=(',', ':'))``
+一致（``tests/test_codec.py`` 对 ``responses/`` 中的每个文件逐字节比较），
+唯一的例外是绝对值小于 1e-4 或不小于 1e16 的浮点数，其指数形式不同（如
+``1e16`` 与 ``1e+16``），数值相同。快速后端不支持的对象（超过 64 位的整数、
+非字符串键、孤立的代理字符等）自动回退到标准库。
+
+热点路径通过模块属性调用（``codec.dumps(...)``），切换后端只需重新绑定
+``dumps``/``loads``，不经过额外的分发层。
+"""
+
+import json
+import logging
+from typing import Any, Callable
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 可选依赖
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - 可选依赖
+    msgspec = None
+
+
+logger = logging.getLogger(__name__)
+
+
+CODECS = ('auto', 'orjson', 'msgspec', 'stdlib')
+
+# 所有后端抛出的解析错误类型（json.JSONDecodeError 是 ValueError 的子类）
+DecodeError = json.JSONDecodeError
+
+
+def _stdlib_dumps(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'))
+
+
+def _stdlib_loads(data: str | bytes) -> Any:
+    return json.loads(data)
+
+
+def _orjson_dumps(obj: Any) -> str:
+    try:
+        return orjson.dumps(obj).decode('utf-8')
+    except TypeError:
+        # orjson.JSONEncodeError 是 TypeError 的子类
+        return _stdlib_dumps(obj)
+
+
+def _orjson_loads(data: str | bytes) -> Any:
+    # orjson.JSONDecodeError 是 json.JSONDecodeError 的子类
+    return orjson.loads(data)
+
+
+_msgspec_encoder = msgspec.json.Encoder() if msgspec is not None else None
+_msgspec_decoder = msgspec.json.Decoder() if msgspec is not None else None
+
+
+def _msgspec_dumps(obj: Any) -> str:
+    try:
+        return _msgspec_encoder.encode(obj).decode('utf-8')
+    except (TypeError, OverflowError, UnicodeEncodeError, msgspec.EncodeError):
+        return _stdlib_dumps(obj)
+
+
+def _msgspec_loads(data: str | bytes) -> Any:
+    try:
+        return _msgspec_decoder.decode(data)
+    except msgspec.DecodeError as e:
+        raise DecodeError(str(e), data if isinstance(data, str) else '', 0) from None
+
+
+BACKENDS: dict[str, tuple[Callable[[Any], str], Callable[[str | bytes], Any]]] = {
+    'stdlib': (_stdlib_dumps, _stdlib_loads),
+}
+if orjson is not None:
+    BACKENDS['orjson'] = (_orjson_dumps, _orjson_loads)
+if msgspec is not None:
+    BACKENDS['msgspec'] = (_msgspec_dumps, _msgspec_loads)
+
+
+def available_codecs() -> list[str]:
+    """Names of the installed backends."""
+    return list(BACKENDS)
+
+
+# 当前后端（由 configure_codec 重新绑定）
+name = 'stdlib'
+dumps: Callable[[Any], str] = _stdlib_dumps
+loads: Callable[[str | bytes], Any] = _stdlib_loads
+
+
+def configure_codec(codec: str = 'auto') -> str:
+    """Select the JSON backend.
+
+    Args:
+        codec: ``auto`` (fastest installed) or a backend name from ``CODECS``
+
+    Returns:
+        Selected backend name
+
+    Raises:
+        ValueError: If the backend is unknown or not installed
+    """
+    global name, dumps, loads
+    if codec == 'auto':
+        codec = next(c for c in ('orjson', 'msgspec', 'stdlib') if c in BACKENDS)
+    if codec not in BACKENDS:
+        raise ValueError(f'JSON codec not available: {codec} (installed: {", ".join(BACKENDS)})')
+    name = codec
+    dumps, loads = BACKENDS[codec]
+    logger.info(f'Using {codec} JSON codec')
+    return codec
+
+
+configure_codec()
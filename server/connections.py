@@ -0,0 +1,308 @@
+"""Connection registry and idle connection reaper.
+
+所有 WebSocket 连接（两种传输与内存连接）都登记在 ``ConnectionManager`` 中，
+每条消息只更新连接的最后活动时间。空闲超时由时间轮（timer wheel）驱动：
+
+- 每个连接在时间轮中只有一个条目，位于“最后活动时间 + 超时”所在的槽；
+- 一个全局任务每个 tick 推进一个槽，检查到期的连接：确实空闲则关闭，
+  期间有过活动则按新的最后活动时间重新放入时间轮。
+
+因此不需要为每个连接创建定时器或 sleep 任务，消息处理路径上的开销是一次
+时间戳赋值。
+"""
+
+import asyncio
+import heapq
+import logging
+import time
+from typing import Any, Awaitable, Callable
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_TICK = 1.0
+DEFAULT_SLOTS = 512
+
+
+class ConnectionInfo:
+    """Bookkeeping of one open connection."""
+
+    __slots__ = (
+        'client_id', 'device_id', 'connected_at', 'last_activity', 'messages', 'close', 'abort',
+        'open',
+    )
+
+    def __init__(
+        self,
+        client_id: int,
+        device_id: str | None,
+        close: Callable[[], Awaitable[None]] | None,
+        abort: Callable[[], Awaitable[None]] | None = None,
+    ) -> None:
+        self.client_id = client_id
+        self.device_id = device_id
+        self.connected_at = time.monotonic()
+        self.last_activity = self.connected_at
+        self.messages = 0
+        self.close = close
+        self.abort = abort
+        self.open = True
+
+
+class TimerWheel:
+    """Hashed timer wheel of connections keyed by deadline."""
+
+    def __init__(self, tick: float = DEFAULT_TICK, slots: int = DEFAULT_SLOTS) -> None:
+        """Create the wheel.
+
+        Args:
+            tick: Seconds per slot
+            slots: Number of slots (deadlines further away wrap around and are
+                re-checked when their slot comes up)
+        """
+        self.tick = tick
+        self.slots: list[list[ConnectionInfo]] = [[] for _ in range(slots)]
+        self.current = int(time.monotonic() / tick)
+
+    def schedule(self, info: ConnectionInfo, deadline: float) -> None:
+        """Put a connection into the slot of its deadline."""
+        index = max(int(deadline / self.tick), self.current + 1)
+        self.slots[index % len(self.slots)].append(info)
+
+    def advance(self, now: float) -> list[ConnectionInfo]:
+        """Advance to ``now`` and return the entries of the passed slots."""
+        target = int(now / self.tick)
+        due: list[ConnectionInfo] = []
+        # 长时间未推进时最多扫描一整圈
+        start = max(self.current + 1, target - len(self.slots) + 1)
+        for index in range(start, target + 1):
+            slot = index % len(self.slots)
+            due.extend(self.slots[slot])
+            self.slots[slot] = []
+        self.current = max(self.current, target)
+        return due
+
+
+def _rss_kib() -> int:
+    """Return resident set size of this process in KiB (Linux only)."""
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+class ConnectionManager:
+    """Registry of open connections with an idle reaper."""
+
+    def __init__(
+        self,
+        idle_timeout: float | None = None,
+        tick: float = DEFAULT_TICK,
+        slots: int = DEFAULT_SLOTS,
+    ) -> None:
+        """Create the manager.
+
+        Args:
+            idle_timeout: Seconds without requests before a connection is closed
+                (None to keep idle connections)
+            tick: Reaper resolution in seconds
+            slots: Timer wheel slots
+        """
+        self.idle_timeout = idle_timeout
+        self.wheel = TimerWheel(tick, slots)
+        self.connections: dict[int, ConnectionInfo] = {}
+        self.reaped = 0
+        self.baseline_rss_kib = _rss_kib()
+        self._task: asyncio.Task | None = None
+        self._closing: set[asyncio.Task] = set()
+
+    @property
+    def count(self) -> int:
+        """Number of open connections."""
+        return len(self.connections)
+
+    def register(
+        self,
+        client_id: int,
+        device_id: str | None = None,
+        close: Callable[[], Awaitable[None]] | None = None,
+        abort: Callable[[], Awaitable[None]] | None = None,
+    ) -> ConnectionInfo:
+        """Register a new connection.
+
+        Args:
+            client_id: Connection identifier
+            device_id: Emulated device ID
+            close: Coroutine function closing the connection (required for reaping)
+            abort: Coroutine function dropping the connection without a closing
+                handshake (used by fault injection)
+
+        Returns:
+            Connection bookkeeping
+        """
+        if not self.connections:
+            # 没有连接时的 RSS 作为单连接内存估算的基线
+            self.baseline_rss_kib = _rss_kib()
+        info = ConnectionInfo(client_id, device_id, close, abort)
+        self.connections[client_id] = info
+        if self.idle_timeout and close is not None:
+            self.wheel.schedule(info, info.last_activity + self.idle_timeout)
+        return info
+
+    def unregister(self, info: ConnectionInfo) -> None:
+        """Remove a closed connection (its wheel entry is dropped lazily)."""
+        info.open = False
+        self.connections.pop(info.client_id, None)
+
+    def reap(self, now: float | None = None) -> list[ConnectionInfo]:
+        """Close connections whose idle time exceeded the timeout.
+
+        Args:
+            now: Monotonic time (default: now)
+
+        Returns:
+            Connections being closed
+        """
+        now = time.monotonic() if now is None else now
+        reaped = []
+        for info in self.wheel.advance(now):
+            if not info.open or not self.idle_timeout:
+                continue
+            deadline = info.last_activity + self.idle_timeout
+            if deadline > now:
+                self.wheel.schedule(info, deadline)
+                continue
+            info.open = False
+            reaped.append(info)
+            task = asyncio.get_running_loop().create_task(self._close(info))
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+        if reaped:
+            self.reaped += len(reaped)
+            logger.info(f'Closed {len(reaped)} idle connections')
+        return reaped
+
+    async def _close(self, info: ConnectionInfo) -> None:
+        """Close one idle connection."""
+        try:
+            await info.close()
+        except Exception as e:
+            logger.debug(f'Error closing idle connection {info.client_id}: {e}')
+
+    async def _run(self) -> None:
+        """Advance the timer wheel once per tick."""
+        while True:
+            await asyncio.sleep(self.wheel.tick)
+            self.reap()
+
+    def start(self) -> None:
+        """Start the reaper on the running loop."""
+        if self.idle_timeout and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self) -> None:
+        """Stop the reaper."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def drain(self, timeout: float, interval: float = 0.1) -> int:
+        """Wait for the open connections to close.
+
+        Args:
+            timeout: Seconds to wait at most
+            interval: Seconds between two checks
+
+        Returns:
+            Number of connections still open at the deadline
+        """
+        deadline = time.monotonic() + timeout
+        if self.connections:
+            logger.info(f'Draining {self.count} connections (deadline {timeout}s)')
+        while self.connections and time.monotonic() < deadline:
+            await asyncio.sleep(interval)
+        if self.connections:
+            logger.info(f'{self.count} connections still open at the drain deadline')
+        return self.count
+
+    def summary(self, limit: int = 20) -> dict[str, Any]:
+        """Report connections and memory.
+
+        单连接内存按“当前 RSS − 无连接时的 RSS”平均到每个连接估算。
+
+        Args:
+            limit: Number of longest idle connections to list
+        """
+        now = time.monotonic()
+        rss = _rss_kib()
+        count = self.count
+        idlest = heapq.nsmallest(
+            limit, self.connections.values(), key=lambda info: info.last_activity
+        )
+        return {
+            'connections': count,
+            'idleTimeout': self.idle_timeout,
+            'reaped': self.reaped,
+            'rssKiB': rss,
+            'baselineRssKiB': self.baseline_rss_kib,
+            'kibPerConnection': round((rss - self.baseline_rss_kib) / count, 2) if count else None,
+            'idlest': [
+                {
+                    'client': info.client_id,
+                    'device': info.device_id,
+                    'idleSeconds': round(now - info.last_activity, 3),
+                    'ageSeconds': round(now - info.connected_at, 3),
+                    'messages': info.messages,
+                }
+                for info in idlest
+            ],
+        }
+
+
+_manager = ConnectionManager()
+
+
+def get_connection_manager() -> ConnectionManager:
+    """Get the connection manager."""
+    return _manager
+
+
+def configure_connections(
+    idle_timeout: float | None = None,
+    tick: float = DEFAULT_TICK,
+) -> None:
+    """Configure the idle reaper.
+
+    Args:
+        idle_timeout: Seconds without requests before a connection is closed
+            (None or 0 to keep idle connections)
+        tick: Reaper resolution in seconds
+    """
+    global _manager
+    _manager = ConnectionManager(idle_timeout or None, tick)
+    if idle_timeout:
+        logger.info(f'Idle connections are closed after {idle_timeout}s')
+
+
+def start_reaper() -> None:
+    """Start the idle reaper on the running loop."""
+    _manager.start()
+
+
+def stop_reaper() -> None:
+    """Stop the idle reaper."""
+    _manager.stop()
+
+
+async def drain_connections(timeout: float) -> int:
+    """Wait up to ``timeout`` seconds for the open connections to close.
+
+    Returns:
+        Number of connections still open at the deadline
+    """
+    return await _manager.drain(timeout)
@@ -0,0 +1,254 @@
+"""Multi-device virtualization for fnOS Mock Server.
+
+一个进程可以模拟多台 NAS：客户端通过 ``/websocket/{device_id}``（或为兼容
+pyfnos 的 endpoint 拼接方式，``/{device_id}/websocket``）连接到指定设备。
+
+每台设备只保存相对共享基础响应的覆盖层（JSON Merge Patch，RFC 7386），
+合并结果按需生成并与基础响应共享未修改的子树，因此内存随覆盖量增长，
+而不是随设备数 × 全部响应文件增长。
+"""
+
+import hashlib
+import json
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any
+
+from server.storage import forget_device
+
+logger = logging.getLogger(__name__)
+
+
+WEBSOCKET_PATH = '/websocket'
+
+# 未在 --devices-file 中声明、按需创建的设备的默认上限
+MAX_DEVICES = 1024
+
+
+def merge_patch(target: Any, patch: Any) -> Any:
+    """Apply a JSON Merge Patch without modifying the target.
+
+    仅复制被修改路径上的字典，未修改的子树与 ``target`` 共享。
+
+    Args:
+        target: Base JSON value
+        patch: Merge patch; ``None`` values remove keys
+
+    Returns:
+        Patched JSON value
+    """
+    if not isinstance(patch, dict):
+        return patch
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = merge_patch(result.get(key), value)
+    return result
+
+
+@dataclass
+class Device:
+    """One emulated NAS device.
+
+    Attributes:
+        device_id: Device identifier from the connection path
+        host_name: Host name returned by ``appcgi.sysinfo.getHostName``
+        machine_id: Machine ID returned by ``appcgi.sysinfo.getMachineId``
+        overlays: Merge patches keyed by request type
+    """
+
+    device_id: str
+    host_name: str
+    machine_id: str
+    overlays: dict[str, dict[str, Any]] = field(default_factory=dict)
+    _rendered: dict[str, dict[str, Any]] = field(default_factory=dict, repr=False)
+
+    def render(self, req: str, base: dict[str, Any]) -> dict[str, Any]:
+        """Apply this device's overlay for ``req`` on top of the base response.
+
+        Args:
+            req: Request type
+            base: Shared base response
+
+        Returns:
+            Device view of the response (must not be modified by the caller)
+        """
+        patch = self.overlays.get(req)
+        if patch is None:
+            return base
+
+        rendered = self._rendered.get(req)
+        if rendered is None:
+            rendered = merge_patch(base, patch)
+            self._rendered[req] = rendered
+        return rendered
+
+
+def derive_machine_id(device_id: str) -> str:
+    """Derive a stable machine ID from a device ID.
+
+    Args:
+        device_id: Device identifier
+
+    Returns:
+        32 hex character machine ID
+    """
+    return hashlib.md5(device_id.encode('utf-8')).hexdigest()
+
+
+def build_device(device_id: str, spec: dict[str, Any] | None = None) -> Device:
+    """Build a device from its overlay spec.
+
+    spec 支持的字段::
+
+        {
+          "hostName": "nas-01",
+          "machineId": "...",
+          "disks": [...],            # 覆盖 stor.listDisk 的 disk 列表
+          "users": [...],            # 覆盖 user.list 的 users 列表
+          "responses": {"req": {...merge patch...}}
+        }
+
+    Args:
+        device_id: Device identifier
+        spec: Overlay spec (optional)
+
+    Returns:
+        Device
+    """
+    spec = spec or {}
+    host_name = spec.get('hostName', device_id)
+    machine_id = spec.get('machineId', derive_machine_id(device_id))
+
+    overlays: dict[str, dict[str, Any]] = {
+        'appcgi.sysinfo.getMachineId': {'data': {'machineId': machine_id}},
+    }
+    if 'disks' in spec:
+        overlays['stor.listDisk'] = {'disk': spec['disks']}
+    if 'users' in spec:
+        overlays['user.list'] = {'users': spec['users']}
+    for req, patch in spec.get('responses', {}).items():
+        overlays[req] = merge_patch(overlays.get(req, {}), patch)
+
+    return Device(device_id, host_name, machine_id, overlays)
+
+
+# 设备覆盖配置（来自 --devices-file）与已创建的设备
+_device_specs: dict[str, dict[str, Any]] = {}
+_devices: dict[str, Device] = {}
+# 未声明的设备按最近使用顺序保存，超出上限时淘汰最久未用的
+_lazy_devices: OrderedDict[str, Device] = OrderedDict()
+_max_devices = MAX_DEVICES
+
+
+def load_devices(file_path: str) -> None:
+    """Load device overlay specs from a JSON file.
+
+    文件内容为 ``{device_id: spec}`` 的映射，格式见 ``build_device``。
+
+    Args:
+        file_path: Path to the devices JSON file
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        specs = json.load(f)
+
+    _device_specs.clear()
+    _device_specs.update(specs)
+    _devices.clear()
+    _lazy_devices.clear()
+    logger.info(f'Loaded {len(specs)} device overlays from {file_path}')
+
+
+def configure_devices(max_devices: int = MAX_DEVICES) -> None:
+    """Limit the number of undeclared devices kept in memory.
+
+    Args:
+        max_devices: Undeclared devices kept (least recently used evicted
+            first), 0 to accept only devices declared in ``--devices-file``
+    """
+    global _max_devices
+    _max_devices = max_devices
+    while len(_lazy_devices) > _max_devices:
+        _evict()
+
+
+def _evict() -> None:
+    """Evict the least recently used undeclared device and its storage state."""
+    device_id, _ = _lazy_devices.popitem(last=False)
+    forget_device(device_id)
+    logger.debug(f'Evicted device {device_id}')
+
+
+def get_device(device_id: str | None) -> Device | None:
+    """Get (or lazily create) the device for a device ID.
+
+    未在配置文件中声明的设备使用由 ID 派生的主机名和机器 ID，最多保留
+    ``configure_devices`` 指定的数量；被淘汰的设备在下次连接时重新创建，
+    派生的主机名、机器 ID 与存储池状态保持不变。
+
+    Args:
+        device_id: Device identifier, or None for the default device
+
+    Returns:
+        Device, or None for the default device
+
+    Raises:
+        ValueError: If undeclared devices are disabled and ``device_id`` is
+            not declared in the devices file
+    """
+    if device_id is None:
+        return None
+
+    device = _devices.get(device_id)
+    if device is not None:
+        return device
+    if device_id in _device_specs:
+        device = _devices[device_id] = build_device(device_id, _device_specs[device_id])
+        logger.debug(f'Created device {device_id}')
+        return device
+
+    device = _lazy_devices.get(device_id)
+    if device is not None:
+        _lazy_devices.move_to_end(device_id)
+        return device
+    if _max_devices <= 0:
+        raise ValueError(f'Unknown device: {device_id}')
+    device = _lazy_devices[device_id] = build_device(device_id)
+    logger.debug(f'Created device {device_id}')
+    while len(_lazy_devices) > _max_devices:
+        _evict()
+    return device
+
+
+def clear_rendered_responses() -> None:
+    """Drop the rendered device views (after the response files were reloaded)."""
+    for device in (*_devices.values(), *_lazy_devices.values()):
+        device._rendered.clear()
+
+
+def device_id_from_path(path: str) -> str | None:
+    """Extract the device ID from a WebSocket request path.
+
+    Args:
+        path: Request path, optionally with a query string
+
+    Returns:
+        Device ID, or None for the default ``/websocket`` endpoint
+
+    Raises:
+        ValueError: If the path is not a WebSocket endpoint
+    """
+    path = path.split('?', 1)[0].rstrip('/')
+    if path == WEBSOCKET_PATH:
+        return None
+
+    parts = path.strip('/').split('/')
+    if len(parts) == 2 and parts[0] == 'websocket' and parts[1]:
+        return parts[1]
+    if len(parts) == 2 and parts[1] == 'websocket' and parts[0]:
+        return parts[0]
+
+    raise ValueError(f'Not a WebSocket endpoint: {path}')
@@ -0,0 +1,383 @@
+"""Synthetic user/group directory for the user.* and file.getAcl endpoints.
+
+``user.list``、``user.listUG``、``user.groupUsers``、``user.info`` 默认返回
+少量固定用户。配置 ``--users N --groups M`` 后改由本模块生成企业规模的目录：
+
+- 用户与用户组的属性保存在列式数组中，并按 uid/gid 与名称建立哈希索引；
+- 组→成员、用户→所属组的关系以 CSR 形式（偏移数组 + 成员数组）保存；
+- 列表响应按 offset/limit 或 page/pageSize 分页。
+"""
+
+import logging
+import random
+from array import array
+from typing import Any
+
+from server.responses import build_error_response
+from server.utils import get_int_param, get_page_params
+
+
+logger = logging.getLogger(__name__)
+
+
+UVER = 115993656164352
+
+FIRST_UID = 1000
+FIRST_GID = 1000
+
+ADMIN_GROUP = 'Administrators'
+USERS_GROUP = 'Users'
+
+DEFAULT_PAGE_SIZE = 1000
+
+
+def _csr(lists: list[list[int]]) -> tuple[array, array]:
+    """Pack adjacency lists into offset and value arrays."""
+    offsets = array('q', [0])
+    values = array('q')
+    for items in lists:
+        values.extend(items)
+        offsets.append(len(values))
+    return offsets, values
+
+
+class UserDirectory:
+    """Users and groups with hash indexes and compact membership arrays."""
+
+    def __init__(
+        self,
+        users: int,
+        groups: int,
+        max_groups_per_user: int = 3,
+        admins: int = 2,
+        seed: int = 0,
+    ) -> None:
+        """Generate a directory.
+
+        每个用户都属于 ``Users`` 组，另外随机加入至多 ``max_groups_per_user``
+        个普通组；前 ``admins`` 个用户属于 ``Administrators`` 组。
+
+        Args:
+            users: Number of users
+            groups: Number of groups (including Administrators and Users)
+            max_groups_per_user: Maximum extra groups per user
+            admins: Number of administrators
+            seed: Random seed
+        """
+        rng = random.Random(seed)
+        groups = max(groups, 2)
+
+        self.uids = array('q', range(FIRST_UID, FIRST_UID + users))
+        self.user_names = [f'user{i:06d}' for i in range(users)]
+        self.gids = array('q', range(FIRST_GID, FIRST_GID + groups))
+        self.group_names = [ADMIN_GROUP, USERS_GROUP] + [
+            f'group{i:05d}' for i in range(groups - 2)
+        ]
+
+        # 哈希索引：uid/名称 → 行号
+        self._user_by_uid = {uid: row for row, uid in enumerate(self.uids)}
+        self._user_by_name = {name: row for row, name in enumerate(self.user_names)}
+        self._group_by_gid = {gid: row for row, gid in enumerate(self.gids)}
+        self._group_by_name = {name: row for row, name in enumerate(self.group_names)}
+
+        admins = min(admins, users)
+        user_groups: list[list[int]] = []
+        group_members: list[list[int]] = [[] for _ in range(groups)]
+        for row in range(users):
+            memberships = [1]
+            if row < admins:
+                memberships.insert(0, 0)
+            if groups > 2 and max_groups_per_user:
+                extra = rng.randint(0, max_groups_per_user)
+                memberships.extend(sorted(rng.sample(range(2, groups), min(extra, groups - 2))))
+            user_groups.append(memberships)
+            for group in memberships:
+                group_members[group].append(row)
+
+        self._user_group_offsets, self._user_groups = _csr(user_groups)
+        self._group_member_offsets, self._group_members = _csr(group_members)
+        self.admin_count = admins
+
+        logger.debug(f'User directory: {users} users, {groups} groups, '
+                     f'{len(self._group_members)} memberships')
+
+    @property
+    def user_count(self) -> int:
+        return len(self.uids)
+
+    @property
+    def group_count(self) -> int:
+        return len(self.gids)
+
+    def find_user(self, uid: int | None = None, name: str | None = None) -> int | None:
+        """Look up a user row by uid or name."""
+        if uid is not None:
+            return self._user_by_uid.get(uid)
+        if name is not None:
+            return self._user_by_name.get(name)
+        return None
+
+    def find_group(self, gid: int | None = None, name: str | None = None) -> int | None:
+        """Look up a group row by gid or name."""
+        if gid is not None:
+            return self._group_by_gid.get(gid)
+        if name is not None:
+            return self._group_by_name.get(name)
+        return None
+
+    def groups_of(self, user_row: int) -> array:
+        """Return the group rows of a user."""
+        offsets = self._user_group_offsets
+        return self._user_groups[offsets[user_row]:offsets[user_row + 1]]
+
+    def members_of(self, group_row: int, offset: int = 0, limit: int | None = None) -> array:
+        """Return (a slice of) the member user rows of a group."""
+        start = self._group_member_offsets[group_row]
+        end = self._group_member_offsets[group_row + 1]
+        start = min(start + offset, end)
+        if limit is not None:
+            end = min(end, start + limit)
+        return self._group_members[start:end]
+
+    def member_count(self, group_row: int) -> int:
+        """Return the number of members of a group."""
+        return self._group_member_offsets[group_row + 1] - self._group_member_offsets[group_row]
+
+    def is_admin(self, user_row: int) -> bool:
+        """Return whether a user belongs to Administrators."""
+        return user_row < self.admin_count
+
+    def user_entry(self, row: int) -> dict[str, Any]:
+        """Build a user.list entry."""
+        entry: dict[str, Any] = {'user': self.user_names[row], 'uid': self.uids[row]}
+        if self.is_admin(row):
+            entry['admin'] = True
+        return entry
+
+
+def build_user_list_response(
+    directory: UserDirectory,
+    request: dict[str, Any],
+    reqid: str,
+) -> dict[str, Any]:
+    """Build response for user.list."""
+    offset, limit = get_page_params(request, DEFAULT_PAGE_SIZE)
+    rows = range(offset, min(offset + limit, directory.user_count))
+    return {
+        'uver': UVER,
+        'users': [directory.user_entry(row) for row in rows],
+        'total': directory.user_count,
+        'result': 'succ',
+        'reqid': reqid,
+    }
+
+
+def build_list_ug_response(
+    directory: UserDirectory,
+    request: dict[str, Any],
+    reqid: str,
+) -> dict[str, Any]:
+    """Build response for user.listUG.
+
+    用户按 offset/limit 分页，用户组按 groupOffset/groupLimit 分页。
+    """
+    offset, limit = get_page_params(request, DEFAULT_PAGE_SIZE)
+    group_offset = max(get_int_param(request, 'groupOffset', 0), 0)
+    group_limit = max(get_int_param(request, 'groupLimit', DEFAULT_PAGE_SIZE), 0)
+
+    users = range(offset, min(offset + limit, directory.user_count))
+    groups = range(group_offset, min(group_offset + group_limit, directory.group_count))
+    return {
+        'users': [
+            {'user': directory.user_names[row], 'uid': directory.uids[row], 'comment': ''}
+            for row in users
+        ],
+        'groups': [
+            {'group': directory.group_names[row], 'gid': directory.gids[row], 'comment': ''}
+            for row in groups
+        ],
+        'userTotal': directory.user_count,
+        'groupTotal': directory.group_count,
+        'uver': UVER,
+        'result': 'succ',
+        'reqid': reqid,
+    }
+
+
+def build_group_users_response(
+    directory: UserDirectory,
+    request: dict[str, Any],
+    reqid: str,
+) -> dict[str, Any]:
+    """Build response for user.groupUsers.
+
+    指定 ``gid`` 时只返回该组，成员按 offset/limit 分页；否则用户组按
+    offset/limit 分页，每组至多返回 ``DEFAULT_PAGE_SIZE`` 个成员，被截断的组
+    附带 ``total`` 成员数。
+    """
+    gid = get_int_param(request, 'gid', None)
+    offset, limit = get_page_params(request, DEFAULT_PAGE_SIZE)
+
+    def group_entry(row: int, member_offset: int = 0, member_limit: int | None = None) -> dict:
+        entry: dict[str, Any] = {'group': directory.group_names[row], 'gid': directory.gids[row]}
+        members = directory.members_of(row, member_offset, member_limit)
+        if members:
+            entry['users'] = [directory.uids[m] for m in members]
+        return entry
+
+    if gid is not None:
+        row = directory.find_group(gid=gid)
+        if row is None:
+            return build_error_response(reqid, f'Unknown group: {gid}')
+        entry = group_entry(row, offset, limit)
+        entry['total'] = directory.member_count(row)
+        groups = [entry]
+    else:
+        rows = range(offset, min(offset + limit, directory.group_count))
+        groups = []
+        for row in rows:
+            entry = group_entry(row, 0, DEFAULT_PAGE_SIZE)
+            if directory.member_count(row) > DEFAULT_PAGE_SIZE:
+                entry['total'] = directory.member_count(row)
+            groups.append(entry)
+
+    return {
+        'uver': UVER,
+        'groups': groups,
+        'total': directory.group_count,
+        'result': 'succ',
+        'reqid': reqid,
+    }
+
+
+def build_user_info_response(
+    directory: UserDirectory,
+    request: dict[str, Any],
+    reqid: str,
+) -> dict[str, Any]:
+    """Build response for user.info (by ``uid`` or ``user``, default: first user)."""
+    uid = get_int_param(request, 'uid', None)
+    name = request.get('user') or request.get('name')
+    if name is not None and not isinstance(name, str):
+        raise ValueError(f'Parameter "user" must be a string: {name!r}')
+    if uid is None and name is None:
+        row = 0 if directory.user_count else None
+    else:
+        row = directory.find_user(uid=uid, name=name)
+    if row is None:
+        return build_error_response(reqid, f'Unknown user: {uid if uid is not None else name}')
+
+    return {
+        'data': {
+            'uid': directory.uids[row],
+            'name': directory.user_names[row],
+            'isAdmin': directory.is_admin(row),
+            'groups': [directory.group_names[g].lower() for g in directory.groups_of(row)],
+        },
+        'reqid': reqid,
+        'result': 'succ',
+        'rev': '0.1',
+        'req': 'user.info',
+    }
+
+
+def build_get_acl_response(
+    directory: UserDirectory,
+    request: dict[str, Any],
+    reqid: str,
+    entries: int = 16,
+) -> dict[str, Any]:
+    """Build response for file.getAcl with named entries from the directory.
+
+    每个请求的路径生成一份 ACL，命名用户/用户组条目由路径确定性地选出。
+
+    Args:
+        directory: User directory
+        request: Parsed request dictionary (``files`` list or ``path``)
+        reqid: Request ID
+        entries: Named user/group entries per ACL
+
+    Returns:
+        Response dictionary
+
+    Raises:
+        ValueError: If ``files`` is not a list
+    """
+    paths = request.get('files') or [request.get('path', '/')]
+    if not isinstance(paths, list):
+        raise ValueError(f'Parameter "files" must be a list: {paths!r}')
+    acls = []
+    for path in paths:
+        rng = random.Random(str(path))
+        permset: list[dict[str, Any]] = [{'owner': 6}]
+        for _ in range(entries):
+            if rng.random() < 0.5 and directory.user_count:
+                row = rng.randrange(directory.user_count)
+                permset.append({'uid': directory.uids[row], 'perm': rng.choice((4, 5, 6, 7))})
+            else:
+                row = rng.randrange(directory.group_count)
+                permset.append({'gid': directory.gids[row], 'perm': rng.choice((4, 5, 6, 7))})
+        permset.extend([{'group': 0}, {'other': 1}])
+        acls.append({'defaultPermset': permset, 'permset': permset})
+
+    return {
+        'data': acls,
+        'uver': UVER,
+        'result': 'succ',
+        'reqid': reqid,
+    }
+
+
+_directory: UserDirectory | None = None
+
+
+def get_user_directory() -> UserDirectory | None:
+    """Get the configured user directory."""
+    return _directory
+
+
+def configure_user_directory(users: int = 0, groups: int = 0) -> None:
+    """Configure the synthetic user directory.
+
+    Args:
+        users: Number of users (0 to use the static fixtures)
+        groups: Number of groups
+    """
+    global _directory
+    if users <= 0:
+        _directory = None
+        return
+    _directory = UserDirectory(users, groups)
+    logger.info(f'User directory ready: {users} users, {_directory.group_count} groups')
+
+
+_BUILDERS = {
+    'user.list': build_user_list_response,
+    'user.listUG': build_list_ug_response,
+    'user.groupUsers': build_group_users_response,
+    'user.info': build_user_info_response,
+    'file.getAcl': build_get_acl_response,
+}
+
+
+def build_directory_response(
+    directory: UserDirectory,
+    req: str,
+    request: dict[str, Any],
+    reqid: str,
+) -> dict[str, Any] | None:
+    """Build a user.*/file.getAcl response from the directory.
+
+    Args:
+        directory: User directory
+        req: Request type
+        request: Parsed request dictionary
+        reqid: Request ID
+
+    Returns:
+        Response dictionary, or None if the directory does not model ``req``
+    """
+    builder = _BUILDERS.get(req)
+    if builder is None:
+        return None
+    return builder(directory, request, reqid)
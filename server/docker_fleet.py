@@ -0,0 +1,308 @@
+"""Synthetic container fleet for the dockermgr endpoints.
+
+``appcgi.dockermgr.containerList``、``composeList`` 与 ``stats`` 默认返回
+``responses/`` 中的少量静态容器。配置 ``--containers N`` 后改由本模块生成
+N 个容器：
+
+- 容器的静态属性（ID、名称、镜像等）在启动时生成一次；
+- CPU、内存、网络统计保存在 NumPy 数组中，每个 tick 用一次向量化运算推进；
+- tick 按需推进（距上次 tick 超过间隔时才计算），同一 tick 内所有客户端共享
+  同一份 stats 结果及其 JSON 文本，每个请求只拼接 reqid，因此 5000 个容器、
+  1 Hz、多客户端的开销基本与客户端数无关。
+
+需要安装 numpy（``pip install fnos-mock-server[fleet]``）。numpy 在首次创建
+容器集群时才导入，未配置 ``--containers`` 时不影响启动时间。
+"""
+
+import hashlib
+import logging
+import time
+from typing import Any
+
+from server import codec
+from server.responses import PrebuiltResponse, get_response_file_path, load_json_response
+
+
+logger = logging.getLogger(__name__)
+
+
+# 默认每秒推进一次
+DEFAULT_TICK_INTERVAL = 1.0
+
+# 可以预先序列化的视图（ContainerFleet 的方法名）
+VIEWS = ('stats', 'containers', 'compose')
+
+# numpy 模块（由 _import_numpy 在首次使用时导入）
+np = None
+
+
+def _import_numpy() -> bool:
+    """Import numpy on first use.
+
+    Returns:
+        Whether numpy is installed
+    """
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:  # pragma: no cover - 可选依赖
+            return False
+        np = numpy
+    return True
+
+
+class ContainerFleet:
+    """Container fleet with vectorized resource statistics."""
+
+    def __init__(
+        self,
+        count: int,
+        projects: int | None = None,
+        templates: list[dict[str, Any]] | None = None,
+        running_ratio: float = 0.9,
+        tick_interval: float = DEFAULT_TICK_INTERVAL,
+        seed: int = 0,
+    ) -> None:
+        """Generate a fleet.
+
+        Args:
+            count: Number of containers
+            projects: Number of compose projects (default: count // 4)
+            templates: Container rows used for image/command/port fields
+            running_ratio: Fraction of running containers
+            tick_interval: Minimum seconds between two statistic steps
+            seed: Random seed
+
+        Raises:
+            RuntimeError: If numpy is not installed
+        """
+        if not _import_numpy():
+            raise RuntimeError('numpy is required for the container fleet: pip install numpy')
+
+        self.count = count
+        self.projects = max(1, projects if projects else count // 4)
+        self.tick_interval = tick_interval
+        self._rng = np.random.default_rng(seed)
+        templates = templates or [{}]
+
+        rng = self._rng
+        now = int(time.time())
+        self.project_of = rng.integers(0, self.projects, count)
+        self.running = rng.random(count) < running_ratio
+        self.created = now - rng.integers(3600, 365 * 86400, count)
+        template_of = rng.integers(0, len(templates), count)
+
+        self.ids = [
+            hashlib.sha256(f'container-{seed}-{i}'.encode()).hexdigest() for i in range(count)
+        ]
+        self.project_names = [f'project-{p:04d}' for p in range(self.projects)]
+
+        # 资源统计：CPU 使用率（0-1）、内存（字节）、网络速率（字节/秒）
+        self.mem_limit = rng.choice([256, 512, 1024, 2048, 4096], count) * 1024 * 1024
+        self.cpu = rng.random(count) * 0.05
+        self.mem = self.mem_limit * (0.2 + 0.3 * rng.random(count))
+        self.rx = np.zeros(count)
+        self.tx = np.zeros(count)
+        self._last_tick = time.monotonic()
+        self._stats_rsp: dict[str, dict[str, Any]] | None = None
+        # 视图名到 rsp 的 JSON 文本；stats 的文本在每个 tick 失效
+        self._encoded: dict[str, str] = {}
+
+        self._containers = self._build_containers(templates, template_of)
+        self._compose = self._build_compose()
+
+    def _build_containers(
+        self,
+        templates: list[dict[str, Any]],
+        template_of: 'np.ndarray',
+    ) -> list[dict[str, Any]]:
+        """Build the containerList rows once."""
+        containers = []
+        uptime_days = (time.time() - self.created) // 86400
+        for i, (cid, project, running, created, template, days) in enumerate(zip(
+            self.ids,
+            self.project_of.tolist(),
+            self.running.tolist(),
+            self.created.tolist(),
+            template_of.tolist(),
+            uptime_days.tolist(),
+        )):
+            template = templates[template]
+            name = self.project_names[project]
+            containers.append({
+                'Id': cid,
+                'Command': template.get('Command', ''),
+                'Created': created,
+                'HostConfig': {'NetworkMode': f'{name}_default'},
+                'Image': template.get('Image', ''),
+                'ImageID': template.get('ImageID', ''),
+                'Names': [f'/{name}-svc-{i}'],
+                'State': 'running' if running else 'exited',
+                'Status': f'Up {int(days)} days' if running else 'Exited (0)',
+                'Project': name,
+                'Icon': '',
+                'Ports': template.get('Ports', []),
+            })
+        return containers
+
+    def _build_compose(self) -> list[dict[str, Any]]:
+        """Build the composeList rows from per-project counts."""
+        total = np.bincount(self.project_of, minlength=self.projects)
+        running = np.bincount(self.project_of, weights=self.running, minlength=self.projects)
+        created = int(time.time() * 1000)
+        compose = []
+        for name, n_total, n_running in zip(
+            self.project_names, total.tolist(), running.astype(int).tolist()
+        ):
+            if not n_total:
+                continue
+            counts = {'total': n_total}
+            if n_running:
+                counts['running'] = n_running
+            if n_total - n_running:
+                counts['exited'] = n_total - n_running
+            compose.append({
+                'Created': created,
+                'Name': name,
+                'ConfigFiles': f'home/user/{name}/docker-compose.yml',
+                'Folder': f'home/user/{name}',
+                'Status': 'ready',
+                'Containers': counts,
+            })
+        return compose
+
+    def step(self) -> None:
+        """Advance all statistics by one vectorized step."""
+        rng = self._rng
+        n = self.count
+        running = self.running
+
+        self.cpu = np.clip(self.cpu + rng.normal(0.0, 0.01, n), 0.0, 1.0) * running
+        self.mem = np.clip(
+            self.mem * (1.0 + rng.normal(0.0, 0.01, n)), 8 * 1024 * 1024, self.mem_limit
+        ) * running
+        self.rx = rng.exponential(64 * 1024, n) * running
+        self.tx = rng.exponential(16 * 1024, n) * running
+        self._stats_rsp = None
+        self._encoded.pop('stats', None)
+
+    def maybe_tick(self, now: float | None = None) -> None:
+        """Advance the statistics if the tick interval has elapsed.
+
+        Args:
+            now: Monotonic time (default: now)
+        """
+        now = time.monotonic() if now is None else now
+        if now - self._last_tick >= self.tick_interval:
+            self._last_tick = now
+            self.step()
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        """Return the stats ``rsp`` of running containers for the current tick.
+
+        Returns:
+            Container ID to statistics (shared between callers, do not modify)
+        """
+        self.maybe_tick()
+        if self._stats_rsp is None:
+            index = np.flatnonzero(self.running)
+            ids = self.ids
+            self._stats_rsp = {
+                ids[i]: {
+                    'cpuUsage': cpu,
+                    'usedMem': mem,
+                    'networkRx': rx,
+                    'networkTx': tx,
+                }
+                for i, cpu, mem, rx, tx in zip(
+                    index.tolist(),
+                    self.cpu[index].tolist(),
+                    self.mem[index].astype(np.int64).tolist(),
+                    self.rx[index].astype(np.int64).tolist(),
+                    self.tx[index].astype(np.int64).tolist(),
+                )
+            }
+        return self._stats_rsp
+
+    def containers(self) -> list[dict[str, Any]]:
+        """Return the containerList ``rsp`` (shared, do not modify)."""
+        return self._containers
+
+    def compose(self) -> list[dict[str, Any]]:
+        """Return the composeList ``rsp`` (shared, do not modify)."""
+        return self._compose
+
+    def encoded(self, view: str) -> tuple[Any, str]:
+        """Return the ``rsp`` of a view and its JSON text for the current tick.
+
+        Args:
+            view: One of ``VIEWS``
+
+        Returns:
+            Shared ``rsp`` payload and its serialized text
+        """
+        rsp = getattr(self, view)()
+        text = self._encoded.get(view)
+        if text is None:
+            text = self._encoded[view] = codec.dumps(rsp)
+        return rsp, text
+
+
+_fleet: ContainerFleet | None = None
+
+
+def get_container_fleet() -> ContainerFleet | None:
+    """Get the configured container fleet."""
+    return _fleet
+
+
+def configure_container_fleet(
+    count: int = 0,
+    projects: int | None = None,
+    tick_interval: float = DEFAULT_TICK_INTERVAL,
+    templates: list[dict[str, Any]] | None = None,
+) -> None:
+    """Configure the synthetic container fleet.
+
+    Args:
+        count: Number of containers (0 to use the static fixtures)
+        projects: Number of compose projects
+        tick_interval: Minimum seconds between two statistic steps
+        templates: Container rows used for image/command/port fields
+            (default: rows of the static containerList fixture)
+    """
+    global _fleet
+    if count <= 0:
+        _fleet = None
+        return
+
+    if templates is None:
+        fixture = load_json_response(get_response_file_path('appcgi.dockermgr.containerList'))
+        templates = fixture['rsp']
+
+    start = time.perf_counter()
+    _fleet = ContainerFleet(count, projects, templates, tick_interval=tick_interval)
+    logger.info(
+        f'Container fleet ready: {count} containers in {_fleet.projects} projects '
+        f'({time.perf_counter() - start:.2f}s)'
+    )
+
+
+def build_docker_response(fleet: ContainerFleet, view: str, reqid: str) -> PrebuiltResponse:
+    """Build a dockermgr response around a fleet view.
+
+    ``rsp`` 的 JSON 文本按 tick 缓存，这里只序列化 reqid 并拼接。
+
+    Args:
+        fleet: Container fleet
+        view: One of ``VIEWS``
+        reqid: Request ID
+
+    Returns:
+        Response dictionary with its pre-built JSON text
+    """
+    rsp, rsp_text = fleet.encoded(view)
+    response = PrebuiltResponse(reqid=reqid, result='succ', rsp=rsp)
+    response.text = f'{{"reqid":{codec.dumps(reqid)},"result":"succ","rsp":{rsp_text}}}'
+    return response
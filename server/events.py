@@ -0,0 +1,547 @@
+"""Indexed, paginated event and notification history for fnOS Mock Server.
+
+``appcgi.eventlogger.common.list`` 与 ``notify.list`` 的历史记录以列式数组
+保存，并按时间升序排列：
+
+- 时间范围查询用 ``bisect`` 在时间列上二分；
+- 分类查询（如 ``module``/``level``/``cat``）使用预先建立的倒排索引
+  （按时间有序的行号数组），组合分类的索引在首次使用时建立，缓存最近使用的
+  ``COMBINED_INDEX_CACHE_SIZE`` 个（过滤值来自客户端，缓存需有上限）；
+- 分页支持 offset/limit 与游标（最后一条记录的行号），每页只读取本页的行，
+  不扫描、不复制完整历史。
+
+记录可以由内置模板生成（``--events``/``--notifications``），也可以从 JSON
+文件导入（``--events-file``/``--notifications-file``）。
+"""
+
+import json
+import logging
+import math
+import random
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Iterable, Sequence
+
+from server.responses import get_response_file_path, load_json_response
+from server.utils import get_int_param, get_page_params
+
+
+logger = logging.getLogger(__name__)
+
+
+# 缓存的组合分类索引数（按最近使用淘汰）
+COMBINED_INDEX_CACHE_SIZE = 64
+
+_EMPTY_POSTING = array('q')
+
+
+@dataclass(frozen=True)
+class Page:
+    """One page of query results (newest first).
+
+    Attributes:
+        total: Number of records matching the query
+        rows: Records of this page
+        next_cursor: Cursor of the next page, or None when exhausted
+    """
+
+    total: int
+    rows: list[dict[str, Any]]
+    next_cursor: str | None
+
+
+class EventStore:
+    """Columnar, time-sorted record store with bisect-based lookups."""
+
+    def __init__(
+        self,
+        columns: dict[str, Sequence[Any]],
+        time_field: str,
+        category_fields: Iterable[str] = (),
+    ) -> None:
+        """Create a store from columns already sorted by time.
+
+        Args:
+            columns: Column name to values; all columns have the same length
+            time_field: Name of the (ascending) time column
+            category_fields: Columns to index for category queries
+        """
+        self._columns = columns
+        self._fields = tuple(columns)
+        self.time_field = time_field
+        self._times = columns[time_field]
+        self._size = len(self._times)
+        self.category_fields = tuple(category_fields)
+        # 单字段索引在构建时建立且不变；组合分类的索引单独按最近使用缓存
+        self._indexes: dict[tuple[tuple[str, Any], ...], array] = {}
+        self._combined: OrderedDict[tuple[tuple[str, Any], ...], array] = OrderedDict()
+
+        for name in self.category_fields:
+            postings: dict[Any, array] = {}
+            for row, value in enumerate(columns[name]):
+                posting = postings.get(value)
+                if posting is None:
+                    posting = postings[value] = array('q')
+                posting.append(row)
+            for value, posting in postings.items():
+                self._indexes[((name, value),)] = posting
+
+    def __len__(self) -> int:
+        return self._size
+
+    @classmethod
+    def from_rows(
+        cls,
+        rows: Iterable[dict[str, Any]],
+        time_field: str,
+        id_field: str,
+        category_fields: Iterable[str] = (),
+    ) -> 'EventStore':
+        """Build a store from row dictionaries (e.g. imported from JSON).
+
+        Args:
+            rows: Records in any order
+            time_field: Name of the time field
+            id_field: Name of the ID field, used as sort tie-breaker
+            category_fields: Fields to index for category queries
+
+        Returns:
+            Event store
+        """
+        rows = sorted(rows, key=lambda r: (r.get(time_field, 0), r.get(id_field, 0)))
+        fields: dict[str, None] = {}
+        for row in rows:
+            fields.update(dict.fromkeys(row))
+
+        columns: dict[str, Sequence[Any]] = {}
+        for name in fields:
+            values = [row.get(name) for row in rows]
+            if all(type(v) is int for v in values):
+                columns[name] = array('q', values)
+            else:
+                columns[name] = values
+        return cls(columns, time_field, category_fields)
+
+    def row(self, index: int) -> dict[str, Any]:
+        """Materialize one record.
+
+        Args:
+            index: Row index
+
+        Returns:
+            Record dictionary (fields with None values are omitted)
+        """
+        record = {}
+        for name in self._fields:
+            value = self._columns[name][index]
+            if value is not None:
+                record[name] = value
+        return record
+
+    def is_int_field(self, field: str) -> bool:
+        """Return whether a column holds integers.
+
+        Args:
+            field: Column name
+        """
+        return isinstance(self._columns.get(field), array)
+
+    def count(self, field: str, value: Any) -> int:
+        """Count records with a category value.
+
+        Args:
+            field: Indexed category field
+            value: Category value
+
+        Returns:
+            Number of matching records
+        """
+        posting = self._indexes.get(((field, value),))
+        return len(posting) if posting is not None else 0
+
+    def _positions(self, filters: dict[str, Any]) -> Sequence[int]:
+        """Return ascending row indexes matching the category filters."""
+        if not filters:
+            return range(self._size)
+
+        key = tuple(sorted(filters.items()))
+        posting = self._indexes.get(key)
+        if posting is not None:
+            return posting
+        posting = self._combined.get(key)
+        if posting is not None:
+            self._combined.move_to_end(key)
+            return posting
+
+        # 组合分类：从最小的单字段索引过滤出结果；不存在的分类值直接返回空结果
+        candidates: Sequence[int] = range(self._size)
+        for name, value in key:
+            if name in self.category_fields:
+                single = self._indexes.get(((name, value),), _EMPTY_POSTING)
+                if len(single) < len(candidates):
+                    candidates = single
+        if not candidates:
+            return _EMPTY_POSTING
+        posting = array('q', (
+            row for row in candidates
+            if all(self._columns[name][row] == value for name, value in key)
+        ))
+        if not posting:
+            return _EMPTY_POSTING
+
+        self._combined[key] = posting
+        if len(self._combined) > COMBINED_INDEX_CACHE_SIZE:
+            self._combined.popitem(last=False)
+        logger.debug(f'Built index for {key}: {len(posting)} rows')
+        return posting
+
+    def query(
+        self,
+        start_time: int | None = None,
+        end_time: int | None = None,
+        filters: dict[str, Any] | None = None,
+        offset: int = 0,
+        limit: int = 50,
+        cursor: str | None = None,
+    ) -> Page:
+        """Query one page of records, newest first.
+
+        Args:
+            start_time: Inclusive lower time bound
+            end_time: Inclusive upper time bound
+            filters: Category field to required value
+            offset: Records to skip (after the cursor)
+            limit: Page size
+            cursor: ``next_cursor`` of the previous page
+
+        Returns:
+            Page of records
+        """
+        positions = self._positions(filters or {})
+        times = self._times
+
+        def time_of(row: int) -> int:
+            return times[row]
+
+        lo = 0
+        hi = len(positions)
+        if start_time is not None:
+            lo = bisect_left(positions, start_time, key=time_of)
+        if end_time is not None:
+            hi = bisect_right(positions, end_time, key=time_of)
+        hi = max(hi, lo)
+        total = hi - lo
+
+        end = hi
+        if cursor is not None:
+            end = min(end, bisect_left(positions, int(cursor), lo, hi))
+        end = max(lo, end - max(offset, 0))
+        start = max(lo, end - max(limit, 0))
+
+        rows = [self.row(positions[i]) for i in range(end - 1, start - 1, -1)]
+        next_cursor = str(positions[start]) if start > lo else None
+        return Page(total, rows, next_cursor)
+
+
+# 事件日志与通知历史（未配置时使用 responses/ 中的静态响应）
+_event_store: EventStore | None = None
+_notify_store: EventStore | None = None
+
+EVENT_CATEGORY_FIELDS = ('level', 'module', 'username')
+NOTIFY_CATEGORY_FIELDS = ('cat', 'level', 'from', 'read')
+
+DEFAULT_EVENT_LIMIT = 50
+DEFAULT_NOTIFY_LIMIT = 20
+
+
+def get_event_store() -> EventStore | None:
+    """Get the configured event log store."""
+    return _event_store
+
+
+def get_notify_store() -> EventStore | None:
+    """Get the configured notification store."""
+    return _notify_store
+
+
+def generate_events(
+    templates: list[dict[str, Any]],
+    count: int,
+    end_time: int | None = None,
+    mean_interval: float = 10.0,
+    seed: int = 0,
+) -> EventStore:
+    """Generate an event log from template rows.
+
+    模板的字符串字段在所有记录间共享，内存主要是整数列。
+
+    Args:
+        templates: Template rows (e.g. rows of the static fixture)
+        count: Number of events
+        end_time: Time of the newest event (default: now)
+        mean_interval: Mean seconds between events
+        seed: Random seed
+
+    Returns:
+        Event store
+    """
+    rng = random.Random(seed)
+    end_time = int(time.time()) if end_time is None else end_time
+
+    # 从最新事件向前生成时间戳，再翻转为升序
+    times = array('q', bytes(8 * count))
+    t = float(end_time)
+    for i in range(count - 1, -1, -1):
+        times[i] = int(t)
+        t -= rng.expovariate(1.0 / mean_interval)
+
+    picks = [rng.randrange(len(templates)) for _ in range(count)]
+    first_id = 1
+    columns: dict[str, Sequence[Any]] = {
+        'level': array('q', (rng.choices((0, 1, 2), (90, 8, 2))[0] for _ in range(count))),
+        'module': array('q', (rng.randint(1, 6) for _ in range(count))),
+        'id': array('q', range(first_id, first_id + count)),
+        'eventtm': times,
+        'username': [templates[p].get('username') for p in picks],
+        'content': [templates[p].get('content') for p in picks],
+    }
+    return EventStore(columns, 'eventtm', EVENT_CATEGORY_FIELDS)
+
+
+def generate_notifications(
+    templates: list[dict[str, Any]],
+    count: int,
+    end_time: int | None = None,
+    mean_interval: float = 3600.0,
+    seed: int = 0,
+) -> EventStore:
+    """Generate a notification history from template rows.
+
+    Args:
+        templates: Template rows (e.g. ``notifyList`` of the static fixture)
+        count: Number of notifications
+        end_time: Time of the newest notification (default: now)
+        mean_interval: Mean seconds between notifications
+        seed: Random seed
+
+    Returns:
+        Notification store
+    """
+    rng = random.Random(seed)
+    end_time = int(time.time()) if end_time is None else end_time
+
+    times = array('q', bytes(8 * count))
+    t = float(end_time)
+    for i in range(count - 1, -1, -1):
+        times[i] = int(t)
+        t -= rng.expovariate(1.0 / mean_interval)
+
+    picks = [rng.randrange(len(templates)) for _ in range(count)]
+    columns: dict[str, Sequence[Any]] = {
+        'id': array('q', range(1, count + 1)),
+        'from': [templates[p].get('from') for p in picks],
+        'cat': array('q', (rng.randint(1, 3) for _ in range(count))),
+        'level': array('q', (rng.randint(1, 3) for _ in range(count))),
+        'title': [templates[p].get('title') for p in picks],
+        'content': [templates[p].get('content') for p in picks],
+        'datetime': times,
+        'anchor': [templates[p].get('anchor', '') for p in picks],
+        'read': array('q', (rng.choices((0, 1), (1, 4))[0] for _ in range(count))),
+        'data': [templates[p].get('data') for p in picks],
+    }
+    return EventStore(columns, 'datetime', NOTIFY_CATEGORY_FIELDS)
+
+
+def _load_rows(file_path: str, list_keys: tuple[str, ...]) -> list[dict[str, Any]]:
+    """Load rows from a JSON array or a response-shaped JSON file."""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    for key in list_keys:
+        if isinstance(data, dict) and key in data:
+            data = data[key]
+    if not isinstance(data, list):
+        raise ValueError(f'No rows found in {file_path}')
+    return data
+
+
+def _fixture_rows(req: str, *keys: str) -> list[dict[str, Any]]:
+    """Return the rows of a static fixture to use as generation templates."""
+    data: Any = load_json_response(get_response_file_path(req))
+    for key in keys:
+        data = data[key]
+    return data
+
+
+def configure_events(
+    count: int = 0,
+    file_path: str | None = None,
+    templates: list[dict[str, Any]] | None = None,
+) -> None:
+    """Configure the event log store.
+
+    Args:
+        count: Number of events to generate (0 to disable generation)
+        file_path: JSON file to import (rows array or a common.list response)
+        templates: Template rows for generation (default: static fixture rows)
+    """
+    global _event_store
+    if file_path:
+        rows = _load_rows(file_path, ('data', 'rows'))
+        _event_store = EventStore.from_rows(rows, 'eventtm', 'id', EVENT_CATEGORY_FIELDS)
+    elif count > 0:
+        if templates is None:
+            templates = _fixture_rows('appcgi.eventlogger.common.list', 'data', 'rows')
+        _event_store = generate_events(templates, count)
+    else:
+        _event_store = None
+        return
+    logger.info(f'Event log store ready: {len(_event_store)} events')
+
+
+def configure_notifications(
+    count: int = 0,
+    file_path: str | None = None,
+    templates: list[dict[str, Any]] | None = None,
+) -> None:
+    """Configure the notification store.
+
+    Args:
+        count: Number of notifications to generate (0 to disable generation)
+        file_path: JSON file to import (rows array or a notify.list response)
+        templates: Template rows for generation (default: static fixture rows)
+    """
+    global _notify_store
+    if file_path:
+        rows = _load_rows(file_path, ('notifyList',))
+        _notify_store = EventStore.from_rows(rows, 'datetime', 'id', NOTIFY_CATEGORY_FIELDS)
+    elif count > 0:
+        if templates is None:
+            templates = _fixture_rows('notify.list', 'notifyList')
+        _notify_store = generate_notifications(templates, count)
+    else:
+        _notify_store = None
+        return
+    logger.info(f'Notification store ready: {len(_notify_store)} notifications')
+
+
+def _query_store(
+    store: EventStore,
+    request: dict[str, Any],
+    default_limit: int,
+) -> tuple[Page, int]:
+    """Run a store query from request parameters.
+
+    支持 offset/limit、page/pageSize（从 1 开始）、cursor、startTime/endTime
+    以及各分类字段作为过滤条件。
+
+    Returns:
+        Page and the effective page size
+
+    Raises:
+        ValueError: If a parameter has the wrong type
+    """
+    offset, limit = get_page_params(request, default_limit)
+
+    # 过滤值用作索引的键，只接受标量（整数列只接受整数）
+    filters: dict[str, Any] = {}
+    for name in store.category_fields:
+        if store.is_int_field(name):
+            value = get_int_param(request, name, None)
+        else:
+            value = request.get(name)
+            if value is not None and not isinstance(value, (str, int, float)):
+                raise ValueError(f'Parameter "{name}" must be a string or number: {value!r}')
+        if value is not None:
+            filters[name] = value
+
+    cursor = get_int_param(request, 'cursor', None)
+    page = store.query(
+        start_time=get_int_param(request, 'startTime', None),
+        end_time=get_int_param(request, 'endTime', None),
+        filters=filters,
+        offset=offset if cursor is None else get_int_param(request, 'offset', 0),
+        limit=limit,
+        cursor=str(cursor) if cursor is not None else None,
+    )
+    return page, limit
+
+
+def build_event_list_response(
+    store: EventStore,
+    request: dict[str, Any],
+    reqid: str,
+) -> dict[str, Any]:
+    """Build response for appcgi.eventlogger.common.list from the event store.
+
+    Args:
+        store: Event log store
+        request: Parsed request dictionary
+        reqid: Request ID
+
+    Returns:
+        Response dictionary
+    """
+    page, _ = _query_store(store, request, DEFAULT_EVENT_LIMIT)
+    return {
+        'data': {
+            'total': page.total,
+            'rows': page.rows,
+            'nextCursor': page.next_cursor,
+        },
+        'reqid': reqid,
+        'result': 'succ',
+        'rev': '0.1',
+        'req': 'appcgi.eventlogger.common.list',
+    }
+
+
+def build_notify_list_response(
+    store: EventStore,
+    request: dict[str, Any],
+    reqid: str,
+) -> dict[str, Any]:
+    """Build response for notify.list from the notification store.
+
+    Args:
+        store: Notification store
+        request: Parsed request dictionary
+        reqid: Request ID
+
+    Returns:
+        Response dictionary
+    """
+    page, limit = _query_store(store, request, DEFAULT_NOTIFY_LIMIT)
+    offset = get_int_param(request, 'offset', None)
+    if offset is None:
+        current = max(get_int_param(request, 'page', 1), 1)
+    else:
+        current = offset // limit + 1 if limit else 1
+    return {
+        'total': page.total,
+        'page': current,
+        'pageTotal': math.ceil(page.total / limit) if limit else 0,
+        'notifyList': page.rows,
+        'nextCursor': page.next_cursor,
+        'result': 'succ',
+        'reqid': reqid,
+    }
+
+
+def build_notify_unread_total_response(store: EventStore, reqid: str) -> dict[str, Any]:
+    """Build response for notify.unreadTotal from the notification store.
+
+    Args:
+        store: Notification store
+        reqid: Request ID
+
+    Returns:
+        Response dictionary
+    """
+    return {
+        'unreadTotal': store.count('read', 0),
+        'result': 'succ',
+        'reqid': reqid,
+    }
@@ -0,0 +1,279 @@
+"""Fault injection and connect/accept rate accounting.
+
+用于观察大量客户端在 NAS 重启等故障下的行为（重连风暴）。``--faults``
+可以注入以下故障：
+
+- ``drop``：按比例挑选连接，在建立后 ``drop-after`` 秒内的随机时刻异常断开；
+- ``refuse``：启动后的若干秒内拒绝新连接（WebSocket 握手失败）；
+- ``accept-delay``：每个新连接在握手前等待若干毫秒；
+- ``corrupt`` / ``truncate``：按比例翻转响应帧中一个字符的一位，或截断响应帧。
+
+``POST /debug/faults/restart`` 可以在运行时模拟一次重启：断开一部分（默认全部）
+现有连接，并在一段时间内拒绝新连接。
+
+连接尝试与成功建立的连接按秒计数（固定大小的环形数组），``/debug/faults``
+报告最近的连接速率与峰值。接入路径上只有计数与一次时间比较，未注入故障时
+不会包装发送函数，也不会创建定时器。
+"""
+
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Awaitable, Callable
+
+from server.connections import ConnectionInfo, get_connection_manager
+
+
+logger = logging.getLogger(__name__)
+
+
+# 速率统计保留的秒数
+RATE_WINDOW = 60
+
+DEFAULT_DROP_AFTER = 5.0
+
+FAULT_KEYS = ('drop', 'drop-after', 'refuse', 'accept-delay', 'corrupt', 'truncate')
+
+
+def parse_fault_spec(spec: str | None) -> dict[str, float]:
+    """Parse ``name=VALUE,...`` into fault settings.
+
+    Args:
+        spec: e.g. ``drop=0.1,accept-delay=20,corrupt=0.01``
+
+    Returns:
+        Settings keyed by fault name
+
+    Raises:
+        ValueError: If a name is unknown or a fraction is outside [0, 1]
+    """
+    settings = {}
+    for part in (spec or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        name, sep, value = part.partition('=')
+        name = name.strip()
+        if not sep or name not in FAULT_KEYS:
+            raise ValueError(f'Expected one of {", ".join(FAULT_KEYS)} as name=VALUE: {part}')
+        number = float(value)
+        if number < 0 or (name in ('drop', 'corrupt', 'truncate') and number > 1):
+            raise ValueError(f'Invalid {name}: {value}')
+        settings[name] = number
+    return settings
+
+
+class RateMeter:
+    """Events per second over the last ``RATE_WINDOW`` seconds."""
+
+    __slots__ = ('counts', 'second', 'total', 'peak')
+
+    def __init__(self) -> None:
+        self.counts = [0] * RATE_WINDOW
+        self.second = int(time.monotonic())
+        self.total = 0
+        self.peak = 0
+
+    def _roll(self, second: int) -> None:
+        """Advance to ``second``, clearing the slots of the skipped seconds."""
+        last = self.counts[self.second % RATE_WINDOW]
+        if last > self.peak:
+            self.peak = last
+        for skipped in range(self.second + 1, min(second, self.second + RATE_WINDOW) + 1):
+            self.counts[skipped % RATE_WINDOW] = 0
+        self.second = second
+
+    def add(self) -> None:
+        """Count one event."""
+        second = int(time.monotonic())
+        if second != self.second:
+            self._roll(second)
+        self.counts[second % RATE_WINDOW] += 1
+        self.total += 1
+
+    def rate(self, window: int) -> float:
+        """Average events per second over the last ``window`` complete seconds."""
+        second = int(time.monotonic())
+        if second != self.second:
+            self._roll(second)
+        window = min(window, RATE_WINDOW - 1)
+        count = sum(self.counts[(second - i) % RATE_WINDOW] for i in range(1, window + 1))
+        return round(count / window, 1)
+
+    def to_dict(self) -> dict[str, Any]:
+        current = self.counts[self.second % RATE_WINDOW]
+        return {
+            'total': self.total,
+            'last1s': self.rate(1),
+            'last10s': self.rate(10),
+            'last60s': self.rate(RATE_WINDOW - 1),
+            'peakPerSec': max(self.peak, current),
+        }
+
+
+class FaultInjector:
+    """Inject connection and frame faults."""
+
+    def __init__(self, settings: dict[str, float] | None = None, seed: int | None = None) -> None:
+        """Create the injector.
+
+        Args:
+            settings: Fault settings from ``parse_fault_spec`` (empty for none)
+            seed: Random seed for reproducible fault sequences
+        """
+        settings = settings or {}
+        self.drop = settings.get('drop', 0.0)
+        self.drop_after = settings.get('drop-after', DEFAULT_DROP_AFTER)
+        self.accept_delay = settings.get('accept-delay', 0.0) / 1000
+        self.corrupt = settings.get('corrupt', 0.0)
+        self.truncate = settings.get('truncate', 0.0)
+        refuse = settings.get('refuse', 0.0)
+        self.refuse_until = time.monotonic() + refuse if refuse else 0.0
+        self.random = random.Random(seed)
+        self._aborting: set[asyncio.Task] = set()
+
+        self.connects = RateMeter()
+        self.accepts = RateMeter()
+        self.counters = {
+            'refused': 0, 'delayed': 0, 'dropped': 0, 'corrupted': 0, 'truncated': 0,
+        }
+
+    @property
+    def refusing(self) -> bool:
+        """Whether new connections are currently refused."""
+        return bool(self.refuse_until) and time.monotonic() < self.refuse_until
+
+    async def admit(self) -> bool:
+        """Account a connection attempt and decide whether to accept it.
+
+        传输层在 WebSocket 握手之前调用。
+
+        Returns:
+            False if the connection must be refused
+        """
+        self.connects.add()
+        if self.refuse_until:
+            if time.monotonic() < self.refuse_until:
+                self.counters['refused'] += 1
+                return False
+            self.refuse_until = 0.0
+        if self.accept_delay:
+            self.counters['delayed'] += 1
+            await asyncio.sleep(self.accept_delay)
+        return True
+
+    def attach(
+        self,
+        info: ConnectionInfo,
+        send: Callable[[str], Awaitable[None]],
+    ) -> Callable[[str], Awaitable[None]]:
+        """Apply connection faults to an accepted connection.
+
+        Args:
+            info: Connection bookkeeping (its ``abort`` is used to drop it)
+            send: Coroutine function sending one response frame
+
+        Returns:
+            ``send``, wrapped when frames are corrupted or truncated
+        """
+        self.accepts.add()
+        if self.drop and self.random.random() < self.drop:
+            delay = self.random.uniform(0, self.drop_after)
+            asyncio.get_running_loop().call_later(delay, self._drop, info)
+        if self.corrupt or self.truncate:
+            return self._mangling_send(send)
+        return send
+
+    def _drop(self, info: ConnectionInfo) -> None:
+        """Abort a connection if it is still open."""
+        if not info.open or info.abort is None:
+            return
+        self.counters['dropped'] += 1
+        task = asyncio.get_running_loop().create_task(info.abort())
+        self._aborting.add(task)
+        task.add_done_callback(self._aborting.discard)
+
+    def mangle(self, frame: str) -> str:
+        """Corrupt or truncate a response frame according to the fault rates."""
+        rand = self.random
+        if self.truncate and rand.random() < self.truncate and frame:
+            self.counters['truncated'] += 1
+            return frame[:rand.randrange(len(frame))]
+        if self.corrupt and rand.random() < self.corrupt and frame:
+            self.counters['corrupted'] += 1
+            index = rand.randrange(len(frame))
+            # 翻转 0x20 位：字母变换大小写，引号、括号等结构字符变为其他字符
+            return frame[:index] + chr(ord(frame[index]) ^ 0x20) + frame[index + 1:]
+        return frame
+
+    def _mangling_send(
+        self,
+        send: Callable[[str], Awaitable[None]],
+    ) -> Callable[[str], Awaitable[None]]:
+        async def mangling_send(frame: str) -> None:
+            await send(self.mangle(frame))
+        return mangling_send
+
+    def restart(self, drop: float = 1.0, refuse: float = 0.0) -> int:
+        """Simulate a server restart.
+
+        Args:
+            drop: Fraction of open connections to abort
+            refuse: Seconds during which new connections are refused
+
+        Returns:
+            Number of aborted connections
+        """
+        if refuse:
+            self.refuse_until = time.monotonic() + refuse
+        victims = [
+            info for info in list(get_connection_manager().connections.values())
+            if info.abort is not None and self.random.random() < drop
+        ]
+        for info in victims:
+            self._drop(info)
+        logger.info(f'Simulated restart: dropped {len(victims)} connections, refusing for {refuse}s')
+        return len(victims)
+
+    def summary(self) -> dict[str, Any]:
+        """Fault settings, counters and connect/accept rates."""
+        return {
+            'faults': {
+                'drop': self.drop,
+                'dropAfter': self.drop_after,
+                'acceptDelayMs': self.accept_delay * 1000,
+                'corrupt': self.corrupt,
+                'truncate': self.truncate,
+                'refusingFor': round(max(0.0, self.refuse_until - time.monotonic()), 3),
+            },
+            'counters': dict(self.counters),
+            'connects': self.connects.to_dict(),
+            'accepts': self.accepts.to_dict(),
+        }
+
+
+# 未注入故障时也需要统计连接速率并支持模拟重启，因此总是存在一个实例
+_injector = FaultInjector()
+
+
+def get_fault_injector() -> FaultInjector:
+    """Get the fault injector."""
+    return _injector
+
+
+def configure_faults(spec: str | None = None, seed: int | None = None) -> None:
+    """Configure fault injection.
+
+    Args:
+        spec: ``name=VALUE,...`` (see ``FAULT_KEYS``)
+        seed: Random seed for reproducible fault sequences
+
+    Raises:
+        ValueError: If the spec is invalid
+    """
+    global _injector
+    settings = parse_fault_spec(spec)
+    _injector = FaultInjector(settings, seed)
+    if settings:
+        logger.warning(f'Fault injection enabled: {settings}')
@@ -2,68 +2,97 @@
 
 import json
 import logging
+import asyncio
 import base64
-from typing import Any
-from pathlib import Path
-
-from fastapi import WebSocket, WebSocketDisconnect
-from Crypto.PublicKey import RSA
-from Crypto.Cipher import PKCS1_v1_5, AES
-from Crypto.Util.Padding import pad, unpad
-
+import functools
+import secrets
+import time
+from typing import TYPE_CHECKING, Any, Awaitable, Callable
+
+from server import codec
+from server.access_log import get_access_log
+from server.connections import ConnectionInfo, get_connection_manager
+from server.devices import Device, get_device
+from server.directory import build_directory_response, get_user_directory
+from server.docker_fleet import build_docker_response, get_container_fleet
+from server.events import (
+    build_event_list_response,
+    build_notify_list_response,
+    build_notify_unread_total_response,
+    get_event_store,
+    get_notify_store,
+)
+from server.faults import get_fault_injector
+from server.overrides import discard_connection_overrides, lookup_override
+from server.ratelimit import get_rate_limiter, peek_field
+from server.signatures import SignatureError, get_signature_verifier
+from server.storage import build_storage_response, get_storage_topology
+from server.tracing import (
+    RequestTrace, SlowRequestTracer, current_trace, get_tracer, set_current_trace
+)
+from server.writer import (
+    ConnectionWriter, SendMany, create_writer, release_writer, sequential_send_many
+)
 from server.responses import (
     build_error_response,
     build_get_hostname_response,
     build_get_rsa_pub_response,
     build_login_response,
     build_ping_response,
+    dumps_response,
     get_response_file_path,
     load_json_response,
     replace_reqid,
 )
-from server.utils import generate_random_token
+from server.utils import generate_random_token, get_rsa_private_key
+
+# FastAPI 只在 fastapi 传输下使用，raw 传输与 pytest 插件不导入它
+if TYPE_CHECKING:
+    from fastapi import WebSocket
 
 
 logger = logging.getLogger(__name__)
 
 
-async def handle_websocket(websocket: WebSocket) -> None:
+async def handle_websocket(websocket: 'WebSocket', device_id: str | None = None) -> None:
     """Handle WebSocket connection and messages.
 
     Args:
         websocket: WebSocket connection
+        device_id: Emulated device ID (None for the default device)
     """
-    await websocket.accept()
-    client_id = id(websocket)
-    logger.info(f'WebSocket client connected: {client_id}')
+    from fastapi import WebSocketDisconnect
 
+    # 故障注入：拒绝期间在握手前关闭（服务器返回 HTTP 403）
+    if not await get_fault_injector().admit():
+        await websocket.close(code=1013)
+        return
     try:
-        while True:
-            # 接收消息
-            message = await websocket.receive_text()
-            logger.debug(f'Received message from {client_id}: {message[:100]}...')
-
-            # 解析请求
-            try:
-                request = parse_request(message)
-                logger.debug(f'Parsed request: req={request.get("req")}, reqid={request.get("reqid")}')
-
-                # 路由请求到对应的处理器
-                response = route_request(request)
+        device = get_device(device_id)
+    except ValueError as e:
+        logger.warning(f'Rejected WebSocket connection: {e}')
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+    client_id = id(websocket)
+    logger.info(f'WebSocket client connected: {client_id} (device={device_id})')
 
-                # 发送响应
-                response_json = json.dumps(response, ensure_ascii=False, separators=(',', ':'))
-                await websocket.send_text(response_json)
-                logger.debug(f'Sent response to {client_id}: {response_json[:100]}...')
+    async def close_idle() -> None:
+        await websocket.close(code=1001, reason='Idle timeout')
 
-            except ValueError as e:
-                logger.error(f'Error parsing request from {client_id}: {e}')
-                error_response = {
-                    'result': 'fail',
-                    'errmsg': str(e),
-                }
-                await websocket.send_text(json.dumps(error_response))
+    async def drop() -> None:
+        # ASGI 无法直接中止 TCP 连接，以 1012（服务重启）关闭代替
+        await websocket.close(code=1012, reason='Service restart')
 
+    try:
+        await serve_messages(
+            websocket.receive_text,
+            websocket.send_text,
+            client_id,
+            device,
+            close=close_idle,
+            abort=drop,
+        )
     except WebSocketDisconnect:
         logger.info(f'WebSocket client disconnected: {client_id}')
     except Exception as e:
@@ -75,11 +104,210 @@ async def handle_websocket(websocket: WebSocket) -> None:
             pass
 
 
+async def serve_messages(
+    receive: Callable[[], Awaitable[str]],
+    send: Callable[[str], Awaitable[None]],
+    client_id: int,
+    device: Device | None = None,
+    send_many: SendMany | None = None,
+    close: Callable[[], Awaitable[None]] | None = None,
+    abort: Callable[[], Awaitable[None]] | None = None,
+) -> None:
+    """Run the request/response loop of one connection.
+
+    传输层无关：FastAPI 与 raw 两种传输都复用此循环，断开连接时由
+    ``receive`` 抛出各自的异常，交给调用方处理。响应帧经由连接的写任务
+    （``server.writer``）发送，请求处理不等待套接字写入。
+
+    Args:
+        receive: Coroutine function returning the next text frame
+        send: Coroutine function sending one text frame
+        client_id: Connection identifier used in log messages
+        device: Emulated device (None for the default device)
+        send_many: Coroutine function sending a batch of frames with one
+            transport write (default: ``send`` for each frame)
+        close: Coroutine function closing the connection, used by the idle reaper
+        abort: Coroutine function dropping the connection, used by fault injection
+    """
+    manager = get_connection_manager()
+    device_id = device.device_id if device is not None else None
+    info = manager.register(client_id, device_id, close, abort)
+    writer = create_writer(client_id, send_many or sequential_send_many(send))
+    try:
+        send = get_fault_injector().attach(info, writer.send if writer is not None else send)
+        await _serve_messages(receive, send, client_id, device, info, writer)
+    finally:
+        manager.unregister(info)
+        discard_connection_overrides(client_id)
+        verifier = get_signature_verifier()
+        if verifier is not None:
+            verifier.discard(client_id)
+        await release_writer(client_id)
+
+
+async def _serve_messages(
+    receive: Callable[[], Awaitable[str]],
+    send: Callable[[str], Awaitable[None]],
+    client_id: int,
+    device: Device | None,
+    info: ConnectionInfo,
+    writer: ConnectionWriter | None = None,
+) -> None:
+    """Request/response loop of ``serve_messages``."""
+    limiter = get_rate_limiter()
+    bucket = limiter.connection_bucket() if limiter is not None else None
+    while True:
+        # 接收消息
+        message = await receive()
+        info.last_activity = time.monotonic()
+        info.messages += 1
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f'Received message from {client_id}: {message[:100]}...')
+
+        # 限流：超限请求直接返回失败响应，或等待令牌
+        if limiter is not None:
+            req = peek_field(message, 'req') if limiter.by_req else None
+            wait = limiter.acquire(bucket, req)
+            if wait:
+                if limiter.action == 'reject':
+                    await send(build_rate_limited_response(message))
+                    continue
+                await asyncio.sleep(wait)
+
+        # 处理并发送响应
+        tracer = get_tracer()
+        if tracer is None:
+            await send(handle_message(message, client_id, device))
+            continue
+
+        trace = tracer.begin(client_id)
+        response_json = handle_message(message, client_id, device, trace)
+        start = time.perf_counter()
+        await send(response_json)
+        if writer is None:
+            _finish_trace(tracer, trace, start)
+        else:
+            # 由写任务发送：send 阶段在帧实际写出后结束，包含排队时间
+            writer.when_written(functools.partial(_finish_trace, tracer, trace, start))
+
+
+def _finish_trace(tracer: SlowRequestTracer, trace: RequestTrace, start: float) -> None:
+    """Record the send phase of a request and hand its trace to the tracer."""
+    trace.add('send', start)
+    tracer.finish(trace)
+
+
+def build_rate_limited_response(message: str) -> str:
+    """Build the serialized reply to a rate-limited request."""
+    response = build_error_response(peek_field(message, 'reqid'), 'Rate limit exceeded')
+    return codec.dumps(response)
+
+
+def handle_message(
+    message: str,
+    client_id: int,
+    device: Device | None = None,
+    trace: RequestTrace | None = None,
+) -> str:
+    """Handle one incoming text frame and build the outgoing frame.
+
+    Args:
+        message: Incoming message string
+        client_id: Connection identifier used in log messages
+        device: Emulated device (None for the default device)
+        trace: Phase trace of this request (None when tracing is disabled)
+
+    Returns:
+        Serialized response JSON
+    """
+    access_log = get_access_log()
+    start = time.perf_counter() if access_log is not None else 0.0
+    debug = logger.isEnabledFor(logging.DEBUG)
+
+    # 解析请求
+    try:
+        # 严格模式：验证并去掉签名
+        verifier = get_signature_verifier()
+        body = verifier.verify(message, client_id) if verifier is not None else message
+        request = parse_request(body)
+        if debug:
+            logger.debug(f'Parsed request: req={request.get("req")}, reqid={request.get("reqid")}')
+
+        # 路由请求到对应的处理器
+        if trace is None:
+            response = route_request(request, device, client_id)
+            response_json = dumps_response(response)
+        else:
+            response, response_json = _traced_route(request, device, trace, client_id)
+        if debug:
+            logger.debug(f'Sent response to {client_id}: {response_json[:100]}...')
+
+        # 记录访问日志（未启用时无额外开销）
+        if access_log is not None:
+            access_log.record(
+                client_id,
+                device.device_id if device is not None else None,
+                request.get('req'),
+                request.get('reqid'),
+                response.get('result'),
+                len(message),
+                len(response_json),
+                start,
+            )
+        return response_json
+
+    except SignatureError as e:
+        logger.warning(f'Rejected request from {client_id}: {e}')
+        return codec.dumps(build_error_response(peek_field(message, 'reqid'), str(e)))
+    except ValueError as e:
+        logger.error(f'Error parsing request from {client_id}: {e}')
+        error_response = {
+            'result': 'fail',
+            'errmsg': str(e),
+        }
+        return codec.dumps(error_response)
+
+
+def _traced_route(
+    request: dict[str, Any],
+    device: Device | None,
+    trace: RequestTrace,
+    client_id: int | None = None,
+) -> tuple[dict[str, Any], str]:
+    """Route and serialize a request, recording its phases.
+
+    Args:
+        request: Parsed request dictionary
+        device: Emulated device (None for the default device)
+        trace: Phase trace of this request
+        client_id: Connection identifier (for per-connection overrides)
+
+    Returns:
+        Response dictionary and serialized response JSON
+    """
+    trace.req = request.get('req')
+    trace.reqid = request.get('reqid')
+    now = trace.add('parse', trace.start)
+
+    # route 阶段内的 load/crypto 子阶段通过 current_trace() 记录
+    set_current_trace(trace)
+    try:
+        response = route_request(request, device, client_id)
+    finally:
+        set_current_trace(None)
+    now = trace.add('route', now)
+
+    response_json = dumps_response(response)
+    trace.add('encode', now)
+    return response, response_json
+
+
 def parse_request(message: str) -> dict[str, Any]:
     """Parse incoming request message.
 
     客户端发送格式: HMAC-SHA256签名 + JSON数据（拼接，无分隔符）
-    Mock 服务器忽略签名，直接解析 JSON
+    Mock 服务器忽略签名，直接解析 JSON（使用 ``server.codec`` 选择的后端）；
+    签名的验证见 ``server.signatures``
 
     Args:
         message: Incoming message string
@@ -92,47 +320,82 @@ def parse_request(message: str) -> dict[str, Any]:
     """
     # 方法1: 尝试直接解析整个消息
     try:
-        data = json.loads(message)
+        data = codec.loads(message)
         return data
-    except json.JSONDecodeError:
+    except codec.DecodeError:
         pass
 
     # 方法2: 尝试去掉签名部分（假设签名是 base64 编码，通常是44字符）
     try:
-        data = json.loads(message[44:])
+        data = codec.loads(message[44:])
         return data
-    except json.JSONDecodeError:
+    except codec.DecodeError:
         pass
 
     # 方法3: 尝试从后向前找到有效的 JSON
     # 逐字符尝试去掉前面的签名部分
     for i in range(min(100, len(message))):
         try:
-            data = json.loads(message[i:])
+            data = codec.loads(message[i:])
             logger.debug(f'Found valid JSON at offset {i}')
             return data
-        except json.JSONDecodeError:
+        except codec.DecodeError:
             continue
 
     # 如果所有方法都失败，返回错误
     raise ValueError('Invalid request format: cannot parse JSON')
 
 
-def route_request(request: dict[str, Any]) -> dict[str, Any]:
+def route_request(
+    request: dict[str, Any],
+    device: Device | None = None,
+    client_id: int | None = None,
+) -> dict[str, Any]:
     """Route request to appropriate handler.
 
     Args:
         request: Parsed request dictionary
+        device: Emulated device (None for the default device)
+        client_id: Connection identifier (for per-connection overrides)
 
     Returns:
         Response dictionary
     """
     req = request.get('req')
+    response = route_generated(request, device, client_id)
+    if response is not None:
+        return response
+    return route_fixture(req, request.get('reqid'), device)
+
+
+def route_generated(
+    request: dict[str, Any],
+    device: Device | None = None,
+    client_id: int | None = None,
+) -> dict[str, Any] | None:
+    """Build the response of a request that is not served from a response file.
+
+    覆盖响应、实时计算的响应、合成数据以及请求格式错误都在这里处理；返回
+    None 表示使用 ``responses/`` 中的响应文件（与请求的其他字段无关）。
+
+    Args:
+        request: Parsed request dictionary
+        device: Emulated device (None for the default device)
+        client_id: Connection identifier (for per-connection overrides)
+
+    Returns:
+        Response dictionary, or None for the response file of ``req``
+    """
+    req = request.get('req')
     reqid = request.get('reqid')
 
     if not req:
         return build_error_response(None, 'Missing "req" field in request')
 
+    # req 来自客户端，可能是任意 JSON 值；以下的查找与前缀判断只适用于字符串
+    if not isinstance(req, str):
+        return build_error_response(reqid, f'Unknown request type: {req}')
+
     # ping 请求不需要 reqid
     if req == 'ping':
         return build_ping_response()
@@ -140,24 +403,96 @@ def route_request(request: dict[str, Any]) -> dict[str, Any]:
     # encrypted 请求也不需要 reqid（加密的登录请求）
     if req == 'encrypted':
         # 解密加密的登录请求并返回成功的登录响应
-        return handle_encrypted_login_request(request)
+        start = time.perf_counter()
+        response = handle_encrypted_login_request(request, client_id)
+        trace = current_trace()
+        if trace is not None:
+            trace.add('crypto', start)
+        return response
 
     # 其他请求需要 reqid
     if not reqid:
         return build_error_response(None, 'Missing "reqid" field in request')
 
+    # 检查是否有通过管理 API 设置的覆盖响应（优先于所有其他来源）
+    override = lookup_override(req, client_id, device.device_id if device is not None else None)
+    if override is not None:
+        return {**override.response, 'reqid': reqid}
+
     # 检查是否是实时计算请求
     if req == 'util.crypto.getRSAPub':
         return build_get_rsa_pub_response(reqid)
     elif req == 'user.login':
         return build_login_response(reqid)
     elif req == 'appcgi.sysinfo.getHostName':
+        if device is not None:
+            return build_get_hostname_response(reqid, device.host_name)
         return build_get_hostname_response(reqid)
 
-    # 检查是否有预设响应
+    # 合成数据的参数来自客户端，类型或取值错误时回复带 reqid 的失败响应
     try:
-        response_file = get_response_file_path(req)
+        return _route_synthetic(request, req, reqid, device)
+    except (TypeError, ValueError) as e:
+        logger.warning(f'Invalid parameters for {req}: {e}')
+        return build_error_response(reqid, f'Invalid request parameters: {e}')
+
+
+def _route_synthetic(
+    request: dict[str, Any],
+    req: str,
+    reqid: str,
+    device: Device | None,
+) -> dict[str, Any] | None:
+    """Build the response of a request served from synthetic data (see ``route_generated``).
+
+    Raises:
+        TypeError: If a request parameter has the wrong type
+        ValueError: If a request parameter is malformed
+    """
+    if req == 'appcgi.dockermgr.stats' and get_container_fleet() is not None:
+        return build_docker_response(get_container_fleet(), 'stats', reqid)
+    elif req == 'appcgi.dockermgr.containerList' and get_container_fleet() is not None:
+        return build_docker_response(get_container_fleet(), 'containers', reqid)
+    elif req == 'appcgi.dockermgr.composeList' and get_container_fleet() is not None:
+        return build_docker_response(get_container_fleet(), 'compose', reqid)
+    elif req == 'appcgi.eventlogger.common.list' and get_event_store() is not None:
+        return build_event_list_response(get_event_store(), request, reqid)
+    elif req == 'notify.list' and get_notify_store() is not None:
+        return build_notify_list_response(get_notify_store(), request, reqid)
+    elif req == 'notify.unreadTotal' and get_notify_store() is not None:
+        return build_notify_unread_total_response(get_notify_store(), reqid)
+
+    # 检查是否由合成存储拓扑生成
+    if req.startswith('stor.') and get_storage_topology() is not None:
+        device_id = device.device_id if device is not None else None
+        response = build_storage_response(get_storage_topology(), req, request, reqid, device_id)
+        if response is not None:
+            return response
+
+    # 检查是否由合成用户目录生成
+    if get_user_directory() is not None:
+        response = build_directory_response(get_user_directory(), req, request, reqid)
+        if response is not None:
+            return response
+    return None
+
+
+def route_fixture(req: str, reqid: str, device: Device | None = None) -> dict[str, Any]:
+    """Build the response of ``req`` from its response file.
+
+    Args:
+        req: Request type
+        reqid: Request ID
+        device: Emulated device (None for the default device)
+
+    Returns:
+        Response dictionary
+    """
+    try:
+        response_file = get_response_file_path(req, device.device_id if device is not None else None)
         response = load_json_response(response_file)
+        if device is not None:
+            response = device.render(req, response)
         response = replace_reqid(response, reqid)
         return response
     except FileNotFoundError:
@@ -168,22 +503,29 @@ def route_request(request: dict[str, Any]) -> dict[str, Any]:
         return build_error_response(reqid, f'Invalid response format for {req}')
     except Exception as e:
         logger.error(f'Error processing request {req}: {e}')
+        return build_error_response(reqid, f'Error processing request: {e}')
 
 
-def handle_encrypted_login_request(request: dict[str, Any]) -> dict[str, Any]:
+def handle_encrypted_login_request(
+    request: dict[str, Any],
+    client_id: int | None = None,
+) -> dict[str, Any]:
     """Handle encrypted login request.
 
     Args:
         request: Encrypted login request containing iv, rsa, and aes fields
+        client_id: Connection identifier (for signature verification)
 
     Returns:
         Login response with encrypted secret
     """
+    # pycryptodome 在首次登录时才导入
+    from Crypto.Cipher import AES, PKCS1_v1_5
+    from Crypto.Util.Padding import pad, unpad
+
     try:
-        # 读取私钥
-        private_key_path = Path(__file__).parent.parent / 'private_key.pem'
-        with open(private_key_path, 'r') as f:
-            private_key = RSA.import_key(f.read())
+        # 私钥在首次使用时读取并缓存
+        private_key = get_rsa_private_key()
 
         # 解码加密数据
         iv = base64.b64decode(request['iv'])
@@ -204,9 +546,9 @@ def handle_encrypted_login_request(request: dict[str, Any]) -> dict[str, Any]:
         # 提取 reqid
         reqid = login_data.get('reqid')
 
-        # 生成假的 secret 并加密
-        fake_secret = b'mock_secret_for_testing_purposes_32bytes!!'
-        padded_secret = pad(fake_secret, AES.block_size)
+        # 生成会话 secret 并加密（客户端以它作为请求签名的 HMAC 密钥）
+        session_secret = secrets.token_bytes(32)
+        padded_secret = pad(session_secret, AES.block_size)
         # 创建新的 cipher 对象用于加密
         aes_cipher_encrypt = AES.new(aes_key, AES.MODE_CBC, iv)
         encrypted_secret = aes_cipher_encrypt.encrypt(padded_secret)
@@ -215,6 +557,9 @@ def handle_encrypted_login_request(request: dict[str, Any]) -> dict[str, Any]:
         response = build_login_response(reqid)
         response['secret'] = base64.b64encode(encrypted_secret).decode('utf-8')
 
+        verifier = get_signature_verifier()
+        if verifier is not None:
+            verifier.establish(client_id, session_secret, (response['token'], response['longToken']))
         return response
 
     except Exception as e:
@@ -0,0 +1,223 @@
+"""Event-loop lag monitor and readiness state.
+
+所有请求（包括读取响应文件、RSA 解密）都在同一个 asyncio 事件循环上处理，
+循环被阻塞时外部无法察觉。本模块提供：
+
+- 事件循环延迟监控：周期性定时器测量实际唤醒时间与预期时间之差，记入直方图；
+- 卡顿栈快照：看门狗线程发现心跳停止超过阈值时，记录事件循环线程当时的调用栈；
+- 就绪状态：响应文件预加载完成后标记为就绪；
+- ``/health`` 端点所需的汇总信息（延迟、连接数、就绪状态）。
+"""
+
+import asyncio
+import bisect
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Any
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_INTERVAL = 0.1
+DEFAULT_THRESHOLD_MS = 100.0
+
+# 直方图桶上界（毫秒），最后一个桶收集超过 1000 ms 的样本
+LAG_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+class LoopLagMonitor:
+    """Measure event loop scheduling delay."""
+
+    def __init__(
+        self,
+        interval: float = DEFAULT_INTERVAL,
+        threshold_ms: float = DEFAULT_THRESHOLD_MS,
+    ) -> None:
+        """Create the monitor.
+
+        Args:
+            interval: Seconds between two timer wakeups
+            threshold_ms: Lag that triggers a stack snapshot and marks the loop overloaded
+        """
+        self.interval = interval
+        self.threshold = threshold_ms / 1000
+        self.histogram = [0] * (len(LAG_BUCKETS_MS) + 1)
+        self.samples = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.stalls = 0
+        self._beat = time.monotonic()
+        self._loop_thread: int | None = None
+        self._task: asyncio.Task | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stopped = threading.Event()
+
+    def record(self, lag: float) -> None:
+        """Add one lag sample (seconds)."""
+        self.last_lag = lag
+        self.max_lag = max(self.max_lag, lag)
+        self.samples += 1
+        self.histogram[bisect.bisect_left(LAG_BUCKETS_MS, lag * 1000)] += 1
+
+    def percentile(self, fraction: float) -> float | None:
+        """Approximate a lag percentile from the histogram (bucket upper bound, ms)."""
+        if not self.samples:
+            return None
+        rank = fraction * self.samples
+        seen = 0
+        for bound, count in zip(LAG_BUCKETS_MS, self.histogram):
+            seen += count
+            if seen >= rank:
+                return float(bound)
+        return self.max_lag * 1000
+
+    @property
+    def overloaded(self) -> bool:
+        """Whether the loop currently lags beyond the threshold."""
+        current = max(self.last_lag, time.monotonic() - self._beat - self.interval)
+        return current >= self.threshold
+
+    async def _run(self) -> None:
+        """Periodic timer measuring the wakeup delay."""
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.record(max(0.0, loop.time() - expected))
+            self._beat = time.monotonic()
+
+    def _watch(self) -> None:
+        """Log the loop thread's stack once per stall."""
+        stalled = False
+        while not self._stopped.wait(self.interval):
+            silent = time.monotonic() - self._beat - self.interval
+            if silent < self.threshold:
+                stalled = False
+                continue
+            if stalled:
+                continue
+            stalled = True
+            self.stalls += 1
+            frame = sys._current_frames().get(self._loop_thread)
+            stack = ''.join(traceback.format_stack(frame)) if frame is not None else ''
+            logger.warning(
+                f'Event loop blocked for {silent * 1000:.0f} ms, stack:\n{stack}'
+            )
+
+    def start(self) -> None:
+        """Start the timer on the running loop and the watchdog thread."""
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        self._watchdog = threading.Thread(target=self._watch, name='loop-lag-watchdog', daemon=True)
+        self._watchdog.start()
+
+    def stop(self) -> None:
+        """Stop the timer and the watchdog thread."""
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def summary(self) -> dict[str, Any]:
+        """Summarize the lag statistics in milliseconds."""
+        return {
+            'currentMs': round(self.last_lag * 1000, 3),
+            'maxMs': round(self.max_lag * 1000, 3),
+            'p50Ms': self.percentile(0.5),
+            'p99Ms': self.percentile(0.99),
+            'samples': self.samples,
+            'stalls': self.stalls,
+            'histogram': {
+                **{f'le{bound}': count for bound, count in zip(LAG_BUCKETS_MS, self.histogram)},
+                'inf': self.histogram[-1],
+            },
+        }
+
+
+_monitor_settings: tuple[float, float] | None = (DEFAULT_INTERVAL, DEFAULT_THRESHOLD_MS)
+_monitor: LoopLagMonitor | None = None
+_ready = threading.Event()
+
+
+def configure_lag_monitor(
+    interval: float = DEFAULT_INTERVAL,
+    threshold_ms: float = DEFAULT_THRESHOLD_MS,
+) -> None:
+    """Configure the loop lag monitor started by ``start_lag_monitor``.
+
+    Args:
+        interval: Seconds between two timer wakeups (0 to disable)
+        threshold_ms: Stall threshold in milliseconds
+    """
+    global _monitor_settings
+    _monitor_settings = (interval, threshold_ms) if interval > 0 else None
+
+
+def start_lag_monitor() -> LoopLagMonitor | None:
+    """Start the configured monitor on the running event loop."""
+    global _monitor
+    if _monitor_settings is None:
+        return None
+    stop_lag_monitor()
+    _monitor = LoopLagMonitor(*_monitor_settings)
+    _monitor.start()
+    return _monitor
+
+
+def stop_lag_monitor() -> None:
+    """Stop the running monitor."""
+    global _monitor
+    if _monitor is not None:
+        _monitor.stop()
+        _monitor = None
+
+
+def get_lag_monitor() -> LoopLagMonitor | None:
+    """Get the running loop lag monitor."""
+    return _monitor
+
+
+def mark_ready() -> None:
+    """Mark the server as ready to receive traffic."""
+    _ready.set()
+
+
+def is_ready() -> bool:
+    """Whether the server is ready to receive traffic."""
+    return _ready.is_set()
+
+
+def build_health(connections: int) -> tuple[bool, dict[str, Any]]:
+    """Build the health report.
+
+    未就绪或事件循环延迟超过阈值时视为不健康，编排系统据此停止向本实例
+    分发流量。
+
+    Args:
+        connections: Number of open WebSocket connections
+
+    Returns:
+        Whether the server is healthy, and the report
+    """
+    monitor = get_lag_monitor()
+    ready = is_ready()
+    overloaded = monitor is not None and monitor.overloaded
+    if not ready:
+        status = 'starting'
+    elif overloaded:
+        status = 'overloaded'
+    else:
+        status = 'ok'
+
+    return status == 'ok', {
+        'status': status,
+        'ready': ready,
+        'connections': connections,
+        'loopLag': monitor.summary() if monitor is not None else None,
+    }
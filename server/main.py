@@ -2,13 +2,60 @@
 
 import argparse
 import logging
+import socket
 import sys
+import threading
+import time
+from contextlib import asynccontextmanager
+from http import HTTPStatus
 from pathlib import Path
+from typing import TYPE_CHECKING, AsyncIterator
 
-from fastapi import FastAPI, WebSocket
-import uvicorn
-
+# 最先导入，启动报告从这里开始计时
+from server.startup import configure_startup_report, get_startup_report
+from server.access_log import configure_access_log
+from server.codec import CODECS, configure_codec
+from server.connections import (
+    configure_connections,
+    drain_connections,
+    start_reaper,
+    stop_reaper,
+)
+from server.admin import (
+    ADMIN_ACTIONS,
+    ADMIN_ROUTES,
+    OVERRIDE_METHODS,
+    OVERRIDES_PATH,
+    configure_admin,
+    handle_admin_request,
+)
+from server.devices import MAX_DEVICES, configure_devices, load_devices
+from server.docker_fleet import configure_container_fleet
+from server.events import configure_events, configure_notifications
+from server.faults import configure_faults
 from server.handlers import handle_websocket
+from server.health import (
+    configure_lag_monitor,
+    mark_ready,
+    start_lag_monitor,
+    stop_lag_monitor,
+)
+from server.responses import configure_responses, preload_responses
+from server.rest import API_METHODS, API_PREFIX, handle_api_request
+from server.ratelimit import ACTIONS, configure_rate_limits
+from server.signatures import configure_signature_verification
+from server.transfers import DEFAULT_SIZE, configure_transfers, start_transfers
+from server.storage import configure_storage
+from server.supervisor import notify_ready, run_master
+from server.tracing import configure_tracing
+from server.writer import POLICIES, configure_writer
+from server.directory import configure_user_directory
+
+# FastAPI 与 uvicorn 只在 fastapi 传输下导入
+if TYPE_CHECKING:
+    from fastapi import FastAPI
+
+_imported = time.perf_counter()
 
 
 def setup_logging(log_level: str) -> None:
@@ -54,19 +101,310 @@ def parse_args() -> argparse.Namespace:
         choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
         help='Log level (default: INFO)'
     )
+    parser.add_argument(
+        '--transport',
+        type=str,
+        default='fastapi',
+        choices=['fastapi', 'raw'],
+        help='WebSocket transport: fastapi (FastAPI/uvicorn) or raw (websockets, uvloop) '
+             '(default: fastapi)'
+    )
+    parser.add_argument(
+        '--json-codec',
+        choices=CODECS,
+        default='auto',
+        help='JSON backend: auto picks orjson, then msgspec, then the standard library '
+             '(default: auto)'
+    )
+    parser.add_argument(
+        '--hot-restart',
+        action='store_true',
+        help='Run a master process that holds the listening socket and replaces the worker '
+             'on SIGHUP without dropping connections'
+    )
+    parser.add_argument(
+        '--drain-timeout',
+        type=float,
+        default=30.0,
+        help='Seconds an old worker waits for its connections to close after a hot restart '
+             '(default: 30)'
+    )
+    parser.add_argument(
+        '--args-file',
+        type=str,
+        default=None,
+        help='File with extra worker arguments, re-read on every hot restart'
+    )
+    # 主进程传给 worker 的内部参数
+    parser.add_argument('--listen-fd', type=int, default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--ready-fd', type=int, default=None, help=argparse.SUPPRESS)
+    parser.add_argument(
+        '--preload-workers',
+        type=int,
+        default=1,
+        help='Threads that load the response files in the background (default: 1)'
+    )
+    parser.add_argument(
+        '--startup-report',
+        action='store_true',
+        help='Print per-phase import and initialization timings once the server is ready'
+    )
+    parser.add_argument(
+        '--responses-dir',
+        action='append',
+        default=None,
+        help='Directory of response files layered over the built-in responses; may be '
+             'given multiple times, later directories win per req and device variant'
+    )
+    parser.add_argument(
+        '--devices-file',
+        type=str,
+        default=None,
+        help='JSON file with per-device overlays for /websocket/{device_id}'
+    )
+    parser.add_argument(
+        '--max-devices',
+        type=int,
+        default=MAX_DEVICES,
+        help='Undeclared devices kept in memory, least recently used evicted first; '
+             f'0 accepts only devices from --devices-file (default: {MAX_DEVICES})'
+    )
+    parser.add_argument(
+        '--events',
+        type=int,
+        default=0,
+        help='Generate an event log history of this many events (default: 0, static fixture)'
+    )
+    parser.add_argument(
+        '--events-file',
+        type=str,
+        default=None,
+        help='Import the event log history from a JSON file'
+    )
+    parser.add_argument(
+        '--notifications',
+        type=int,
+        default=0,
+        help='Generate a notification history of this many entries (default: 0, static fixture)'
+    )
+    parser.add_argument(
+        '--notifications-file',
+        type=str,
+        default=None,
+        help='Import the notification history from a JSON file'
+    )
+    parser.add_argument(
+        '--containers',
+        type=int,
+        default=0,
+        help='Generate a synthetic container fleet of this size, requires numpy '
+             '(default: 0, static fixture)'
+    )
+    parser.add_argument(
+        '--compose-projects',
+        type=int,
+        default=None,
+        help='Number of compose projects of the container fleet (default: containers / 4)'
+    )
+    parser.add_argument(
+        '--fleet-tick',
+        type=float,
+        default=1.0,
+        help='Seconds between two container statistic updates (default: 1.0)'
+    )
+    parser.add_argument(
+        '--storage',
+        type=str,
+        default=None,
+        help='Synthetic storage topology, e.g. "4 pools, 60 disks, 3 failing" '
+             '(default: static fixtures)'
+    )
+    parser.add_argument(
+        '--storage-scenario',
+        type=str,
+        default=None,
+        help='Cycle redundant pools through states, e.g. '
+             '"healthy:300,degraded:60,rebuilding:600,scrubbing:900" (default: always healthy)'
+    )
+    parser.add_argument(
+        '--transfer-port',
+        type=int,
+        default=None,
+        help='Serve file download/upload endpoints (/files/...) on this port (default: disabled)'
+    )
+    parser.add_argument(
+        '--transfer-size',
+        type=str,
+        default=DEFAULT_SIZE,
+        help=f'Size of synthetic downloads without ?size=, e.g. 4G (default: {DEFAULT_SIZE})'
+    )
+    parser.add_argument(
+        '--upload-store',
+        type=str,
+        default='0',
+        help='Keep uploads up to this many bytes in total for download, e.g. 512M '
+             '(default: 0, discard)'
+    )
+    parser.add_argument(
+        '--users',
+        type=int,
+        default=0,
+        help='Generate a synthetic user directory of this size (default: 0, static fixtures)'
+    )
+    parser.add_argument(
+        '--groups',
+        type=int,
+        default=100,
+        help='Number of groups of the user directory (default: 100)'
+    )
+    parser.add_argument(
+        '--access-log',
+        type=str,
+        default=None,
+        help='Write a JSON lines access log to this file ("-" for stdout, default: disabled)'
+    )
+    parser.add_argument(
+        '--access-log-sample',
+        type=str,
+        default=None,
+        help='Per-req access log sampling rates, e.g. "ping=0,user.*=0.1,*=1" (default: 1)'
+    )
+    parser.add_argument(
+        '--trace-threshold',
+        type=float,
+        default=None,
+        help='Capture per-phase traces of requests slower than this many milliseconds '
+             '(default: disabled)'
+    )
+    parser.add_argument(
+        '--trace-buffer',
+        type=int,
+        default=1024,
+        help='Maximum captured slow requests (default: 1024)'
+    )
+    parser.add_argument(
+        '--lag-interval',
+        type=float,
+        default=0.1,
+        help='Seconds between event loop lag measurements, 0 to disable (default: 0.1)'
+    )
+    parser.add_argument(
+        '--lag-threshold',
+        type=float,
+        default=100.0,
+        help='Event loop lag in milliseconds that logs a stack snapshot and fails /health '
+             '(default: 100)'
+    )
+    parser.add_argument(
+        '--write-queue',
+        type=int,
+        default=256,
+        help='Outbound frames queued per connection, 0 to send inline (default: 256)'
+    )
+    parser.add_argument(
+        '--write-overflow',
+        choices=POLICIES,
+        default='block',
+        help='What to do when the outbound queue is full (default: block)'
+    )
+    parser.add_argument(
+        '--rate-limit-conn',
+        type=str,
+        default=None,
+        help='Per-connection limit as RATE[/BURST] requests per second (default: unlimited)'
+    )
+    parser.add_argument(
+        '--rate-limit-global',
+        type=str,
+        default=None,
+        help='Server-wide limit as RATE[/BURST] requests per second (default: unlimited)'
+    )
+    parser.add_argument(
+        '--rate-limit',
+        type=str,
+        default=None,
+        help='Per-req limits, e.g. "user.*=100/200,stor.diskSmart=5" (default: unlimited)'
+    )
+    parser.add_argument(
+        '--rate-limit-action',
+        choices=ACTIONS,
+        default='reject',
+        help='Reject or delay requests over the limit (default: reject)'
+    )
+    parser.add_argument(
+        '--verify-signatures',
+        action='store_true',
+        help='Reject requests whose HMAC-SHA256 signature does not match the session secret'
+    )
+    parser.add_argument(
+        '--idle-timeout',
+        type=float,
+        default=0,
+        help='Close connections without requests for this many seconds (default: 0, never)'
+    )
+    parser.add_argument(
+        '--faults',
+        type=str,
+        default=None,
+        help='Inject faults, e.g. "drop=0.1,drop-after=5,refuse=10,accept-delay=50,'
+             'corrupt=0.01,truncate=0.01" (default: none)'
+    )
+    parser.add_argument(
+        '--fault-seed',
+        type=int,
+        default=None,
+        help='Random seed of fault injection (default: random)'
+    )
+    parser.add_argument(
+        '--admin-get-actions',
+        action='store_true',
+        help='Also accept GET for state-changing admin endpoints such as '
+             '/debug/faults/restart (they require POST by default)'
+    )
     return parser.parse_args()
 
 
-def create_app() -> FastAPI:
+@asynccontextmanager
+async def lifespan(app: 'FastAPI') -> AsyncIterator[None]:
+    """Run the event loop lag monitor and idle reaper while the application is serving."""
+    start_lag_monitor()
+    start_reaper()
+    try:
+        yield
+    finally:
+        stop_reaper()
+        stop_lag_monitor()
+
+
+def preload_fixtures(workers: int = 1) -> None:
+    """Preload the response files and mark the server ready.
+
+    Args:
+        workers: Number of loader threads
+    """
+    logger = logging.getLogger(__name__)
+    report = get_startup_report()
+    with report.phase(f'preload fixtures (workers={workers})'):
+        count = preload_responses(workers=workers)
+    logger.info(f'Preloaded {count} response files')
+    mark_ready()
+    report.complete('preloaded')
+
+
+def create_app() -> 'FastAPI':
     """Create and configure FastAPI application.
 
     Returns:
         Configured FastAPI application
     """
+    from fastapi import FastAPI, Request, WebSocket
+    from fastapi.responses import JSONResponse, PlainTextResponse, Response
+
     app = FastAPI(
         title='fnOS Mock Server',
         description='Mock server for FeiNiu fnOS to test pyfnos client',
         version='0.1.0',
+        lifespan=lifespan,
     )
 
     @app.get('/')
@@ -82,25 +420,168 @@ def create_app() -> FastAPI:
         """WebSocket endpoint for fnOS client connections."""
         await handle_websocket(websocket)
 
+    @app.websocket('/websocket/{device_id}')
+    async def device_websocket_endpoint(websocket: WebSocket, device_id: str) -> None:
+        """WebSocket endpoint of one emulated device."""
+        await handle_websocket(websocket, device_id)
+
+    @app.websocket('/{device_id}/websocket')
+    async def device_prefix_websocket_endpoint(websocket: WebSocket, device_id: str) -> None:
+        """WebSocket endpoint of one emulated device (pyfnos endpoint form)."""
+        await handle_websocket(websocket, device_id)
+
+    async def admin_endpoint(request: Request) -> Response:
+        """Admin/diagnostic endpoint."""
+        status, body = await handle_admin_request(
+            request.url.path, dict(request.query_params), request.method, await request.body()
+        )
+        if isinstance(body, str):
+            return PlainTextResponse(body, status_code=status)
+        return JSONResponse(body, status_code=status)
+
+    async def api_endpoint(request: Request, req: str) -> Response:
+        """REST mirror of the WebSocket request types."""
+        status, body, headers = handle_api_request(
+            req,
+            dict(request.query_params),
+            request.method,
+            await request.body(),
+            request.headers.get('if-none-match'),
+        )
+        if status == HTTPStatus.NOT_MODIFIED:
+            return Response(status_code=status, headers=headers)
+        return Response(body, status_code=status, headers=headers, media_type='application/json')
+
+    app.add_api_route(API_PREFIX + '{req}', api_endpoint, methods=list(API_METHODS))
+    for path in ADMIN_ROUTES:
+        app.add_api_route(path, admin_endpoint, methods=['GET'])
+    for path in ADMIN_ACTIONS:
+        app.add_api_route(path, admin_endpoint, methods=['GET', 'POST'])
+    app.add_api_route(OVERRIDES_PATH, admin_endpoint, methods=['GET', 'DELETE'])
+    app.add_api_route(
+        OVERRIDES_PATH + '/{req}', admin_endpoint, methods=list(OVERRIDE_METHODS)
+    )
+
     return app
 
 
+def run_fastapi(
+    host: str,
+    port: int,
+    log_level: str,
+    sock: socket.socket | None = None,
+    drain_timeout: float | None = None,
+) -> None:
+    """Run the FastAPI transport under uvicorn.
+
+    Args:
+        host: Listen host
+        port: Listen port
+        log_level: uvicorn log level
+        sock: Inherited listening socket (used instead of host/port)
+        drain_timeout: When set, shutdown stops accepting and waits this many
+            seconds for the open connections to close
+    """
+    report = get_startup_report()
+    with report.phase('import fastapi'):
+        import fastapi  # noqa: F401
+    with report.phase('import uvicorn'):
+        import uvicorn
+    with report.phase('create app'):
+        app = create_app()
+
+    class Server(uvicorn.Server):
+        async def startup(self, sockets=None) -> None:
+            await super().startup(sockets)
+            report.complete('listening')
+
+        async def shutdown(self, sockets=None) -> None:
+            if drain_timeout is not None:
+                # 先停止接受新连接，uvicorn 随后以 1012 关闭仍未断开的连接
+                for server in self.servers:
+                    server.close()
+                await drain_connections(drain_timeout)
+            await super().shutdown(sockets)
+
+    server = Server(uvicorn.Config(app, host=host, port=port, log_level=log_level))
+    server.run(sockets=[sock] if sock is not None else None)
+
+
 def main() -> None:
     """Main entry point."""
-    args = parse_args()
+    report = get_startup_report()
+    report.add('import server modules', report.started, _imported)
+    with report.phase('parse arguments'):
+        args = parse_args()
+    configure_startup_report(args.startup_report)
     setup_logging(args.log_level)
 
     logger = logging.getLogger(__name__)
     logger.info(f'Starting fnOS Mock Server on {args.host}:{args.port}')
 
-    app = create_app()
+    if args.hot_restart:
+        sys.exit(run_master(
+            sys.argv[1:], args.host, args.port, args.drain_timeout, args.args_file
+        ))
 
-    uvicorn.run(
-        app,
-        host=args.host,
-        port=args.port,
-        log_level=args.log_level.lower(),
-    )
+    # 作为热重启的 worker 运行：使用继承的监听 socket，退出前排空连接
+    sock = None
+    drain_timeout = None
+    if args.listen_fd is not None:
+        sock = socket.socket(fileno=args.listen_fd)
+        drain_timeout = args.drain_timeout
+    if args.ready_fd is not None:
+        report.when('listening', lambda: notify_ready(args.ready_fd))
+
+    with report.phase('configure'):
+        configure_codec(args.json_codec)
+        configure_responses(args.responses_dir)
+        if args.devices_file:
+            load_devices(args.devices_file)
+        configure_devices(args.max_devices)
+        configure_access_log(args.access_log, args.access_log_sample)
+        configure_tracing(args.trace_threshold, args.trace_buffer)
+        configure_lag_monitor(args.lag_interval, args.lag_threshold)
+        configure_writer(args.write_queue, args.write_overflow)
+        configure_connections(args.idle_timeout)
+        configure_faults(args.faults, args.fault_seed)
+        configure_admin(args.admin_get_actions)
+        configure_rate_limits(
+            args.rate_limit_conn, args.rate_limit_global, args.rate_limit, args.rate_limit_action
+        )
+        configure_signature_verification(args.verify_signatures)
+        # 热重启时新旧 worker 各自监听传输端口，需要 SO_REUSEPORT
+        configure_transfers(
+            args.host, args.transfer_port, args.transfer_size, args.upload_store,
+            reuse_port=args.listen_fd is not None,
+        )
+    # 合成数据的生成耗时与规模有关，单独计时
+    with report.phase('generate events'):
+        configure_events(args.events, args.events_file)
+        configure_notifications(args.notifications, args.notifications_file)
+    with report.phase('generate container fleet'):
+        configure_container_fleet(args.containers, args.compose_projects, args.fleet_tick)
+    with report.phase('generate storage'):
+        configure_storage(args.storage, args.storage_scenario)
+    with report.phase('generate user directory'):
+        configure_user_directory(args.users, args.groups)
+
+    # 文件传输端点运行在独立线程的事件循环上，与传输方式无关
+    with report.phase('start transfer endpoints'):
+        start_transfers()
+
+    # 在后台预加载响应文件，完成后 /health 报告就绪
+    threading.Thread(
+        target=preload_fixtures, args=(args.preload_workers,), name='preload', daemon=True
+    ).start()
+
+    if args.transport == 'raw':
+        with report.phase('import raw transport'):
+            from server.raw_transport import run_raw
+        run_raw(args.host, args.port, sock, drain_timeout)
+        return
+
+    run_fastapi(args.host, args.port, args.log_level.lower(), sock, drain_timeout)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,431 @@
+"""Runtime response overrides with copy-on-write snapshots.
+
+测试过程中可以通过管理 API（``/admin/responses/{req}``）替换某个 ``req``
+的响应，而不需要修改 ``responses/`` 中的文件并重启服务器。覆盖可以作用于：
+
+- 全局：所有连接；
+- 设备：``/websocket/{device_id}`` 的所有连接；
+- 连接：单个连接（``/debug/connections`` 中的 ``client``），连接关闭时自动清除。
+
+查找优先级为连接 > 设备 > 全局。所有覆盖保存在一个不可变的快照中，每次
+修改都复制被修改的字典、生成版本号加一的新快照后整体替换（copy-on-write），
+未修改的作用域与旧快照共享。请求处理路径只读取当前快照的引用，不需要加锁；
+修改操作之间用锁串行化。
+"""
+
+import copy
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any
+
+from server.connections import get_connection_manager
+from server.devices import get_device
+from server.responses import get_response_file_path, load_json_response
+
+
+logger = logging.getLogger(__name__)
+
+
+class JsonPatchError(ValueError):
+    """Raised when a JSON Patch (RFC 6902) cannot be applied."""
+
+
+class JsonPatchTestFailed(JsonPatchError):
+    """Raised when a ``test`` operation of a JSON Patch does not match."""
+
+
+def _parse_pointer(pointer: Any) -> list[str]:
+    """Split a JSON Pointer (RFC 6901) into unescaped reference tokens."""
+    if not isinstance(pointer, str) or (pointer and not pointer.startswith('/')):
+        raise JsonPatchError(f'Invalid JSON Pointer: {pointer!r}')
+    if not pointer:
+        return []
+    return [token.replace('~1', '/').replace('~0', '~') for token in pointer[1:].split('/')]
+
+
+def _index(container: list, token: str, allow_end: bool = False) -> int:
+    """Convert a reference token to an array index."""
+    if token == '-' and allow_end:
+        return len(container)
+    if not token.isdigit() or (len(token) > 1 and token[0] == '0'):
+        raise JsonPatchError(f'Invalid array index: {token}')
+    index = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise JsonPatchError(f'Array index out of range: {token}')
+    return index
+
+
+def _resolve(document: Any, tokens: list[str]) -> Any:
+    """Return the value a list of reference tokens points to."""
+    for token in tokens:
+        if isinstance(document, dict):
+            if token not in document:
+                raise JsonPatchError(f'Path not found: /{"/".join(tokens)}')
+            document = document[token]
+        elif isinstance(document, list):
+            document = document[_index(document, token)]
+        else:
+            raise JsonPatchError(f'Path not found: /{"/".join(tokens)}')
+    return document
+
+
+def _add(document: Any, tokens: list[str], value: Any) -> Any:
+    """Add a value, returning the (possibly replaced) document."""
+    if not tokens:
+        return value
+    parent = _resolve(document, tokens[:-1])
+    key = tokens[-1]
+    if isinstance(parent, dict):
+        parent[key] = value
+    elif isinstance(parent, list):
+        parent.insert(_index(parent, key, allow_end=True), value)
+    else:
+        raise JsonPatchError(f'Cannot add to a scalar: /{"/".join(tokens)}')
+    return document
+
+
+def _remove(document: Any, tokens: list[str]) -> Any:
+    """Remove a value, returning the removed value."""
+    if not tokens:
+        raise JsonPatchError('Cannot remove the whole document')
+    parent = _resolve(document, tokens[:-1])
+    key = tokens[-1]
+    if isinstance(parent, dict):
+        if key not in parent:
+            raise JsonPatchError(f'Path not found: /{"/".join(tokens)}')
+        return parent.pop(key)
+    if isinstance(parent, list):
+        return parent.pop(_index(parent, key))
+    raise JsonPatchError(f'Path not found: /{"/".join(tokens)}')
+
+
+def apply_json_patch(document: Any, operations: Any) -> Any:
+    """Apply a JSON Patch (RFC 6902) without modifying the document.
+
+    Args:
+        document: JSON value to patch
+        operations: List of patch operations
+
+    Returns:
+        Patched JSON value
+
+    Raises:
+        JsonPatchTestFailed: If a ``test`` operation does not match
+        JsonPatchError: If the patch is malformed or a path does not exist
+    """
+    if not isinstance(operations, list):
+        raise JsonPatchError('A JSON Patch must be an array of operations')
+    result = copy.deepcopy(document)
+    for operation in operations:
+        if not isinstance(operation, dict) or 'op' not in operation:
+            raise JsonPatchError(f'Invalid operation: {operation!r}')
+        op = operation['op']
+        path = _parse_pointer(operation.get('path'))
+        if op in ('add', 'replace', 'test') and 'value' not in operation:
+            raise JsonPatchError(f'Missing "value" in {op} operation')
+
+        if op == 'add':
+            result = _add(result, path, copy.deepcopy(operation['value']))
+        elif op == 'remove':
+            _remove(result, path)
+        elif op == 'replace':
+            if path:
+                _remove(result, path)
+            result = _add(result, path, copy.deepcopy(operation['value']))
+        elif op in ('move', 'copy'):
+            source = _parse_pointer(operation.get('from'))
+            if op == 'move':
+                if path[:len(source)] == source and len(path) > len(source):
+                    raise JsonPatchError('Cannot move a value into one of its children')
+                value = _remove(result, source) if source else result
+            else:
+                value = copy.deepcopy(_resolve(result, source))
+            result = _add(result, path, value)
+        elif op == 'test':
+            if _resolve(result, path) != operation['value']:
+                raise JsonPatchTestFailed(f'Test failed at {operation["path"]}')
+        else:
+            raise JsonPatchError(f'Unknown operation: {op}')
+    return result
+
+
+@dataclass(frozen=True)
+class Override:
+    """One overridden response.
+
+    Attributes:
+        response: Response returned instead of the fixture (shared, never modified)
+        version: Snapshot version that introduced this override
+        updated: Wall clock time of the change
+    """
+
+    response: dict[str, Any]
+    version: int
+    updated: float
+
+
+Scoped = dict[Any, dict[str, Override]]
+
+
+class OverrideSnapshot:
+    """Immutable set of overrides of one version."""
+
+    __slots__ = ('version', 'responses', 'devices', 'connections', 'active')
+
+    def __init__(
+        self,
+        version: int = 0,
+        responses: dict[str, Override] | None = None,
+        devices: Scoped | None = None,
+        connections: Scoped | None = None,
+    ) -> None:
+        self.version = version
+        self.responses = responses or {}
+        self.devices = devices or {}
+        self.connections = connections or {}
+        self.active = bool(self.responses or self.devices or self.connections)
+
+    def lookup(self, req: str, client_id: int | None, device_id: str | None) -> Override | None:
+        """Find the override of a request (connection > device > global)."""
+        if self.connections:
+            scoped = self.connections.get(client_id)
+            if scoped is not None and req in scoped:
+                return scoped[req]
+        if self.devices and device_id is not None:
+            scoped = self.devices.get(device_id)
+            if scoped is not None and req in scoped:
+                return scoped[req]
+        return self.responses.get(req)
+
+    def to_dict(self) -> dict[str, Any]:
+        """List the overridden requests of every scope."""
+        def entries(scoped: dict[str, Override]) -> dict[str, Any]:
+            return {
+                req: {'version': override.version, 'updated': override.updated}
+                for req, override in sorted(scoped.items())
+            }
+
+        return {
+            'version': self.version,
+            'global': entries(self.responses),
+            'devices': {device: entries(s) for device, s in self.devices.items()},
+            'connections': {str(client): entries(s) for client, s in self.connections.items()},
+        }
+
+
+_snapshot = OverrideSnapshot()
+_write_lock = threading.Lock()
+
+
+def get_overrides() -> OverrideSnapshot:
+    """Get the current override snapshot."""
+    return _snapshot
+
+
+def lookup_override(req: str, client_id: int | None, device_id: str | None) -> Override | None:
+    """Find the override of a request in the current snapshot (lock-free)."""
+    snapshot = _snapshot
+    if not snapshot.active:
+        return None
+    return snapshot.lookup(req, client_id, device_id)
+
+
+def _connection_device(client_id: int) -> str | None:
+    """Return the device of an open connection.
+
+    Raises:
+        LookupError: If the connection is not open
+    """
+    info = get_connection_manager().connections.get(client_id)
+    if info is None:
+        raise LookupError(f'Connection not found: {client_id}')
+    return info.device_id
+
+
+def _with_entry(entries: dict, key: Any, value: Any) -> dict:
+    """Copy a mapping with one key set, or removed when ``value`` is empty."""
+    result = dict(entries)
+    if value:
+        result[key] = value
+    else:
+        result.pop(key, None)
+    return result
+
+
+def _replace(
+    snapshot: OverrideSnapshot,
+    req: str,
+    override: Override | None,
+    device: str | None,
+    connection: int | None,
+) -> OverrideSnapshot:
+    """Build the next snapshot with one entry set (or removed when None).
+
+    只复制被修改的作用域字典，其余作用域与旧快照共享。
+    """
+    responses, devices, connections = snapshot.responses, snapshot.devices, snapshot.connections
+    if connection is not None:
+        connections = _with_entry(
+            connections, connection, _with_entry(connections.get(connection, {}), req, override)
+        )
+    elif device is not None:
+        devices = _with_entry(
+            devices, device, _with_entry(devices.get(device, {}), req, override)
+        )
+    else:
+        responses = _with_entry(responses, req, override)
+    return OverrideSnapshot(snapshot.version + 1, responses, devices, connections)
+
+
+def _base_response(req: str, device: str | None, connection: int | None) -> dict[str, Any]:
+    """Return the response currently seen in a scope (override or fixture file).
+
+    与 ``route_fixture`` 一致：设备作用域的响应文件先应用该设备的覆盖层。
+
+    Raises:
+        LookupError: If neither an override nor a fixture file exists
+    """
+    override = _snapshot.lookup(req, connection, device)
+    if override is not None:
+        return override.response
+    try:
+        response = load_json_response(get_response_file_path(req, device))
+    except FileNotFoundError:
+        raise LookupError(f'No response to patch for {req}') from None
+    if device is not None:
+        response = get_device(device).render(req, response)
+    return response
+
+
+def put_override(
+    req: str,
+    response: Any,
+    device: str | None = None,
+    connection: int | None = None,
+) -> Override:
+    """Set the response of a request.
+
+    Args:
+        req: Request type
+        response: Response object (its ``reqid`` is set per request)
+        device: Device scope
+        connection: Connection scope (takes precedence over ``device``)
+
+    Returns:
+        New override
+
+    Raises:
+        ValueError: If the response is not a JSON object
+        LookupError: If the connection is not open
+    """
+    global _snapshot
+    if not isinstance(response, dict):
+        raise ValueError('Response must be a JSON object')
+    with _write_lock:
+        if connection is not None:
+            _connection_device(connection)
+            device = None
+        override = Override(response, _snapshot.version + 1, time.time())
+        _snapshot = _replace(_snapshot, req, override, device, connection)
+    logger.info(f'Response override set: {req} (version {override.version})')
+    return override
+
+
+def patch_override(
+    req: str,
+    operations: Any,
+    device: str | None = None,
+    connection: int | None = None,
+) -> Override:
+    """Apply a JSON Patch to the response currently seen in a scope.
+
+    补丁作用于该作用域当前的响应（已有覆盖，或更大作用域的覆盖，或响应
+    文件），结果保存为该作用域的覆盖。
+
+    Args:
+        req: Request type
+        operations: JSON Patch operations
+        device: Device scope
+        connection: Connection scope (takes precedence over ``device``)
+
+    Returns:
+        New override
+
+    Raises:
+        JsonPatchError: If the patch cannot be applied
+        LookupError: If the connection is not open or there is nothing to patch
+    """
+    global _snapshot
+    with _write_lock:
+        if connection is not None:
+            base = _base_response(req, _connection_device(connection), connection)
+            device = None
+        else:
+            base = _base_response(req, device, None)
+        response = apply_json_patch(base, operations)
+        if not isinstance(response, dict):
+            raise JsonPatchError('Patched response must be a JSON object')
+        override = Override(response, _snapshot.version + 1, time.time())
+        _snapshot = _replace(_snapshot, req, override, device, connection)
+    logger.info(f'Response override patched: {req} (version {override.version})')
+    return override
+
+
+def delete_override(
+    req: str | None = None,
+    device: str | None = None,
+    connection: int | None = None,
+) -> int:
+    """Remove overrides.
+
+    Args:
+        req: Request type (None removes every override of the scope; without a
+            device or connection scope, every override of every scope)
+        device: Device scope
+        connection: Connection scope
+
+    Returns:
+        Number of removed overrides
+    """
+    global _snapshot
+    with _write_lock:
+        snapshot = _snapshot
+        if req is not None:
+            if connection is not None:
+                removed = int(req in snapshot.connections.get(connection, {}))
+            elif device is not None:
+                removed = int(req in snapshot.devices.get(device, {}))
+            else:
+                removed = int(req in snapshot.responses)
+            if removed:
+                _snapshot = _replace(snapshot, req, None, device, connection)
+            return removed
+
+        if connection is not None:
+            removed = len(snapshot.connections.get(connection, {}))
+            new = OverrideSnapshot(
+                snapshot.version + 1, snapshot.responses, snapshot.devices,
+                _with_entry(snapshot.connections, connection, None),
+            )
+        elif device is not None:
+            removed = len(snapshot.devices.get(device, {}))
+            new = OverrideSnapshot(
+                snapshot.version + 1, snapshot.responses,
+                _with_entry(snapshot.devices, device, None), snapshot.connections,
+            )
+        else:
+            removed = len(snapshot.responses) + sum(
+                len(s) for s in (*snapshot.devices.values(), *snapshot.connections.values())
+            )
+            new = OverrideSnapshot(snapshot.version + 1)
+        if removed:
+            _snapshot = new
+        return removed
+
+
+def discard_connection_overrides(client_id: int) -> None:
+    """Drop the overrides of a closed connection."""
+    if client_id in _snapshot.connections:
+        delete_override(connection=client_id)
@@ -0,0 +1,131 @@
+"""On-demand sampling profiler for fnOS Mock Server.
+
+后台线程按固定间隔通过 ``sys._current_frames()`` 采样事件循环线程的调用栈，
+输出 flamegraph.pl / speedscope 可直接使用的折叠栈（collapsed stacks）格式。
+采样时如果栈中存在 ``route_request`` 帧，则读取其局部变量 ``req``，把栈根标记
+为 ``req:<请求类型>``，热点处理器因此按请求类型分组显示。请求处理路径上
+没有任何额外开销。
+"""
+
+import logging
+import sys
+import threading
+import time
+from collections import Counter
+from types import CodeType, FrameType
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_INTERVAL = 0.005
+MAX_DURATION = 60.0
+
+# 最深采样帧数，避免异常深的递归栈拖慢采样线程
+MAX_DEPTH = 128
+
+
+def _frame_label(frame: FrameType) -> str:
+    """Return ``module:qualname`` of a frame."""
+    code = frame.f_code
+    module = frame.f_globals.get('__name__', '?')
+    return f'{module}:{code.co_qualname}'
+
+
+class SamplingProfiler:
+    """Stack sampler for one thread."""
+
+    def __init__(
+        self,
+        thread_id: int,
+        interval: float = DEFAULT_INTERVAL,
+        tag_code: CodeType | None = None,
+    ) -> None:
+        """Create the profiler.
+
+        Args:
+            thread_id: Identifier of the thread to sample
+            interval: Seconds between samples
+            tag_code: Code object whose frame's local ``req`` tags the sample
+        """
+        self.thread_id = thread_id
+        self.interval = interval
+        self.tag_code = tag_code
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+
+    def sample(self) -> None:
+        """Take one stack sample of the target thread."""
+        frame = sys._current_frames().get(self.thread_id)
+        if frame is None:
+            return
+
+        labels = []
+        tag = None
+        while frame is not None and len(labels) < MAX_DEPTH:
+            if tag is None and frame.f_code is self.tag_code:
+                tag = frame.f_locals.get('req')
+            labels.append(_frame_label(frame))
+            frame = frame.f_back
+        labels.reverse()
+        if tag is not None:
+            labels.insert(0, f'req:{tag}')
+
+        self.stacks[';'.join(labels)] += 1
+        self.samples += 1
+
+    def run(self, duration: float) -> None:
+        """Sample for ``duration`` seconds (blocking the calling thread)."""
+        deadline = time.perf_counter() + duration
+        next_sample = time.perf_counter()
+        while next_sample < deadline:
+            self.sample()
+            next_sample += self.interval
+            delay = next_sample - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+    def collapsed(self) -> str:
+        """Return the samples in collapsed stack format, heaviest first."""
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+# 同一时间只允许一个采样任务
+_lock = threading.Lock()
+
+
+def profile_thread(
+    thread_id: int,
+    duration: float,
+    interval: float = DEFAULT_INTERVAL,
+    tag_code: CodeType | None = None,
+) -> SamplingProfiler:
+    """Profile a thread for a while.
+
+    Args:
+        thread_id: Identifier of the thread to sample
+        duration: Seconds to sample (at most ``MAX_DURATION``)
+        interval: Seconds between samples
+        tag_code: Code object whose frame's local ``req`` tags the sample
+
+    Returns:
+        Profiler holding the samples
+
+    Raises:
+        RuntimeError: If another profile is running
+        ValueError: If duration or interval is out of range
+    """
+    if not 0 < duration <= MAX_DURATION:
+        raise ValueError(f'Duration must be between 0 and {MAX_DURATION} seconds')
+    if interval <= 0:
+        raise ValueError('Interval must be positive')
+    if not _lock.acquire(blocking=False):
+        raise RuntimeError('A profile is already running')
+
+    try:
+        profiler = SamplingProfiler(thread_id, interval, tag_code)
+        logger.info(f'Profiling thread {thread_id} for {duration}s')
+        profiler.run(duration)
+        return profiler
+    finally:
+        _lock.release()
@@ -0,0 +1,274 @@
+"""pytest plugin for testing fnOS clients against the mock server.
+
+提供两种测试方式：
+
+- ``fnos_in_memory``：把 ``websockets.connect`` 替换为内存传输，客户端（如
+  pyfnos 的 ``FnosClient``）的消息直接交给 ``serve_messages``/``route_request``
+  处理，不经过任何 socket；
+- ``fnos_mock_server``：会话级的真实服务器，绑定端口 0 并在就绪后才返回，
+  pytest-xdist 下每个 worker 进程各有一个实例，不会争抢端口。
+
+安装本包后插件通过 ``pytest11`` 入口自动加载。
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import threading
+from dataclasses import dataclass
+from typing import Any, Iterator
+from urllib.parse import urlsplit
+
+import pytest
+import websockets
+from websockets.exceptions import ConnectionClosed, ConnectionClosedOK
+
+from server.devices import device_id_from_path, get_device
+from server.handlers import serve_messages
+
+
+logger = logging.getLogger(__name__)
+
+
+IN_MEMORY_ENDPOINT = 'in-memory'
+
+# 服务器启动超时（秒）
+SERVER_START_TIMEOUT = 10.0
+
+
+class _Disconnected(Exception):
+    """Raised on the server side of an in-memory connection when it is closed."""
+
+
+class InMemoryConnection:
+    """In-memory WebSocket connection compatible with the websockets client API.
+
+    服务器端运行与真实传输相同的 ``serve_messages`` 循环，两端通过
+    ``asyncio.Queue`` 交换文本帧。
+    """
+
+    def __init__(self, device_id: str | None = None) -> None:
+        self.device_id = device_id
+        self._to_server: asyncio.Queue[str | None] = asyncio.Queue()
+        self._to_client: asyncio.Queue[str | None] = asyncio.Queue()
+        self._closed = False
+        self._server_task = asyncio.create_task(self._serve())
+
+    async def _serve(self) -> None:
+        """Run the server side of the connection."""
+        client_id = id(self)
+        logger.debug(f'In-memory client connected: {client_id}')
+        try:
+            await serve_messages(
+                self._server_receive,
+                self._server_send,
+                client_id,
+                get_device(self.device_id),
+                close=self.close,
+                abort=self.close,
+            )
+        except _Disconnected:
+            logger.debug(f'In-memory client disconnected: {client_id}')
+        except Exception as e:
+            logger.error(f'Error handling in-memory connection {client_id}: {e}')
+        finally:
+            self._to_client.put_nowait(None)
+
+    async def _server_receive(self) -> str:
+        """Receive the next frame sent by the client."""
+        message = await self._to_server.get()
+        if message is None:
+            raise _Disconnected()
+        return message
+
+    async def _server_send(self, message: str) -> None:
+        """Deliver one frame to the client."""
+        self._to_client.put_nowait(message)
+
+    async def send(self, message: str) -> None:
+        """Send one text frame to the server.
+
+        Raises:
+            ConnectionClosedOK: If the connection is closed
+        """
+        if self._closed:
+            raise ConnectionClosedOK(None, None)
+        self._to_server.put_nowait(message)
+
+    async def recv(self) -> str:
+        """Receive the next text frame from the server.
+
+        Raises:
+            ConnectionClosedOK: If the connection is closed
+        """
+        message = await self._to_client.get()
+        if message is None:
+            self._to_client.put_nowait(None)
+            raise ConnectionClosedOK(None, None)
+        return message
+
+    def __aiter__(self) -> 'InMemoryConnection':
+        return self
+
+    async def __anext__(self) -> str:
+        try:
+            return await self.recv()
+        except ConnectionClosed:
+            raise StopAsyncIteration
+
+    async def close(self) -> None:
+        """Close the connection and wait for the server side to finish."""
+        if self._closed:
+            return
+        self._closed = True
+        self._to_server.put_nowait(None)
+        await asyncio.gather(self._server_task, return_exceptions=True)
+
+
+async def connect_in_memory(uri: str = IN_MEMORY_ENDPOINT, **kwargs: Any) -> InMemoryConnection:
+    """Drop-in replacement for ``websockets.connect`` returning an in-memory connection.
+
+    ``/{device_id}/websocket`` 或 ``/websocket/{device_id}`` 形式的路径会连接到
+    对应的模拟设备。
+
+    Args:
+        uri: WebSocket URI, only the path is used
+        **kwargs: Ignored, accepted for API compatibility
+
+    Returns:
+        Connected in-memory connection
+    """
+    path = urlsplit(uri).path
+    device_id = device_id_from_path(path) if path else None
+    return InMemoryConnection(device_id)
+
+
+@dataclass(frozen=True)
+class MockServerInfo:
+    """Address of a running mock server."""
+
+    host: str
+    port: int
+    transport: str
+
+    @property
+    def endpoint(self) -> str:
+        """Endpoint in the ``host:port`` form accepted by ``FnosClient.connect``."""
+        return f'{self.host}:{self.port}'
+
+    @property
+    def url(self) -> str:
+        """WebSocket URL of the ``/websocket`` endpoint."""
+        return f'ws://{self.endpoint}/websocket'
+
+
+class _ServerThread(threading.Thread):
+    """Run a mock server on an already bound socket in a background thread."""
+
+    def __init__(self, sock: socket.socket, transport: str) -> None:
+        super().__init__(name=f'fnos-mock-server-{transport}', daemon=True)
+        self.sock = sock
+        self.transport = transport
+        self.ready = threading.Event()
+        self.error: BaseException | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._stop_event: asyncio.Event | None = None
+
+    def run(self) -> None:
+        try:
+            asyncio.run(self._main())
+        except BaseException as e:
+            self.error = e
+        finally:
+            self.ready.set()
+
+    async def _main(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+        if self.transport == 'raw':
+            from server.raw_transport import create_raw_server
+            async with create_raw_server(sock=self.sock):
+                self.ready.set()
+                await self._stop_event.wait()
+            return
+
+        import uvicorn
+        from server.main import create_app
+
+        config = uvicorn.Config(create_app(), log_level='warning', lifespan='off')
+        server = uvicorn.Server(config)
+        serve_task = asyncio.create_task(server.serve(sockets=[self.sock]))
+        while not server.started:
+            if serve_task.done():
+                serve_task.result()
+                return
+            await asyncio.sleep(0.01)
+        self.ready.set()
+        await self._stop_event.wait()
+        server.should_exit = True
+        await serve_task
+
+    def stop(self) -> None:
+        """Stop the server and wait for the thread to exit."""
+        if self._loop is not None and self._stop_event is not None:
+            self._loop.call_soon_threadsafe(self._stop_event.set)
+        self.join(timeout=SERVER_START_TIMEOUT)
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    group = parser.getgroup('fnos-mock-server')
+    group.addoption(
+        '--fnos-mock-transport',
+        default='fastapi',
+        choices=['fastapi', 'raw'],
+        help='Transport of the fnos_mock_server fixture (default: fastapi)',
+    )
+    group.addoption(
+        '--fnos-mock-host',
+        default='127.0.0.1',
+        help='Bind host of the fnos_mock_server fixture (default: 127.0.0.1)',
+    )
+
+
+@pytest.fixture(scope='session')
+def fnos_mock_server(request: pytest.FixtureRequest) -> Iterator[MockServerInfo]:
+    """Session-scoped real mock server bound to an ephemeral port.
+
+    每个 pytest-xdist worker 是独立进程，因此各自启动一个实例。
+    """
+    transport = request.config.getoption('--fnos-mock-transport')
+    host = request.config.getoption('--fnos-mock-host')
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, 0))
+    sock.listen(1024)
+    sock.setblocking(False)
+    port = sock.getsockname()[1]
+
+    thread = _ServerThread(sock, transport)
+    thread.start()
+    if not thread.ready.wait(SERVER_START_TIMEOUT) or thread.error is not None:
+        thread.stop()
+        sock.close()
+        raise RuntimeError(f'fnOS mock server failed to start: {thread.error}')
+
+    worker = os.environ.get('PYTEST_XDIST_WORKER', 'master')
+    logger.info(f'fnOS mock server ({transport}) for worker {worker} on {host}:{port}')
+    try:
+        yield MockServerInfo(host=host, port=port, transport=transport)
+    finally:
+        thread.stop()
+        sock.close()
+
+
+@pytest.fixture
+def fnos_in_memory(monkeypatch: pytest.MonkeyPatch) -> str:
+    """Route ``websockets.connect`` to the in-memory transport.
+
+    Returns:
+        Endpoint to pass to ``FnosClient.connect``
+    """
+    monkeypatch.setattr(websockets, 'connect', connect_in_memory)
+    return IN_MEMORY_ENDPOINT
@@ -0,0 +1,231 @@
+"""Token-bucket rate limiting for fnOS Mock Server.
+
+共享的 Mock 服务器上，一个忙循环的客户端就可能占满事件循环。本模块提供三级
+令牌桶限流：
+
+- 每个连接一个令牌桶；
+- 按 ``req`` 通配符匹配的令牌桶（所有连接共享）；
+- 全局令牌桶。
+
+超限的请求按配置直接返回失败响应（``reject``），或延迟到令牌足够时再处理
+（``delay``）。每条消息的开销是常数：``req`` 直接从原始帧中截取，
+匹配结果按 ``req`` 缓存（有上限），令牌桶按时间差惰性补充。
+"""
+
+import fnmatch
+import functools
+import logging
+import time
+from typing import Any
+
+
+logger = logging.getLogger(__name__)
+
+
+ACTIONS = ('reject', 'delay')
+
+# 缓存匹配结果的 req 数（客户端可以发送任意 req，缓存需有上限）
+MATCH_CACHE_SIZE = 1024
+
+
+def peek_field(message: str, name: str) -> str | None:
+    """Extract a string field from a raw request frame without parsing it.
+
+    仅用于限流，不处理转义字符；找不到时返回 None。
+    """
+    key = f'"{name}"'
+    start = message.find(key)
+    if start < 0:
+        return None
+    start = message.find('"', start + len(key))
+    end = message.find('"', start + 1) if start >= 0 else -1
+    if end < 0:
+        return None
+    return message[start + 1:end]
+
+
+def parse_rate(spec: str) -> tuple[float, float]:
+    """Parse ``RATE[/BURST]`` (requests per second, bucket size).
+
+    Raises:
+        ValueError: If the rate is not positive
+    """
+    rate, _, burst = spec.strip().partition('/')
+    rate_value = float(rate)
+    if rate_value <= 0:
+        raise ValueError(f'Rate must be positive: {spec}')
+    return rate_value, float(burst) if burst else max(rate_value, 1.0)
+
+
+def parse_pattern_rates(spec: str | None) -> dict[str, tuple[float, float]]:
+    """Parse ``pattern=RATE[/BURST],...`` into per-pattern rates."""
+    rates = {}
+    for part in (spec or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        pattern, sep, rate = part.rpartition('=')
+        if not sep or not pattern:
+            raise ValueError(f'Expected pattern=RATE[/BURST]: {part}')
+        rates[pattern.strip()] = parse_rate(rate)
+    return rates
+
+
+class TokenBucket:
+    """Token bucket refilled lazily from the elapsed time."""
+
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate: float, burst: float) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+
+class RateLimiter:
+    """Per-connection, per-req-pattern and global token buckets."""
+
+    def __init__(
+        self,
+        per_connection: tuple[float, float] | None = None,
+        global_rate: tuple[float, float] | None = None,
+        patterns: dict[str, tuple[float, float]] | None = None,
+        action: str = 'reject',
+    ) -> None:
+        """Create the limiter.
+
+        Args:
+            per_connection: Rate and burst of each connection's bucket
+            global_rate: Rate and burst of the server-wide bucket
+            patterns: Rate and burst per ``req`` wildcard pattern (first match wins)
+            action: ``reject`` or ``delay`` excess requests
+
+        Raises:
+            ValueError: If the action is unknown
+        """
+        if action not in ACTIONS:
+            raise ValueError(f'Unknown rate limit action: {action}')
+        self.per_connection = per_connection
+        self.action = action
+        self.global_bucket = TokenBucket(*global_rate) if global_rate else None
+        self._patterns = [
+            (pattern, TokenBucket(*rate)) for pattern, rate in (patterns or {}).items()
+        ]
+        # 每种 req 的令牌桶在首次出现时匹配，缓存最近使用的 MATCH_CACHE_SIZE 种
+        self._match = functools.lru_cache(maxsize=MATCH_CACHE_SIZE)(self._match_bucket)
+        self.allowed = 0
+        self.limited = 0
+
+    def connection_bucket(self) -> TokenBucket | None:
+        """Create the bucket of a new connection."""
+        if self.per_connection is None:
+            return None
+        return TokenBucket(*self.per_connection)
+
+    def _match_bucket(self, req: str) -> TokenBucket | None:
+        """Return the bucket of the first pattern matching a request type."""
+        return next((b for pattern, b in self._patterns if fnmatch.fnmatchcase(req, pattern)), None)
+
+    def _bucket_for(self, req: str | None) -> TokenBucket | None:
+        """Resolve (and cache) the pattern bucket of a request type."""
+        if not self._patterns or req is None:
+            return None
+        return self._match(req)
+
+    @property
+    def by_req(self) -> bool:
+        """Whether any limit depends on the request type."""
+        return bool(self._patterns)
+
+    def acquire(self, connection: TokenBucket | None, req: str | None) -> float:
+        """Take one token from every applicable bucket.
+
+        ``reject`` 模式下只有所有令牌桶都有令牌时才扣减；``delay`` 模式下总是
+        扣减（允许欠账），返回需要等待的时间。
+
+        Args:
+            connection: Bucket of the requesting connection
+            req: Request type (only needed when ``by_req``)
+
+        Returns:
+            0 if the request may proceed now, otherwise seconds until it may
+        """
+        now = time.monotonic()
+        wait = 0.0
+        buckets = (connection, self._bucket_for(req), self.global_bucket)
+        # 按时间差补充令牌并计算需要等待的时间（热点路径，手工内联）
+        for bucket in buckets:
+            if bucket is None:
+                continue
+            tokens = bucket.tokens + (now - bucket.updated) * bucket.rate
+            if tokens > bucket.burst:
+                tokens = bucket.burst
+            bucket.tokens = tokens
+            bucket.updated = now
+            if tokens < 1.0:
+                bucket_wait = (1.0 - tokens) / bucket.rate
+                if bucket_wait > wait:
+                    wait = bucket_wait
+
+        if wait and self.action == 'reject':
+            self.limited += 1
+            return wait
+
+        for bucket in buckets:
+            if bucket is not None:
+                bucket.tokens -= 1.0
+        if wait:
+            self.limited += 1
+        else:
+            self.allowed += 1
+        return wait
+
+    def stats(self) -> dict[str, Any]:
+        """Counters and configuration."""
+        return {
+            'action': self.action,
+            'allowed': self.allowed,
+            'limited': self.limited,
+            'perConnection': self.per_connection,
+            'global': [self.global_bucket.rate, self.global_bucket.burst]
+            if self.global_bucket else None,
+            'patterns': {
+                pattern: [bucket.rate, bucket.burst] for pattern, bucket in self._patterns
+            },
+        }
+
+
+_limiter: RateLimiter | None = None
+
+
+def get_rate_limiter() -> RateLimiter | None:
+    """Get the configured rate limiter."""
+    return _limiter
+
+
+def configure_rate_limits(
+    per_connection: str | None = None,
+    global_rate: str | None = None,
+    patterns: str | None = None,
+    action: str = 'reject',
+) -> None:
+    """Configure rate limiting.
+
+    Args:
+        per_connection: ``RATE[/BURST]`` of each connection
+        global_rate: ``RATE[/BURST]`` of the whole server
+        patterns: ``pattern=RATE[/BURST],...`` per request type
+        action: ``reject`` or ``delay`` excess requests
+    """
+    global _limiter
+    if not (per_connection or global_rate or patterns):
+        _limiter = None
+        return
+    _limiter = RateLimiter(
+        parse_rate(per_connection) if per_connection else None,
+        parse_rate(global_rate) if global_rate else None,
+        parse_pattern_rates(patterns),
+        action,
+    )
+    logger.info(f'Rate limiting enabled ({action})')
@@ -0,0 +1,277 @@
+"""Raw WebSocket transport for fnOS Mock Server.
+
+直接基于 ``websockets`` 库的 asyncio 服务器提供 ``/websocket`` 端点（及多设备端点），绕过
+FastAPI/Starlette 的 ASGI 层，以降低每帧开销。请求处理逻辑与 FastAPI 传输
+完全一致（``server.handlers.serve_messages``）。
+"""
+
+import asyncio
+import json
+import logging
+import signal
+import socket
+from http import HTTPStatus
+from typing import Any
+from urllib.parse import parse_qsl, unquote
+
+from websockets.asyncio.server import ServerConnection, serve
+from websockets.datastructures import Headers
+from websockets.exceptions import ConnectionClosed
+from websockets.http11 import Request, Response
+from websockets.server import ServerProtocol
+
+from server import __version__
+from server.admin import handle_admin_request
+from server.devices import device_id_from_path, get_device
+from server.faults import get_fault_injector
+from server.handlers import serve_messages
+from server.writer import SendMany, sequential_send_many
+from server.connections import drain_connections, start_reaper, stop_reaper
+from server.health import start_lag_monitor, stop_lag_monitor
+from server.rest import API_PREFIX, handle_api_request
+from server.startup import get_startup_report
+
+
+logger = logging.getLogger(__name__)
+
+
+def _json_response(
+    status: HTTPStatus,
+    body: dict | str | bytes,
+    extra_headers: dict[str, str] | None = None,
+) -> Response:
+    """Build a plain HTTP JSON (or text) response.
+
+    Args:
+        status: HTTP status
+        body: Response body; strings are sent as ``text/plain``, bytes as
+            already serialized JSON
+        extra_headers: Additional response headers
+
+    Returns:
+        HTTP response
+    """
+    if isinstance(body, str):
+        payload = body.encode('utf-8')
+        content_type = 'text/plain; charset=utf-8'
+    elif isinstance(body, bytes):
+        payload = body
+        content_type = 'application/json'
+    else:
+        payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        content_type = 'application/json'
+    headers = Headers([
+        ('Content-Type', content_type),
+        ('Content-Length', str(len(payload))),
+        ('Connection', 'close'),
+    ])
+    headers.update(extra_headers or {})
+    return Response(status.value, status.phrase, headers, payload)
+
+
+async def process_request(connection: ServerConnection, request: Request) -> Response | None:
+    """Serve the HTTP routes and reject unknown paths before the handshake.
+
+    Args:
+        connection: Server connection
+        request: HTTP request of the opening handshake
+
+    Returns:
+        HTTP response, or None to continue with the WebSocket handshake
+    """
+    path, _, query = request.path.partition('?')
+    try:
+        device_id = device_id_from_path(path)
+    except ValueError:
+        pass
+    else:
+        try:
+            get_device(device_id)
+        except ValueError as e:
+            return _json_response(HTTPStatus.NOT_FOUND, {'detail': str(e)})
+        # 故障注入：拒绝期间直接返回 503，握手失败
+        if not await get_fault_injector().admit():
+            return _json_response(HTTPStatus.SERVICE_UNAVAILABLE, {'detail': 'Refusing connections'})
+        return None
+    if path == '/':
+        return _json_response(HTTPStatus.OK, {
+            'message': 'fnOS Mock Server',
+            'version': __version__,
+        })
+    if path.startswith(API_PREFIX):
+        # HTTP 解析不接受请求体，raw 传输只支持 GET
+        return _json_response(*handle_api_request(
+            unquote(path[len(API_PREFIX):]),
+            dict(parse_qsl(query)),
+            request.method,
+            if_none_match=request.headers.get('If-None-Match'),
+        ))
+    admin = await handle_admin_request(path, dict(parse_qsl(query)), request.method)
+    if admin is not None:
+        return _json_response(*admin)
+    return _json_response(HTTPStatus.NOT_FOUND, {'detail': 'Not Found'})
+
+
+def _supports_batch_send() -> bool:
+    """Whether the installed websockets exposes the internals ``batch_sender`` uses."""
+    return (
+        callable(getattr(ServerConnection, 'send_context', None))
+        and callable(getattr(ServerProtocol, 'send_text', None))
+        and callable(getattr(ServerProtocol, 'data_to_send', None))
+    )
+
+
+# batch_sender 依赖 websockets 的内部接口（send_context、协议对象与 transport），
+# 升级后若不再提供，则退回到逐帧发送
+BATCH_SEND = _supports_batch_send()
+if not BATCH_SEND:
+    logger.warning('websockets internals changed, raw transport sends frames one by one')
+
+
+def batch_sender(websocket: ServerConnection) -> SendMany:
+    """Build a ``send_many`` that writes a batch of frames with one transport write.
+
+    Args:
+        websocket: websockets server connection
+
+    Returns:
+        Coroutine function sending text frames in order (one ``send`` per
+        frame when the websockets internals are not available)
+    """
+    if not BATCH_SEND:
+        return sequential_send_many(websocket.send)
+
+    async def send_many(frames: list[str]) -> None:
+        if len(frames) == 1:
+            await websocket.send(frames[0])
+            return
+        async with websocket.send_context():
+            protocol = websocket.protocol
+            for frame in frames:
+                protocol.send_text(frame.encode('utf-8'))
+            # 合并为一次写入；退出上下文时 send_data 已无数据，只做流控 drain
+            websocket.transport.write(b''.join(protocol.data_to_send()))
+    return send_many
+
+
+async def handle_raw_websocket(websocket: ServerConnection) -> None:
+    """Handle one raw WebSocket connection.
+
+    Args:
+        websocket: websockets server connection
+    """
+    client_id = id(websocket)
+    device_id = device_id_from_path(websocket.request.path)
+    logger.info(f'WebSocket client connected: {client_id} (device={device_id})')
+
+    async def drop() -> None:
+        # 不发送关闭帧，直接中止 TCP 连接
+        websocket.transport.abort()
+
+    try:
+        await serve_messages(
+            websocket.recv,
+            websocket.send,
+            client_id,
+            get_device(device_id),
+            batch_sender(websocket),
+            close=lambda: websocket.close(1001, 'Idle timeout'),
+            abort=drop,
+        )
+    except ConnectionClosed:
+        logger.info(f'WebSocket client disconnected: {client_id}')
+    except Exception as e:
+        logger.error(f'Error handling WebSocket connection {client_id}: {e}')
+
+
+def create_raw_server(**kwargs: Any) -> serve:
+    """Create the raw transport server.
+
+    Args:
+        **kwargs: Listen arguments passed to ``websockets`` (host/port or sock)
+
+    Returns:
+        Server context manager
+    """
+    return serve(
+        handle_raw_websocket,
+        process_request=process_request,
+        # 与 uvicorn 默认行为保持一致：由客户端负责心跳
+        ping_interval=None,
+        max_size=None,
+        # 重连风暴时大量连接同时到达，与 uvicorn 默认值一致
+        backlog=2048,
+        **kwargs,
+    )
+
+
+async def serve_raw(
+    host: str,
+    port: int,
+    sock: socket.socket | None = None,
+    drain_timeout: float | None = None,
+) -> None:
+    """Serve the raw transport until cancelled.
+
+    Args:
+        host: Listen host
+        port: Listen port
+        sock: Inherited listening socket (used instead of host/port)
+        drain_timeout: When set, SIGTERM stops accepting and waits this many
+            seconds for the open connections to close before exiting
+    """
+    listen: dict[str, Any] = {'sock': sock} if sock is not None else {'host': host, 'port': port}
+    async with create_raw_server(**listen) as server:
+        logger.info(f'Raw transport listening on {host}:{port}')
+        get_startup_report().complete('listening')
+        start_lag_monitor()
+        start_reaper()
+        try:
+            if drain_timeout is None:
+                await server.serve_forever()
+            else:
+                stopping = asyncio.Event()
+                asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stopping.set)
+                await stopping.wait()
+                # 停止接受新连接（监听 socket 仍由主进程与新 worker 持有）
+                server.server.close()
+                await drain_connections(drain_timeout)
+                await asyncio.gather(
+                    *(c.close(1012, 'Service restart') for c in list(server.connections)),
+                    return_exceptions=True,
+                )
+        finally:
+            stop_reaper()
+            stop_lag_monitor()
+
+
+def _loop_factory():
+    """Return the uvloop loop factory when available."""
+    try:
+        import uvloop
+    except ImportError:
+        logger.info('uvloop not installed, using default asyncio event loop')
+        return None
+    return uvloop.new_event_loop
+
+
+def run_raw(
+    host: str,
+    port: int,
+    sock: socket.socket | None = None,
+    drain_timeout: float | None = None,
+) -> None:
+    """Run the raw transport, using uvloop when available.
+
+    Args:
+        host: Listen host
+        port: Listen port
+        sock: Inherited listening socket (used instead of host/port)
+        drain_timeout: Seconds to drain connections on SIGTERM (None to exit
+            on the default signal action)
+    """
+    with asyncio.Runner(loop_factory=_loop_factory()) as runner:
+        try:
+            runner.run(serve_raw(host, port, sock, drain_timeout))
+        except KeyboardInterrupt:
+            logger.info('Raw transport stopped')
@@ -1,10 +1,24 @@
-"""Response builders for fnOS Mock Server."""
+"""Response builders for fnOS Mock Server.
 
+响应文件来自一个或多个目录层（``--responses-dir``，可重复指定），内置的
+``responses/`` 目录始终是最底层。后面的层按 ``req`` 覆盖前面的层；每层中
+``devices/{device_id}/{req}.json`` 是某台模拟设备的响应变体，同样按
+（设备, ``req``）逐层覆盖。所有层在启动（及 ``POST /debug/fixtures/reload``）时
+合并为一个索引，请求处理时只做字典查找，不会逐个目录探测文件。
+"""
+
+import hashlib
 import json
 import logging
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
 from typing import Any
 
+from server import codec
+from server.tracing import current_trace
 from server.utils import (
     generate_encrypted_secret,
     generate_random_token,
@@ -16,10 +30,175 @@ from server.utils import (
 logger = logging.getLogger(__name__)
 
 
+# 内置响应目录（与当前工作目录无关）
+DEFAULT_RESPONSES_DIR = str(Path(__file__).resolve().parent.parent / 'responses')
+
+# 每层中设备响应变体所在的子目录
+DEVICES_SUBDIR = 'devices'
+
+
+def _scan_json(directory: str) -> dict[str, str]:
+    """Map ``req`` to the path of every ``{req}.json`` file in a directory."""
+    return {
+        name[:-len('.json')]: os.path.join(directory, name)
+        for name in sorted(os.listdir(directory))
+        if name.endswith('.json')
+    }
+
+
+class ResponseIndex:
+    """Merged index of layered response directories."""
+
+    def __init__(self, layers: list[str]) -> None:
+        """Resolve every layer into one index.
+
+        Args:
+            layers: Response directories, later ones overriding earlier ones
+
+        Raises:
+            NotADirectoryError: If a layer is not a directory
+        """
+        self.layers = [os.path.abspath(layer) for layer in layers]
+        self.files: dict[str, str] = {}
+        # device_id -> req -> path
+        self.variants: dict[str, dict[str, str]] = {}
+        self.overridden = 0
+        for layer in self.layers:
+            if not os.path.isdir(layer):
+                raise NotADirectoryError(f'Response directory not found: {layer}')
+            files = _scan_json(layer)
+            self.overridden += len(files.keys() & self.files.keys())
+            self.files.update(files)
+
+            devices_dir = os.path.join(layer, DEVICES_SUBDIR)
+            if not os.path.isdir(devices_dir):
+                continue
+            for device_id in sorted(os.listdir(devices_dir)):
+                device_dir = os.path.join(devices_dir, device_id)
+                if os.path.isdir(device_dir):
+                    self.variants.setdefault(device_id, {}).update(_scan_json(device_dir))
+
+    def path(self, req: str, device_id: str | None = None) -> str | None:
+        """Return the response file of ``req`` (the device variant if any)."""
+        if device_id is not None:
+            variants = self.variants.get(device_id)
+            if variants is not None and req in variants:
+                return variants[req]
+        return self.files.get(req)
+
+    def paths(self) -> list[str]:
+        """Return every indexed response file."""
+        result = list(self.files.values())
+        for variants in self.variants.values():
+            result.extend(variants.values())
+        return result
+
+    def to_dict(self) -> dict[str, Any]:
+        """Summarize the index."""
+        return {
+            'layers': self.layers,
+            'files': len(self.files),
+            'overridden': self.overridden,
+            'variants': {device_id: len(v) for device_id, v in self.variants.items()},
+        }
+
+
+# 合并后的响应文件索引（首次使用时以内置目录创建）
+_index: ResponseIndex | None = None
+
+
+def get_response_index() -> ResponseIndex:
+    """Get the merged response file index."""
+    global _index
+    if _index is None:
+        _index = ResponseIndex([DEFAULT_RESPONSES_DIR])
+    return _index
+
+
+def configure_responses(dirs: list[str] | None = None) -> ResponseIndex:
+    """Resolve the response directory layers and drop the cached files.
+
+    Args:
+        dirs: Directories layered over the built-in ``responses/`` (later wins)
+
+    Returns:
+        New index
+    """
+    global _index
+    index = ResponseIndex([DEFAULT_RESPONSES_DIR, *(dirs or [])])
+    _index = index
+    _response_cache.clear()
+    _encoded_cache.clear()
+    logger.info(
+        f'Indexed {len(index.files)} response files from {len(index.layers)} layers '
+        f'({index.overridden} overridden, {len(index.variants)} devices with variants)'
+    )
+    return index
+
+
+def reload_responses() -> ResponseIndex:
+    """Re-resolve the current layers (picking up added or removed files)."""
+    return configure_responses(get_response_index().layers[1:])
+
+
 # 响应文件缓存
 _response_cache: dict[str, dict[str, Any]] = {}
 
 
+@dataclass(frozen=True, slots=True)
+class EncodedResponse:
+    """Response file serialized once at load time."""
+
+    body: bytes
+    etag: str
+
+
+# 响应文件加载时预先序列化的字节与强 ETag（供 HTTP 接口使用）
+_encoded_cache: dict[str, EncodedResponse] = {}
+
+
+class PrebuiltResponse(dict):
+    """Response dictionary carrying its JSON text, built without ``codec.dumps``.
+
+    合成数据的大响应（如数千个容器的 stats）只在数据变化时序列化一次，每个
+    请求只拼接 reqid；``text`` 与 ``codec.dumps`` 的结果相同。
+    """
+
+    __slots__ = ('text',)
+
+
+def dumps_response(response: dict[str, Any]) -> str:
+    """Serialize a response, reusing the text of a ``PrebuiltResponse``."""
+    if type(response) is PrebuiltResponse:
+        return response.text
+    return codec.dumps(response)
+
+
+def make_etag(payload: bytes) -> str:
+    """Build a strong ETag from the response bytes."""
+    return '"' + hashlib.blake2b(payload, digest_size=16).hexdigest() + '"'
+
+
+def get_encoded_response(file_path: str) -> EncodedResponse:
+    """Get the pre-serialized bytes and ETag of a response file.
+
+    Args:
+        file_path: Path to JSON response file
+
+    Returns:
+        Serialized response and its ETag
+
+    Raises:
+        FileNotFoundError: If file does not exist
+        json.JSONDecodeError: If file is not valid JSON
+    """
+    encoded = _encoded_cache.get(file_path)
+    if encoded is None:
+        load_json_response(file_path)
+        encoded = _encoded_cache[file_path]
+    return encoded
+
+
 def load_json_response(file_path: str) -> dict[str, Any]:
     """Load JSON response from file with caching.
 
@@ -31,7 +210,7 @@ def load_json_response(file_path: str) -> dict[str, Any]:
 
     Raises:
         FileNotFoundError: If file does not exist
-        json.JSONDecodeError: If file is not valid JSON
+        json.JSONDecodeError: If file is not valid JSON (for every codec backend)
     """
     # 检查缓存
     if file_path in _response_cache:
@@ -39,19 +218,53 @@ def load_json_response(file_path: str) -> dict[str, Any]:
         return _response_cache[file_path].copy()
 
     # 加载文件
+    trace = current_trace()
+    start = time.perf_counter() if trace is not None else 0.0
     if not os.path.exists(file_path):
         raise FileNotFoundError(f'Response file not found: {file_path}')
 
-    with open(file_path, 'r', encoding='utf-8') as f:
-        response = json.load(f)
+    with open(file_path, 'rb') as f:
+        response = codec.loads(f.read())
+    if trace is not None:
+        trace.add('load', start)
 
     # 缓存响应
     _response_cache[file_path] = response.copy()
+    payload = codec.dumps(response).encode('utf-8')
+    _encoded_cache[file_path] = EncodedResponse(payload, make_etag(payload))
     logger.debug(f'Loaded response from {file_path}')
 
     return response
 
 
+def preload_responses(workers: int = 1) -> int:
+    """Load every indexed response file into the cache.
+
+    ``workers`` 大于 1 时在线程池中并行读取与解析；文件读取期间释放 GIL，
+    解析部分仍受 GIL 限制，收益主要来自重叠的 I/O（冷缓存、网络文件系统）。
+
+    Args:
+        workers: Number of loader threads
+
+    Returns:
+        Number of loaded files
+    """
+    paths = get_response_index().paths()
+
+    def preload(path: str) -> bool:
+        try:
+            load_json_response(path)
+            return True
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f'Error preloading response file {path}: {e}')
+            return False
+
+    if workers <= 1:
+        return sum(map(preload, paths))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='preload') as executor:
+        return sum(executor.map(preload, paths))
+
+
 def replace_reqid(response: dict[str, Any], reqid: str) -> dict[str, Any]:
     """Replace reqid field in response with provided reqid.
 
@@ -102,17 +315,22 @@ def build_error_response(reqid: str | None, errmsg: str) -> dict[str, Any]:
     return response
 
 
-def get_response_file_path(req: str, responses_dir: str = 'responses') -> str:
+def get_response_file_path(req: str, device_id: str | None = None) -> str:
     """Get response file path for a given request type.
 
     Args:
         req: Request type (e.g., 'appcgi.resmon.cpu')
-        responses_dir: Directory containing response files
+        device_id: Emulated device whose variant is preferred (None for the default)
 
     Returns:
-        Full path to response file
+        Full path to response file (a path in the top layer that does not
+        exist when no layer has one)
     """
-    return os.path.join(responses_dir, f'{req}.json')
+    index = get_response_index()
+    path = index.path(req, device_id)
+    if path is None:
+        return os.path.join(index.layers[-1], f'{req}.json')
+    return path
 
 
 def build_get_rsa_pub_response(reqid: str) -> dict[str, Any]:
@@ -162,11 +380,12 @@ def build_login_response(reqid: str) -> dict[str, Any]:
     return response
 
 
-def build_get_hostname_response(reqid: str) -> dict[str, Any]:
+def build_get_hostname_response(reqid: str, host_name: str = 'www.timandes.cn') -> dict[str, Any]:
     """Build response for appcgi.sysinfo.getHostName request.
 
     Args:
         reqid: Request ID
+        host_name: Host name of the emulated device
 
     Returns:
         Response dictionary with host name and trim version
@@ -176,7 +395,7 @@ def build_get_hostname_response(reqid: str) -> dict[str, Any]:
         'req': 'appcgi.sysinfo.getHostName',
         'reqid': reqid,
         'data': {
-            'hostName': 'www.timandes.cn',
+            'hostName': host_name,
             'trimVersion': '1.0.0',
         },
     }
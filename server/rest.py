@@ -0,0 +1,115 @@
+"""HTTP REST mirror of the WebSocket request types.
+
+``GET /api/{req}`` 与 ``POST /api/{req}`` 以 HTTP 提供与 ``/websocket`` 相同的
+响应：查询参数（GET）或 JSON 对象请求体（POST）作为请求字段，经由与
+WebSocket 相同的分发（``route_generated``/``route_fixture``），覆盖响应、
+实时计算与合成数据同样生效。
+
+没有指定 ``reqid`` 时，响应文件原样返回：响应字节与强 ETag 在加载响应文件
+时预先计算（``responses.get_encoded_response``），轮询的客户端每次请求只需
+一次字典查找，带 ``If-None-Match`` 的条件请求比较 ETag 后直接返回 304，
+不经过序列化。实时计算与合成数据的响应每次序列化，ETag 由响应字节计算。
+"""
+
+import json
+from http import HTTPStatus
+from typing import Any
+
+from server import codec
+from server.handlers import route_fixture, route_generated
+from server.responses import (
+    build_error_response,
+    dumps_response,
+    get_encoded_response,
+    get_response_file_path,
+    make_etag,
+)
+
+
+API_PREFIX = '/api/'
+API_METHODS = ('GET', 'POST')
+
+# 未指定 reqid 时实时计算与合成数据响应使用的 reqid
+DEFAULT_REQID = 'http'
+
+
+ApiResponse = tuple[HTTPStatus, bytes, dict[str, str]]
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Check an ``If-None-Match`` header (weak comparison, RFC 9110).
+
+    Args:
+        if_none_match: Header value
+        etag: Current strong ETag
+
+    Returns:
+        Whether the client's copy is current
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    return any(tag.strip().removeprefix('W/') == etag for tag in if_none_match.split(','))
+
+
+def _conditional(payload: bytes, etag: str, method: str, if_none_match: str | None) -> ApiResponse:
+    headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+    if method == 'GET' and etag_matches(if_none_match, etag):
+        return HTTPStatus.NOT_MODIFIED, b'', headers
+    return HTTPStatus.OK, payload, headers
+
+
+def _error(status: HTTPStatus, reqid: str | None, message: str) -> ApiResponse:
+    return status, codec.dumps(build_error_response(reqid, message)).encode('utf-8'), {}
+
+
+def handle_api_request(
+    req: str,
+    params: dict[str, str],
+    method: str = 'GET',
+    body: bytes = b'',
+    if_none_match: str | None = None,
+) -> ApiResponse:
+    """Serve one REST request.
+
+    Args:
+        req: Request type (path segment after ``/api/``)
+        params: Query parameters, used as request fields for GET
+        method: HTTP method
+        body: Request body, a JSON object of request fields for POST
+        if_none_match: ``If-None-Match`` header
+
+    Returns:
+        HTTP status, JSON body and extra headers
+    """
+    # req 只能是一个路径段，不能指向 responses/ 之外的文件
+    if not req or '/' in req or '\\' in req:
+        return _error(HTTPStatus.NOT_FOUND, None, f'Unknown request type: {req}')
+    if method not in API_METHODS:
+        return _error(HTTPStatus.METHOD_NOT_ALLOWED, None, f'Method not allowed: {method}')
+    fields: Any = params
+    if method == 'POST':
+        try:
+            fields = codec.loads(body) if body else {}
+        except codec.DecodeError as e:
+            return _error(HTTPStatus.BAD_REQUEST, None, f'Invalid JSON body: {e}')
+        if not isinstance(fields, dict):
+            return _error(HTTPStatus.BAD_REQUEST, None, 'Request body must be a JSON object')
+
+    request = {'reqid': DEFAULT_REQID, **fields, 'req': req}
+    response = route_generated(request)
+    if response is None:
+        try:
+            encoded = get_encoded_response(get_response_file_path(req))
+        except FileNotFoundError:
+            return _error(HTTPStatus.NOT_FOUND, request['reqid'], f'Unknown request type: {req}')
+        except json.JSONDecodeError:
+            return _error(HTTPStatus.INTERNAL_SERVER_ERROR, request['reqid'],
+                          f'Invalid response format for {req}')
+        if 'reqid' not in fields:
+            return _conditional(encoded.body, encoded.etag, method, if_none_match)
+        response = route_fixture(req, request['reqid'])
+
+    payload = dumps_response(response).encode('utf-8')
+    return _conditional(payload, make_etag(payload), method, if_none_match)
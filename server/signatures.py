@@ -0,0 +1,145 @@
+"""Strict verification of HMAC-SHA256 request signatures.
+
+pyfnos 在登录后发送的每个帧前拼接 44 个字符的签名：以登录响应中 secret 字段
+解密得到的会话密钥对其后的 JSON 文本计算 HMAC-SHA256，再做 base64 编码。
+默认情况下 ``parse_request`` 丢弃签名，客户端的签名错误在 Mock 服务器上不会
+暴露；``--verify-signatures`` 启用本模块的严格模式，签名错误的请求返回失败
+响应。
+
+会话密钥在 ``handle_encrypted_login_request`` 中生成，与连接以及登录响应的
+token/longToken 关联：以 token 在新连接上登录（``user.authToken``/
+``user.tokenLogin``）时按请求中的 token 找回密钥。每个连接缓存一个已用密钥
+初始化的 HMAC 对象作为模板，每帧只需 ``copy()`` 后计算一次摘要，不重复派生
+内外层填充密钥。
+"""
+
+import base64
+import hashlib
+import hmac
+import logging
+from collections import OrderedDict
+
+from server import codec
+from server.ratelimit import peek_field
+
+
+logger = logging.getLogger(__name__)
+
+
+# 签名长度（base64 编码的 32 字节 HMAC-SHA256）
+SIGNATURE_LENGTH = 44
+
+# 客户端在取得会话密钥之前发送的请求，不带签名
+UNSIGNED_REQUESTS = frozenset({
+    'ping',
+    'encrypted',
+    'util.crypto.getRSAPub',
+    'appcgi.sysinfo.getHostName',
+})
+
+# 保留会话密钥的 token 数（最早登录的会话先被淘汰）
+MAX_SESSIONS = 4096
+
+
+class SignatureError(ValueError):
+    """Raised when a request frame has a missing or invalid signature."""
+
+
+class SignatureVerifier:
+    """Per-connection HMAC-SHA256 signature verification."""
+
+    def __init__(self, max_sessions: int = MAX_SESSIONS) -> None:
+        """Create a verifier.
+
+        Args:
+            max_sessions: Session secrets kept for token logins
+        """
+        self.max_sessions = max_sessions
+        # 连接 -> 以会话密钥初始化的 HMAC 模板
+        self._templates: dict[int, hmac.HMAC] = {}
+        # token -> 会话密钥
+        self._sessions: OrderedDict[str, bytes] = OrderedDict()
+
+    def establish(self, client_id: int | None, secret: bytes, tokens: tuple[str, ...] = ()) -> None:
+        """Record the session secret of a login.
+
+        Args:
+            client_id: Connection the login was made on
+            secret: Session secret sent (encrypted) in the login response
+            tokens: token/longToken of the login response
+        """
+        if client_id is not None:
+            self._templates[client_id] = hmac.new(secret, digestmod=hashlib.sha256)
+        for token in tokens:
+            if token:
+                self._sessions[token] = secret
+                self._sessions.move_to_end(token)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+    def discard(self, client_id: int) -> None:
+        """Forget the session key cached for a closed connection."""
+        self._templates.pop(client_id, None)
+
+    def _template(self, client_id: int, body: str) -> hmac.HMAC:
+        """Get the HMAC template of a connection, adopting a token's session."""
+        template = self._templates.get(client_id)
+        if template is not None:
+            return template
+        secret = self._sessions.get(peek_field(body, 'token') or '')
+        if secret is None:
+            raise SignatureError('No session secret for signed request')
+        template = self._templates[client_id] = hmac.new(secret, digestmod=hashlib.sha256)
+        return template
+
+    def verify(self, message: str, client_id: int) -> str:
+        """Verify a request frame and strip its signature.
+
+        Args:
+            message: Incoming frame (signature + JSON, or unsigned JSON)
+            client_id: Connection identifier
+
+        Returns:
+            JSON text of the request
+
+        Raises:
+            SignatureError: If the signature is missing or does not match
+        """
+        # 未签名的帧直接以 JSON 开始，base64 签名不含 "{"。按顶层 req 字段判断
+        # 是否允许不带签名（peek_field 会匹配到嵌套对象中的 "req"）
+        if message.startswith('{'):
+            try:
+                request = codec.loads(message)
+            except codec.DecodeError:
+                raise SignatureError('Missing request signature') from None
+            req = request.get('req') if isinstance(request, dict) else None
+            if isinstance(req, str) and req in UNSIGNED_REQUESTS:
+                return message
+            raise SignatureError('Missing request signature')
+
+        signature, body = message[:SIGNATURE_LENGTH], message[SIGNATURE_LENGTH:]
+        mac = self._template(client_id, body).copy()
+        mac.update(body.encode('utf-8'))
+        if not hmac.compare_digest(base64.b64encode(mac.digest()), signature.encode('utf-8')):
+            raise SignatureError('Invalid request signature')
+        return body
+
+
+_verifier: SignatureVerifier | None = None
+
+
+def get_signature_verifier() -> SignatureVerifier | None:
+    """Get the signature verifier (None when verification is disabled)."""
+    return _verifier
+
+
+def configure_signature_verification(enabled: bool) -> None:
+    """Enable or disable strict signature verification.
+
+    Args:
+        enabled: Reject requests whose HMAC-SHA256 signature does not match
+    """
+    global _verifier
+    _verifier = SignatureVerifier() if enabled else None
+    if enabled:
+        logger.info('Request signature verification enabled')
@@ -0,0 +1,109 @@
+"""Startup phase timings for ``--startup-report``.
+
+记录启动各阶段（导入、配置、创建应用、预加载响应文件、开始监听）的耗时，
+``--startup-report`` 在服务器开始监听且响应文件预加载完成后将报告打印到
+标准输出，用于排查 CI 中频繁启动模拟服务器的冷启动开销。
+
+本模块只依赖标准库，应在其他服务器模块之前导入，使报告的起点尽量靠近
+进程启动。
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+
+logger = logging.getLogger(__name__)
+
+
+# 报告在这些里程碑全部到达后打印
+MILESTONES = ('listening', 'preloaded')
+
+
+class StartupReport:
+    """Per-phase startup timings."""
+
+    def __init__(self, started: float | None = None) -> None:
+        """Create a report.
+
+        Args:
+            started: ``time.perf_counter()`` value the offsets are relative to
+        """
+        self.started = time.perf_counter() if started is None else started
+        self.enabled = False
+        # (阶段名, 开始偏移, 耗时)，单位为秒
+        self.phases: list[tuple[str, float, float]] = []
+        self.milestones: dict[str, float] = {}
+        self._callbacks: dict[str, list[Callable[[], None]]] = {}
+        self._printed = False
+        self._lock = threading.Lock()
+
+    def add(self, name: str, start: float, end: float) -> None:
+        """Record a phase from two ``time.perf_counter()`` values."""
+        with self._lock:
+            self.phases.append((name, start - self.started, end - start))
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time the enclosed block as one phase."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, start, time.perf_counter())
+
+    def when(self, milestone: str, callback: Callable[[], None]) -> None:
+        """Call ``callback`` once ``milestone`` is reached (now if it already was)."""
+        with self._lock:
+            reached = milestone in self.milestones
+            if not reached:
+                self._callbacks.setdefault(milestone, []).append(callback)
+        if reached:
+            callback()
+
+    def complete(self, milestone: str) -> None:
+        """Record a milestone and print the report once all are reached.
+
+        Args:
+            milestone: One of ``MILESTONES``
+        """
+        with self._lock:
+            self.milestones.setdefault(milestone, time.perf_counter() - self.started)
+            callbacks = self._callbacks.pop(milestone, [])
+            show = self.enabled and not self._printed and all(m in self.milestones for m in MILESTONES)
+            self._printed = self._printed or show
+        for callback in callbacks:
+            callback()
+        if show:
+            print(self.format(), flush=True)
+
+    def format(self) -> str:
+        """Format the report as a table."""
+        with self._lock:
+            phases = sorted(self.phases, key=lambda phase: phase[1])
+            milestones = sorted(self.milestones.items(), key=lambda item: item[1])
+        lines = ['Startup report:', f'  {"phase":<36} {"start ms":>10} {"took ms":>10}']
+        for name, offset, duration in phases:
+            lines.append(f'  {name:<36} {offset * 1000:>10.1f} {duration * 1000:>10.1f}')
+        for name, offset in milestones:
+            lines.append(f'  {name:<36} {offset * 1000:>10.1f} {"":>10}')
+        return '\n'.join(lines)
+
+
+_report = StartupReport()
+
+
+def get_startup_report() -> StartupReport:
+    """Get the process startup report."""
+    return _report
+
+
+def configure_startup_report(enabled: bool) -> None:
+    """Enable printing of the startup report.
+
+    Args:
+        enabled: Print the report once the server is listening and preloaded
+    """
+    _report.enabled = enabled
@@ -0,0 +1,861 @@
+"""Synthetic storage topology for the stor.* endpoints.
+
+``responses/`` 中的 stor.* 响应是互相独立的静态文件，各自的磁盘 ID 并不
+对应。配置 ``--storage "4 pools, 60 disks, 3 failing"`` 后，所有 stor.*
+响应都从同一个存储拓扑模型渲染：
+
+- 磁盘按名称建立索引，``stor.diskSmart`` 按磁盘查询为 O(1)；
+- 各端点的视图在首次请求时生成并缓存；
+- SMART 属性表在首次查询某块磁盘时才生成并缓存，模拟 100 盘 JBOD 时启动
+  也很快。
+
+``--storage-scenario "healthy:300,degraded:60,rebuilding:600"`` 让有冗余的
+存储池按时间表循环经过各状态（健康、降级、重建 N%、校验 N%），每个存储池
+（以及每个模拟设备上的同一存储池）在循环中的起点各不相同。状态与进度在
+请求时由经过的时间直接计算，不为存储池创建定时器；依赖阵列状态的视图
+缓存到该设备任一存储池的状态或进度（1% 一级）发生变化为止。
+"""
+
+import bisect
+import hashlib
+import heapq
+import itertools
+import logging
+import random
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from server.responses import build_error_response
+
+
+logger = logging.getLogger(__name__)
+
+
+_TB = 1000 ** 4
+
+_DISK_MODELS = (
+    ('ST4000VN006-3CW104', 'Seagate IronWolf', 4 * _TB),
+    ('WDC WD80EFZZ-68BTXN0', 'Western Digital Red', 8 * _TB),
+    ('ST12000VN0008-2YS101', 'Seagate IronWolf', 12 * _TB),
+    ('TOSHIBA MG08ACA16TE', 'Toshiba MG08ACA', 16 * _TB),
+)
+
+# smartctl 报告容量使用的扇区大小
+_SECTOR = 512
+
+# 场景中的存储池状态
+SCENARIO_PHASES = ('healthy', 'degraded', 'rebuilding', 'scrubbing')
+
+# 重建/校验进度的粒度（1%）
+PROGRESS_STEPS = 100
+
+
+@dataclass(frozen=True)
+class PoolStatus:
+    """Array state of a pool at one moment of a scenario."""
+
+    phase: str = 'healthy'
+    # 重建/校验进度（0 到 1，按 PROGRESS_STEPS 取整）
+    progress: float = 0.0
+    # 降级/重建中的成员磁盘槽位
+    slot: int = -1
+
+    @property
+    def array_state(self) -> str:
+        return 'active' if self.phase in ('rebuilding', 'scrubbing') else 'clean'
+
+    @property
+    def sync_action(self) -> str:
+        return {'rebuilding': 'recover', 'scrubbing': 'check'}.get(self.phase, 'idle')
+
+    def sync_completed(self, sectors: int) -> str:
+        """Format md's ``sync_completed`` for members of ``sectors`` sectors."""
+        if self.phase not in ('rebuilding', 'scrubbing'):
+            return 'none'
+        return f'{int(sectors * self.progress)} / {sectors}'
+
+    def member_state(self, slot: int) -> str:
+        """Return the md state of the member in ``slot``."""
+        if slot != self.slot:
+            return 'in_sync'
+        return {'degraded': 'faulty', 'rebuilding': 'spare'}.get(self.phase, 'in_sync')
+
+
+HEALTHY = PoolStatus()
+
+
+@dataclass
+class Disk:
+    """One physical disk."""
+
+    name: str
+    size: int
+    model_name: str
+    model_family: str
+    serial_number: str
+    pool: 'Pool'
+    slot: int
+    failing: bool
+    temperature: int
+    power_on_hours: int
+    power_cycles: int
+
+    def info(self) -> dict[str, Any]:
+        """Return the disk fields shared by listDisk/listStor/general."""
+        return {
+            'name': self.name,
+            'size': self.size,
+            'modelName': self.model_name,
+            'serialNumber': self.serial_number,
+            'type': 'HDD',
+            'protocol': 'SATA',
+            'modelFamily': self.model_family,
+            'firmwareVersion': 'SC60',
+            'logicalBlockSize': 512,
+            'physicalBlockSize': 4096,
+            'sataVersion': 'SATA 3.3',
+            'diskGroup': 'HDD',
+            'diskGroupEx': 'HDD',
+        }
+
+    def member(self, status: PoolStatus = HEALTHY) -> dict[str, Any]:
+        """Return the md member entry of this disk.
+
+        Args:
+            status: Array state of the disk's pool
+        """
+        return {
+            'name': self.name,
+            'arrSlot': str(self.slot),
+            'arrState': status.member_state(self.slot),
+        }
+
+
+@dataclass
+class Pool:
+    """One storage pool (md array + device mapper volume)."""
+
+    stor_id: int
+    level: str
+    uuid: str
+    md_uuid: str
+    fstype: str
+    used_ratio: float
+    disks: list[Disk] = field(default_factory=list)
+
+    @property
+    def name(self) -> str:
+        return f'dm-{self.stor_id - 1}'
+
+    @property
+    def md_name(self) -> str:
+        return f'md{self.stor_id - 1}'
+
+    @property
+    def mountpoint(self) -> str:
+        return f'/vol{self.stor_id}'
+
+    @property
+    def size(self) -> int:
+        """Usable array size in bytes."""
+        if not self.disks:
+            return 0
+        smallest = min(d.size for d in self.disks)
+        n = len(self.disks)
+        data_disks = {'basic': n, 'raid1': 1, 'raid5': n - 1, 'raid6': n - 2}[self.level]
+        return smallest * data_disks
+
+    @property
+    def redundant(self) -> bool:
+        """Whether the array survives (and can rebuild) a failed member."""
+        return self.level != 'basic' and len(self.disks) > 1
+
+    @property
+    def fssize(self) -> int:
+        return self.size // 4096 * 4096 * 99 // 100
+
+    @property
+    def frsize(self) -> int:
+        return int(self.fssize * (1.0 - self.used_ratio)) // 4096 * 4096
+
+    def md(self, with_disks: str | None = None, status: PoolStatus = HEALTHY) -> dict[str, Any]:
+        """Return the md array description.
+
+        Args:
+            with_disks: Key under which member disks are listed (None to omit)
+            status: Array state of the pool
+        """
+        md = {
+            'name': self.md_name,
+            'uuid': self.md_uuid,
+            'raidDisks': len(self.disks),
+            'level': self.level,
+            'arrayState': status.array_state,
+            'syncAction': status.sync_action,
+            'syncCompleted': status.sync_completed(min(d.size for d in self.disks) // _SECTOR),
+        }
+        if with_disks:
+            md[with_disks] = [d.member(status) for d in self.disks]
+        return md
+
+
+def parse_topology_spec(spec: str) -> dict[str, Any]:
+    """Parse a compact topology spec such as ``"4 pools, 60 disks, 3 failing"``.
+
+    也支持 ``pools=4,disks=60,failing=3`` 形式，以及可选的 RAID 级别
+    （``raid1``/``raid5``/``raid6``/``basic``）。
+
+    Args:
+        spec: Topology spec
+
+    Returns:
+        Dictionary with pools, disks, failing and level (None for automatic)
+
+    Raises:
+        ValueError: If the spec does not describe any disk
+    """
+    result: dict[str, Any] = {'pools': 1, 'disks': 0, 'failing': 0, 'level': None}
+    for key in ('pools', 'disks', 'failing'):
+        singular = key.rstrip('s')
+        match = (re.search(rf'(\d+)\s*{singular}', spec)
+                 or re.search(rf'{singular}s?\s*=\s*(\d+)', spec))
+        if match:
+            result[key] = int(match.group(1))
+    level = re.search(r'\b(basic|raid1|raid5|raid6)\b', spec)
+    if level:
+        result['level'] = level.group(1)
+
+    if result['disks'] <= 0:
+        raise ValueError(f'Invalid storage spec (no disks): {spec}')
+    result['pools'] = max(1, min(result['pools'], result['disks']))
+    result['failing'] = max(0, min(result['failing'], result['disks']))
+    return result
+
+
+def parse_scenario_spec(spec: str) -> list[tuple[str, float]]:
+    """Parse a scenario schedule such as ``"healthy:300,degraded:60,rebuilding:600"``.
+
+    Args:
+        spec: Comma separated ``phase:seconds`` entries, repeated in a cycle
+
+    Returns:
+        List of (phase, duration) tuples
+
+    Raises:
+        ValueError: If a phase is unknown or a duration is not positive
+    """
+    phases = []
+    for item in spec.split(','):
+        phase, _, seconds = item.strip().partition(':')
+        if phase not in SCENARIO_PHASES:
+            raise ValueError(f'Unknown storage phase {phase!r}, expected one of {SCENARIO_PHASES}')
+        duration = float(seconds)
+        if duration <= 0:
+            raise ValueError(f'Phase duration must be positive: {item.strip()}')
+        phases.append((phase, duration))
+    return phases
+
+
+@dataclass
+class _Schedule:
+    """Pool states of one device and the heap of their next changes."""
+
+    statuses: list[PoolStatus]
+    # (变化时间, 存储池序号)
+    heap: list[tuple[float, int]]
+    # 任一存储池的状态变化时递增
+    version: int = 0
+
+
+class StorageScenario:
+    """Cyclic schedule of pool states, evaluated lazily from elapsed time.
+
+    每个（设备, 存储池）在循环中的起点由种子确定，状态与进度由当前时间直接
+    算出。每个设备的存储池按下一次变化的时间放在一个堆中，查询时只重新计算
+    已到期的存储池，没有到期的存储池时只需比较一次堆顶。
+    """
+
+    def __init__(self, phases: list[tuple[str, float]], seed: int = 0,
+                 started: float | None = None) -> None:
+        """Create a scenario.
+
+        Args:
+            phases: (phase, duration) tuples, repeated in a cycle
+            seed: Seed of the per-pool starting points
+            started: ``time.monotonic()`` value the schedule starts at (now if None)
+        """
+        self.phases = phases
+        self.seed = seed
+        self.started = time.monotonic() if started is None else started
+        self._ends = list(itertools.accumulate(duration for _, duration in phases))
+        self.cycle = self._ends[-1]
+        # (设备, 存储池) -> (循环中的起点秒数, 故障槽位基数)
+        self._offsets: dict[tuple[str | None, int], tuple[float, int]] = {}
+        self._schedules: dict[str | None, _Schedule] = {}
+
+    @classmethod
+    def from_spec(cls, spec: str, seed: int = 0) -> 'StorageScenario':
+        """Build a scenario from a schedule spec (see ``parse_scenario_spec``)."""
+        return cls(parse_scenario_spec(spec), seed)
+
+    def forget(self, device_id: str | None) -> None:
+        """Drop the schedule of a device (it is rebuilt on the next request)."""
+        self._schedules.pop(device_id, None)
+        for key in [key for key in self._offsets if key[0] == device_id]:
+            del self._offsets[key]
+
+    def _offset(self, device_id: str | None, stor_id: int) -> tuple[float, int]:
+        """Return the stable random starting point of a pool."""
+        key = (device_id, stor_id)
+        offset = self._offsets.get(key)
+        if offset is None:
+            digest = hashlib.md5(f'scenario-{self.seed}-{device_id}-{stor_id}'.encode()).digest()
+            value = int.from_bytes(digest[:8], 'big')
+            offset = self._offsets[key] = (value % 2 ** 32 / 2 ** 32 * self.cycle, value >> 32)
+        return offset
+
+    def status(self, pool: Pool, device_id: str | None = None,
+               now: float | None = None) -> tuple[PoolStatus, float]:
+        """Return the state of a pool and the time it stays unchanged until.
+
+        Args:
+            pool: Storage pool
+            device_id: Emulated device ID (None for the default device)
+            now: ``time.monotonic()`` value (now if None)
+
+        Returns:
+            Pool state and the ``time.monotonic()`` value it changes at
+        """
+        now = time.monotonic() if now is None else now
+        start, slot_base = self._offset(device_id, pool.stor_id)
+        cycles, position = divmod(now - self.started + start, self.cycle)
+        index = min(bisect.bisect_right(self._ends, position), len(self.phases) - 1)
+        phase, duration = self.phases[index]
+        elapsed = position - (self._ends[index] - duration)
+        changes = now + duration - elapsed
+
+        if phase == 'healthy' or not pool.redundant:
+            return HEALTHY, changes
+        # 每一轮循环换一块成员磁盘出故障
+        slot = (slot_base + int(cycles)) % len(pool.disks)
+        if phase == 'degraded':
+            return PoolStatus(phase, 0.0, slot), changes
+        step = int(elapsed / duration * PROGRESS_STEPS)
+        changes = min(changes, now + (step + 1) * duration / PROGRESS_STEPS - elapsed)
+        return PoolStatus(phase, step / PROGRESS_STEPS, slot), changes
+
+    def snapshot(self, pools: list[Pool], device_id: str | None = None,
+                 now: float | None = None) -> tuple[list[PoolStatus], int]:
+        """Return the state of every pool of a device.
+
+        ``now`` 不应小于之前调用时的值。
+
+        Args:
+            pools: Storage pools
+            device_id: Emulated device ID (None for the default device)
+            now: ``time.monotonic()`` value (now if None)
+
+        Returns:
+            Pool states (shared, do not modify) and a version that changes
+            whenever one of them does
+        """
+        now = time.monotonic() if now is None else now
+        schedule = self._schedules.get(device_id)
+        if schedule is None:
+            statuses, heap = [], []
+            for index, pool in enumerate(pools):
+                status, changes = self.status(pool, device_id, now)
+                statuses.append(status)
+                heap.append((changes, index))
+            heapq.heapify(heap)
+            schedule = self._schedules[device_id] = _Schedule(statuses, heap)
+            return schedule.statuses, schedule.version
+
+        heap = schedule.heap
+        changed = False
+        while heap[0][0] <= now:
+            index = heap[0][1]
+            status, changes = self.status(pools[index], device_id, now)
+            heapq.heapreplace(heap, (changes, index))
+            if status != schedule.statuses[index]:
+                schedule.statuses[index] = status
+                changed = True
+        if changed:
+            schedule.version += 1
+        return schedule.statuses, schedule.version
+
+
+def disk_name(index: int) -> str:
+    """Return the Linux block device name of the n-th disk (sda ... sdz, sdaa ...)."""
+    letters = ''
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(ord('a') + rem) + letters
+    return f'sd{letters}'
+
+
+def _auto_level(disk_count: int) -> str:
+    """Choose a RAID level for a pool size."""
+    if disk_count == 1:
+        return 'basic'
+    if disk_count == 2:
+        return 'raid1'
+    if disk_count < 6:
+        return 'raid5'
+    return 'raid6'
+
+
+class StorageTopology:
+    """Storage pools and disks with consistent stor.* views."""
+
+    def __init__(
+        self,
+        pools: int,
+        disks: int,
+        failing: int = 0,
+        level: str | None = None,
+        seed: int = 0,
+    ) -> None:
+        """Generate a topology.
+
+        Args:
+            pools: Number of storage pools
+            disks: Number of disks, distributed evenly over the pools
+            failing: Number of disks with failing SMART health
+            level: RAID level of every pool (None to choose by pool size)
+            seed: Random seed
+        """
+        rng = random.Random(seed)
+        self.seed = seed
+        self.pools: list[Pool] = []
+        self.disks: list[Disk] = []
+        self._disk_index: dict[str, Disk] = {}
+        self._views: dict[str, Any] = {}
+        self._smart: dict[str, dict[str, Any]] = {}
+        self.scenario: StorageScenario | None = None
+        # (视图, 设备) -> (状态版本, 视图)
+        self._live_views: dict[tuple[str, str | None], tuple[int, Any]] = {}
+
+        failing_set = set(rng.sample(range(disks), failing))
+        base, extra = divmod(disks, pools)
+        index = 0
+        for p in range(pools):
+            count = base + (1 if p < extra else 0)
+            digest = hashlib.md5(f'pool-{seed}-{p}'.encode()).hexdigest()
+            pool = Pool(
+                stor_id=p + 1,
+                level=level or _auto_level(count),
+                uuid=f'trim_{digest[:8]}_{digest[8:12]}_{digest[12:16]}_{digest[16:28]}-0',
+                md_uuid=f'{digest[:8]}-{digest[8:12]}-{digest[12:16]}-{digest[16:28]}',
+                fstype='btrfs',
+                used_ratio=rng.uniform(0.2, 0.8),
+            )
+            model, family, size = _DISK_MODELS[p % len(_DISK_MODELS)]
+            for slot in range(count):
+                name = disk_name(index)
+                serial = hashlib.md5(f'disk-{seed}-{index}'.encode()).hexdigest()[:8].upper()
+                disk = Disk(
+                    name=name,
+                    size=size,
+                    model_name=model,
+                    model_family=family,
+                    serial_number=serial,
+                    pool=pool,
+                    slot=slot,
+                    failing=index in failing_set,
+                    temperature=rng.randint(30, 42),
+                    power_on_hours=rng.randint(1000, 60000),
+                    power_cycles=rng.randint(10, 500),
+                )
+                pool.disks.append(disk)
+                self.disks.append(disk)
+                self._disk_index[name] = disk
+                index += 1
+            self.pools.append(pool)
+
+        logger.debug(f'Storage topology: {pools} pools, {disks} disks, {failing} failing')
+
+    @classmethod
+    def from_spec(cls, spec: str, seed: int = 0) -> 'StorageTopology':
+        """Build a topology from a compact spec (see ``parse_topology_spec``)."""
+        return cls(**parse_topology_spec(spec), seed=seed)
+
+    def get_disk(self, name: str) -> Disk | None:
+        """Look up a disk by name (``sda`` or ``/dev/sda``)."""
+        return self._disk_index.get(name.rsplit('/', 1)[-1])
+
+    def _view(self, key: str, build: Callable[[], Any]) -> Any:
+        """Return a cached view, building it on first use."""
+        view = self._views.get(key)
+        if view is None:
+            view = self._views[key] = build()
+        return view
+
+    def _live_view(
+        self,
+        key: str,
+        build: Callable[[list[PoolStatus]], Any],
+        device_id: str | None = None,
+        now: float | None = None,
+    ) -> Any:
+        """Return a view that depends on the array states.
+
+        没有场景时与 ``_view`` 相同；有场景时视图按设备缓存，直到该设备的
+        任一存储池的状态或进度发生变化。
+        """
+        if self.scenario is None:
+            return self._view(key, lambda: build([HEALTHY] * len(self.pools)))
+        statuses, version = self.scenario.snapshot(self.pools, device_id, now)
+        cached = self._live_views.get((key, device_id))
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        view = build(statuses)
+        self._live_views[(key, device_id)] = (version, view)
+        return view
+
+    def forget(self, device_id: str | None) -> None:
+        """Drop the views and scenario state cached for a device."""
+        for key in [key for key in self._live_views if key[1] == device_id]:
+            del self._live_views[key]
+        if self.scenario is not None:
+            self.scenario.forget(device_id)
+
+    def _storage_ref(self, pool: Pool, member_state: str = 'in_sync') -> dict[str, Any]:
+        return {
+            'arrState': member_state,
+            'storUuid': pool.uuid,
+            'storId': pool.stor_id,
+            'storName': pool.name,
+            'level': pool.level,
+        }
+
+    def list_disk(self, device_id: str | None = None, now: float | None = None) -> dict[str, Any]:
+        """Build the stor.listDisk body."""
+        return self._live_view('listDisk', lambda statuses: {
+            'disk': [
+                {
+                    **d.info(),
+                    'storage': [
+                        self._storage_ref(d.pool, statuses[d.pool.stor_id - 1].member_state(d.slot))
+                    ],
+                }
+                for d in self.disks
+            ],
+        }, device_id, now)
+
+    def list_stor(self, device_id: str | None = None, now: float | None = None) -> dict[str, Any]:
+        """Build the stor.listStor body."""
+        def build(statuses: list[PoolStatus]) -> dict[str, Any]:
+            array = []
+            for pool, status in zip(self.pools, statuses):
+                md = pool.md(status=status)
+                md['size'] = pool.size
+                md['disk'] = [
+                    {
+                        **d.info(),
+                        'partitions': [{'no': 1, 'name': f'{d.name}1', 'size': d.size - 2 ** 20}],
+                        'arrSlot': str(d.slot),
+                        'arrState': status.member_state(d.slot),
+                    }
+                    for d in pool.disks
+                ]
+                array.append({
+                    'name': pool.name,
+                    'size': pool.size,
+                    'uuid': pool.uuid,
+                    'mountpoint': pool.mountpoint,
+                    'fstype': pool.fstype,
+                    'frsize': pool.frsize,
+                    'fssize': pool.fssize,
+                    'md': [md],
+                    'level': pool.level,
+                    'storId': pool.stor_id,
+                    'comment': '',
+                })
+            return {'array': array}
+        return self._live_view('listStor', build, device_id, now)
+
+    def state(self, device_id: str | None = None, now: float | None = None) -> dict[str, Any]:
+        """Build the stor.state body."""
+        return self._live_view('state', lambda statuses: {
+            'state': [
+                {
+                    'name': pool.name,
+                    'uuid': pool.uuid,
+                    'frsize': pool.frsize,
+                    'fssize': pool.fssize,
+                    'md': [pool.md('disk', status)],
+                    'level': pool.level,
+                    'storId': pool.stor_id,
+                }
+                for pool, status in zip(self.pools, statuses)
+            ],
+        }, device_id, now)
+
+    def state2(self) -> dict[str, Any]:
+        """Build the stor.state2 body."""
+        return self._view('state2', lambda: {
+            'state': [
+                {'name': p.name, 'uuid': p.uuid, 'frsize': p.frsize, 'fssize': p.fssize}
+                for p in self.pools
+            ],
+        })
+
+    def general(self, device_id: str | None = None, now: float | None = None) -> dict[str, Any]:
+        """Build the stor.general body."""
+        def build(statuses: list[PoolStatus]) -> dict[str, Any]:
+            array = []
+            block: list[dict[str, Any]] = []
+            for pool, status in zip(self.pools, statuses):
+                volume = {
+                    'name': pool.name,
+                    'uuid': pool.uuid,
+                    'mountpoint': pool.mountpoint,
+                    'frsize': pool.frsize,
+                    'fssize': pool.fssize,
+                    'level': pool.level,
+                }
+                array.append({**volume, 'md': [pool.md(status=status)], 'storId': pool.stor_id,
+                              'comment': ''})
+                md = {**pool.md('arr-devices', status), 'holders': [pool.name]}
+                block.append({**volume, 'md': [md]})
+                block.append(md)
+            for disk in self.disks:
+                block.append({
+                    **disk.info(),
+                    'partitions': [{'no': 1, 'name': f'{disk.name}1'}],
+                })
+            return {'array': array, 'block': block}
+        return self._live_view('general', build, device_id, now)
+
+    def disk_health(self) -> dict[str, Any]:
+        """Build the stor.diskHealth body."""
+        return self._view('diskHealth', lambda: {
+            'diskHealth': [
+                {
+                    'disk': d.name,
+                    'smartSupport': {'available': True, 'enabled': True},
+                    'smartStatus': {'passed': not d.failing},
+                    'powerOnTime': d.power_on_hours,
+                    'powerCycleCount': d.power_cycles,
+                    'temperature': d.temperature,
+                }
+                for d in self.disks
+            ],
+        })
+
+    def calc_space(self) -> dict[str, Any]:
+        """Build the stor.calcSpace body."""
+        return self._view('calcSpace', lambda: {
+            'fssizeSys': 63770718208,
+            'frsizeSys': 48454230016,
+            'sysDiskType': 'SSD',
+            'storTotal': len(self.pools),
+            'fssizeStor': sum(p.fssize for p in self.pools),
+            'frsizeStor': sum(p.frsize for p in self.pools),
+            'HDD': len(self.disks),
+            'SSD': 0,
+            'USB': 0,
+        })
+
+    def user_storage(self) -> dict[str, Any]:
+        """Build the stor.getUserStorage body."""
+        return self._view('getUserStorage', lambda: {
+            'stor': [
+                {
+                    'id': p.stor_id,
+                    'comment': '',
+                    'frsize': p.frsize,
+                    'fssize': p.fssize,
+                    'level': p.level,
+                    'fstype': p.fstype,
+                    'diskType': 'HDD',
+                    'quotaCurr': 16384,
+                    'quotaMax': -1,
+                }
+                for p in self.pools
+            ],
+            'uid': 1000,
+        })
+
+    def smart(self, disk: Disk) -> dict[str, Any]:
+        """Return the smartctl JSON of a disk, generating it on first use.
+
+        Args:
+            disk: Disk
+
+        Returns:
+            smartctl style JSON (shared, do not modify)
+        """
+        smart = self._smart.get(disk.name)
+        if smart is None:
+            smart = self._smart[disk.name] = self._build_smart(disk)
+        return smart
+
+    def _build_smart(self, disk: Disk) -> dict[str, Any]:
+        """Generate the SMART attribute table of a disk."""
+        rng = random.Random(f'{self.seed}-{disk.name}')
+        reallocated = rng.randint(200, 2000) if disk.failing else 0
+        pending = rng.randint(8, 200) if disk.failing else 0
+
+        def attr(attr_id: int, name: str, value: int, worst: int, thresh: int,
+                 raw: int, flags: int = 0x32) -> dict[str, Any]:
+            return {
+                'id': attr_id,
+                'name': name,
+                'value': value,
+                'worst': worst,
+                'thresh': thresh,
+                'when_failed': 'now' if value <= thresh else '',
+                'flags': {'value': flags, 'prefailure': bool(flags & 1)},
+                'raw': {'value': raw, 'string': str(raw)},
+            }
+
+        table = [
+            attr(1, 'Raw_Read_Error_Rate', 100, 100, 44, rng.randint(0, 10 ** 8), 0x0f),
+            attr(3, 'Spin_Up_Time', 95, 93, 0, 0, 0x03),
+            attr(4, 'Start_Stop_Count', 100, 100, 20, disk.power_cycles),
+            attr(5, 'Reallocated_Sector_Ct', 5 if disk.failing else 100, 5 if disk.failing else 100,
+                 10, reallocated, 0x33),
+            attr(7, 'Seek_Error_Rate', 90, 60, 45, rng.randint(0, 10 ** 9), 0x0f),
+            attr(9, 'Power_On_Hours', 100 - disk.power_on_hours // 1000, 40, 0,
+                 disk.power_on_hours),
+            attr(10, 'Spin_Retry_Count', 100, 100, 97, 0, 0x13),
+            attr(12, 'Power_Cycle_Count', 100, 100, 20, disk.power_cycles),
+            attr(187, 'Reported_Uncorrect', 100, 100, 0, pending),
+            attr(190, 'Airflow_Temperature_Cel', 100 - disk.temperature, 55, 40,
+                 disk.temperature, 0x22),
+            attr(194, 'Temperature_Celsius', disk.temperature, 45, 0, disk.temperature, 0x22),
+            attr(197, 'Current_Pending_Sector', 100, 100, 0, pending, 0x12),
+            attr(198, 'Offline_Uncorrectable', 100, 100, 0, pending, 0x10),
+            attr(199, 'UDMA_CRC_Error_Count', 200, 200, 0, 0, 0x3e),
+        ]
+        return {
+            'json_format_version': [1, 0],
+            'smartctl': {
+                'version': [7, 3],
+                'argv': ['smartctl', '-a', '--json', f'/dev/{disk.name}', '--nocheck=standby'],
+                'exit_status': 8 if disk.failing else 0,
+            },
+            'local_time': {'time_t': int(time.time())},
+            'device': {
+                'name': f'/dev/{disk.name}',
+                'info_name': f'/dev/{disk.name} [SAT]',
+                'type': 'sat',
+                'protocol': 'ATA',
+            },
+            'model_family': disk.model_family,
+            'model_name': disk.model_name,
+            'serial_number': disk.serial_number,
+            'firmware_version': 'SC60',
+            'user_capacity': {'blocks': disk.size // _SECTOR, 'bytes': disk.size},
+            'logical_block_size': 512,
+            'physical_block_size': 4096,
+            'rotation_rate': 7200,
+            'smart_support': {'available': True, 'enabled': True},
+            'smart_status': {'passed': not disk.failing},
+            'ata_smart_attributes': {'revision': 10, 'table': table},
+            'temperature': {'current': disk.temperature},
+            'power_cycle_count': disk.power_cycles,
+            'power_on_time': {'hours': disk.power_on_hours},
+        }
+
+
+_topology: StorageTopology | None = None
+
+
+def get_storage_topology() -> StorageTopology | None:
+    """Get the configured storage topology."""
+    return _topology
+
+
+def forget_device(device_id: str) -> None:
+    """Drop the per-device state of an evicted device."""
+    if _topology is not None:
+        _topology.forget(device_id)
+
+
+def configure_storage(spec: str | None, scenario: str | None = None) -> None:
+    """Configure the storage topology from a compact spec.
+
+    Args:
+        spec: Topology spec, or None to use the static fixtures
+        scenario: Pool state schedule (see ``parse_scenario_spec``), or None
+            to keep every pool healthy
+
+    Raises:
+        ValueError: If a scenario is given without a topology
+    """
+    global _topology
+    if not spec:
+        if scenario:
+            raise ValueError('A storage scenario requires a storage topology (--storage)')
+        _topology = None
+        return
+    _topology = StorageTopology.from_spec(spec)
+    if scenario:
+        _topology.scenario = StorageScenario.from_spec(scenario, _topology.seed)
+    logger.info(
+        f'Storage topology ready: {len(_topology.pools)} pools, {len(_topology.disks)} disks'
+    )
+
+
+_VIEWS: dict[str, Callable[[StorageTopology], dict[str, Any]]] = {
+    'stor.state2': StorageTopology.state2,
+    'stor.diskHealth': StorageTopology.disk_health,
+    'stor.calcSpace': StorageTopology.calc_space,
+    'stor.getUserStorage': StorageTopology.user_storage,
+}
+
+# 依赖阵列状态、按设备渲染的视图
+_LIVE_VIEWS: dict[str, Callable[[StorageTopology, str | None], dict[str, Any]]] = {
+    'stor.listDisk': StorageTopology.list_disk,
+    'stor.listStor': StorageTopology.list_stor,
+    'stor.state': StorageTopology.state,
+    'stor.general': StorageTopology.general,
+}
+
+# 与真实设备一致：部分 stor.* 响应不带 result 字段
+_WITHOUT_RESULT = {'stor.listDisk', 'stor.listStor'}
+
+
+def build_storage_response(
+    topology: StorageTopology,
+    req: str,
+    request: dict[str, Any],
+    reqid: str,
+    device_id: str | None = None,
+) -> dict[str, Any] | None:
+    """Build a stor.* response from the topology.
+
+    Args:
+        topology: Storage topology
+        req: Request type
+        request: Parsed request dictionary
+        reqid: Request ID
+        device_id: Emulated device ID (None for the default device)
+
+    Returns:
+        Response dictionary, or None if the topology does not model ``req``
+    """
+    if req == 'stor.diskSmart':
+        name = request.get('disk') or request.get('name') or topology.disks[0].name
+        disk = topology.get_disk(str(name))
+        if disk is None:
+            return build_error_response(reqid, f'Unknown disk: {name}')
+        return {'smart': topology.smart(disk), 'result': 'succ', 'reqid': reqid}
+
+    if req in _LIVE_VIEWS:
+        response = dict(_LIVE_VIEWS[req](topology, device_id))
+    elif req in _VIEWS:
+        response = dict(_VIEWS[req](topology))
+    else:
+        return None
+
+    if req not in _WITHOUT_RESULT:
+        response['result'] = 'succ'
+    response['reqid'] = reqid
+    return response
@@ -0,0 +1,267 @@
+"""Master process for zero-downtime hot restarts.
+
+``--hot-restart`` 启动一个主进程：主进程绑定并持有监听 socket，本身不处理
+请求，而是以相同的命令行参数启动 worker 子进程，worker 通过 ``--listen-fd``
+继承监听 socket。
+
+收到 SIGHUP 时主进程启动新的 worker（新的解释器会重新导入代码，并重新读取
+``--args-file`` 中的参数），新 worker 开始监听后向旧 worker 发送 SIGTERM：
+旧 worker 停止接受新连接，等待现有连接在 ``--drain-timeout`` 秒内断开，
+截止时仍未断开的连接以 1012（服务重启）关闭，然后退出。新旧 worker 共享同一个
+监听 socket，切换期间新连接不会被拒绝，已有连接也不会被同时断开。
+
+新 worker 启动失败时保留旧 worker；worker 意外退出时主进程重新启动它。
+SIGTERM/SIGINT 使主进程让所有 worker 排空后退出。
+"""
+
+import logging
+import os
+import select
+import shlex
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+# 等待新 worker 开始监听的秒数
+READY_TIMEOUT = 60.0
+# worker 意外退出后重新启动前等待的秒数
+RESPAWN_DELAY = 1.0
+# 排空截止后仍未退出的 worker 再等待这么多秒后强制结束
+KILL_GRACE = 5.0
+# 主循环检查信号与子进程的间隔
+POLL_INTERVAL = 0.2
+
+# 只属于主进程、不传给 worker 的参数（选项名, 是否带值）
+MASTER_OPTIONS = {'--hot-restart': False, '--args-file': True}
+
+
+def worker_arguments(argv: list[str]) -> list[str]:
+    """Remove the master-only options from the command line.
+
+    Args:
+        argv: Command line arguments of the master (without the program name)
+
+    Returns:
+        Arguments passed on to the workers
+    """
+    result = []
+    skip = False
+    for arg in argv:
+        if skip:
+            skip = False
+            continue
+        name = arg.split('=', 1)[0]
+        if name in MASTER_OPTIONS:
+            skip = MASTER_OPTIONS[name] and '=' not in arg
+            continue
+        result.append(arg)
+    return result
+
+
+def notify_ready(fd: int) -> None:
+    """Tell the master that this worker is listening.
+
+    Args:
+        fd: Write end of the readiness pipe passed with ``--ready-fd``
+    """
+    try:
+        os.write(fd, b'R')
+    finally:
+        os.close(fd)
+
+
+def _wait_ready(fd: int, timeout: float) -> bool:
+    """Wait for the readiness byte (EOF means the worker exited)."""
+    readable, _, _ = select.select([fd], [], [], timeout)
+    return bool(readable) and os.read(fd, 1) == b'R'
+
+
+class Master:
+    """Master process holding the listening socket."""
+
+    def __init__(
+        self,
+        argv: list[str],
+        host: str,
+        port: int,
+        drain_timeout: float,
+        args_file: str | None = None,
+    ) -> None:
+        """Create the master.
+
+        Args:
+            argv: Command line arguments of the master (without the program name)
+            host: Listen host
+            port: Listen port
+            drain_timeout: Seconds old workers may spend draining connections
+            args_file: File with extra worker arguments, re-read on every restart
+        """
+        self.argv = worker_arguments(argv)
+        self.host = host
+        self.port = port
+        self.drain_timeout = drain_timeout
+        self.args_file = args_file
+        self.sock: socket.socket | None = None
+        self.worker: subprocess.Popen | None = None
+        # 正在排空的旧 worker 及其强制结束的时间
+        self.draining: dict[subprocess.Popen, float] = {}
+        self._reload = False
+        self._stopping = False
+
+    def worker_command(self) -> list[str]:
+        """Build the command line of a new worker."""
+        args = list(self.argv)
+        if self.args_file:
+            # 后出现的参数覆盖前面的同名参数
+            with open(self.args_file, 'r', encoding='utf-8') as f:
+                args += shlex.split(f.read(), comments=True)
+        return [
+            sys.executable, '-m', 'server.main', *args, '--listen-fd', str(self.sock.fileno()),
+        ]
+
+    def spawn(self) -> subprocess.Popen | None:
+        """Start a worker and wait until it is listening.
+
+        Returns:
+            Worker process, or None if it failed to start
+        """
+        try:
+            command = self.worker_command()
+        except (OSError, ValueError) as e:
+            logger.error(f'Cannot read worker arguments from {self.args_file}: {e}')
+            return None
+        read_fd, write_fd = os.pipe()
+        try:
+            # 独立的会话：终端的 Ctrl-C 只发给主进程，由主进程转为排空
+            process = subprocess.Popen(
+                command + ['--ready-fd', str(write_fd)],
+                pass_fds=(self.sock.fileno(), write_fd),
+                start_new_session=True,
+            )
+        finally:
+            os.close(write_fd)
+        try:
+            ready = _wait_ready(read_fd, READY_TIMEOUT)
+        finally:
+            os.close(read_fd)
+        if not ready:
+            logger.error(f'Worker {process.pid} failed to start')
+            process.kill()
+            process.wait()
+            return None
+        logger.info(f'Worker {process.pid} is listening')
+        return process
+
+    def retire(self, process: subprocess.Popen) -> None:
+        """Ask a worker to drain its connections and exit."""
+        logger.info(f'Draining worker {process.pid}')
+        try:
+            process.send_signal(signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+        self.draining[process] = time.monotonic() + self.drain_timeout + KILL_GRACE
+
+    def reload(self) -> None:
+        """Replace the worker without closing the listening socket."""
+        logger.info('Hot restart requested, starting a new worker')
+        process = self.spawn()
+        if process is None:
+            if self.worker is not None:
+                logger.error(f'Keeping worker {self.worker.pid}')
+            return
+        old, self.worker = self.worker, process
+        if old is not None:
+            self.retire(old)
+
+    def reap_draining(self) -> None:
+        """Collect exited old workers and kill those past their deadline."""
+        now = time.monotonic()
+        for process, deadline in list(self.draining.items()):
+            if process.poll() is not None:
+                logger.info(f'Worker {process.pid} exited with code {process.returncode}')
+                del self.draining[process]
+            elif now > deadline:
+                logger.warning(f'Worker {process.pid} did not exit after draining, killing it')
+                process.kill()
+
+    def reap(self) -> None:
+        """Collect exited workers and restart a crashed one."""
+        self.reap_draining()
+        if self.worker is not None:
+            if self.worker.poll() is None:
+                return
+            logger.error(f'Worker {self.worker.pid} exited unexpectedly '
+                         f'with code {self.worker.returncode}')
+        time.sleep(RESPAWN_DELAY)
+        self.worker = self.spawn()
+
+    def run(self) -> int:
+        """Serve until SIGTERM/SIGINT.
+
+        Returns:
+            Exit code
+        """
+        self.sock = socket.create_server((self.host, self.port), backlog=2048)
+        logger.info(f'Master {os.getpid()} listening on {self.host}:{self.port}')
+
+        def request_reload(signum: int, frame: object) -> None:
+            self._reload = True
+
+        def request_stop(signum: int, frame: object) -> None:
+            self._stopping = True
+
+        signal.signal(signal.SIGHUP, request_reload)
+        signal.signal(signal.SIGTERM, request_stop)
+        signal.signal(signal.SIGINT, request_stop)
+
+        self.worker = self.spawn()
+        if self.worker is None:
+            self.sock.close()
+            return 1
+        while not self._stopping:
+            time.sleep(POLL_INTERVAL)
+            if self._reload:
+                self._reload = False
+                self.reload()
+            self.reap()
+        self.shutdown()
+        return 0
+
+    def shutdown(self) -> None:
+        """Drain every worker, then close the listening socket."""
+        logger.info('Stopping, draining workers')
+        if self.worker is not None:
+            self.retire(self.worker)
+            self.worker = None
+        while self.draining:
+            time.sleep(POLL_INTERVAL)
+            self.reap_draining()
+        self.sock.close()
+
+
+def run_master(
+    argv: list[str],
+    host: str,
+    port: int,
+    drain_timeout: float,
+    args_file: str | None = None,
+) -> int:
+    """Run the hot restart master.
+
+    Args:
+        argv: Command line arguments (without the program name)
+        host: Listen host
+        port: Listen port
+        drain_timeout: Seconds old workers may spend draining connections
+        args_file: File with extra worker arguments, re-read on every restart
+
+    Returns:
+        Exit code
+    """
+    return Master(argv, host, port, drain_timeout, args_file).run()
@@ -0,0 +1,196 @@
+"""Per-phase request tracing for fnOS Mock Server.
+
+启用后，每个请求按阶段（``parse``、``route``、``load``、``crypto``、
+``encode``、``send``）记录单调时钟时间戳；总耗时超过阈值的请求连同阶段明细
+保存在内存环形缓冲区中，可通过 ``/debug/slow-requests`` 查看，或通过
+``/debug/trace`` 导出指定时间窗口内的 Chrome trace-event JSON
+（在 ``chrome://tracing`` 或 Perfetto 中打开）。
+
+``send`` 从交给发送函数开始，到帧写入传输层为止：经由连接的写任务
+（``server.writer``）发送时包含排队时间，trace 在帧写出后才交给 tracer。
+
+``load`` 与 ``crypto`` 发生在路由内部，通过 ``current_trace()`` 取得当前请求
+的 trace；未启用时各处理路径上只有一次 ``None`` 判断。
+"""
+
+import logging
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_THRESHOLD_MS = 50.0
+DEFAULT_BUFFER_SIZE = 1024
+
+
+class RequestTrace:
+    """Phase timestamps of one request."""
+
+    __slots__ = ('client_id', 'req', 'reqid', 'start', 'wall_start', 'phases')
+
+    def __init__(self, client_id: int) -> None:
+        self.client_id = client_id
+        self.req: str | None = None
+        self.reqid: str | None = None
+        self.start = time.perf_counter()
+        self.wall_start = time.time()
+        # (阶段名, 开始, 结束)，均为 perf_counter 值
+        self.phases: list[tuple[str, float, float]] = []
+
+    def add(self, name: str, start: float, end: float | None = None) -> float:
+        """Record a phase.
+
+        Args:
+            name: Phase name
+            start: ``time.perf_counter()`` at the start of the phase
+            end: ``time.perf_counter()`` at the end of the phase (default: now)
+
+        Returns:
+            End of the phase, usable as the start of the next one
+        """
+        end = time.perf_counter() if end is None else end
+        self.phases.append((name, start, end))
+        return end
+
+    @property
+    def duration(self) -> float:
+        """Seconds from receipt to the end of the last phase."""
+        return (self.phases[-1][2] if self.phases else self.start) - self.start
+
+    def to_dict(self) -> dict[str, Any]:
+        """Summarize the trace with per-phase milliseconds."""
+        phases: dict[str, float] = {}
+        for name, start, end in self.phases:
+            phases[name] = round(phases.get(name, 0.0) + (end - start) * 1000, 3)
+        return {
+            'ts': round(self.wall_start, 6),
+            'client': self.client_id,
+            'req': self.req,
+            'reqid': self.reqid,
+            'ms': round(self.duration * 1000, 3),
+            'phases': phases,
+        }
+
+    def chrome_events(self) -> list[dict[str, Any]]:
+        """Convert the trace to Chrome trace-event complete ("X") events."""
+        def ts(value: float) -> float:
+            return round((self.wall_start + value - self.start) * 1_000_000, 1)
+
+        events = [{
+            'name': self.req or 'request',
+            'cat': 'request',
+            'ph': 'X',
+            'ts': ts(self.start),
+            'dur': round(self.duration * 1_000_000, 1),
+            'pid': 1,
+            'tid': self.client_id,
+            'args': {'reqid': self.reqid},
+        }]
+        for name, start, end in self.phases:
+            events.append({
+                'name': name,
+                'cat': 'phase',
+                'ph': 'X',
+                'ts': ts(start),
+                'dur': round((end - start) * 1_000_000, 1),
+                'pid': 1,
+                'tid': self.client_id,
+            })
+        return events
+
+
+class SlowRequestTracer:
+    """Ring buffer of requests slower than a threshold."""
+
+    def __init__(
+        self,
+        threshold_ms: float = DEFAULT_THRESHOLD_MS,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+    ) -> None:
+        """Create the tracer.
+
+        Args:
+            threshold_ms: Requests at or above this duration are captured
+            buffer_size: Maximum captured requests (oldest are evicted)
+        """
+        self.threshold = threshold_ms / 1000
+        self.traces: deque[RequestTrace] = deque(maxlen=buffer_size)
+        self.total = 0
+        self.slow = 0
+
+    def begin(self, client_id: int) -> RequestTrace:
+        """Start tracing a request that has just been received."""
+        return RequestTrace(client_id)
+
+    def finish(self, trace: RequestTrace) -> None:
+        """Capture the trace if the request was slow."""
+        self.total += 1
+        if trace.duration >= self.threshold:
+            self.slow += 1
+            self.traces.append(trace)
+
+    def slow_requests(self, limit: int | None = None) -> list[dict[str, Any]]:
+        """Return captured requests, newest first."""
+        traces = list(reversed(self.traces))
+        if limit is not None:
+            traces = traces[:limit]
+        return [trace.to_dict() for trace in traces]
+
+    def chrome_trace(self, window: float | None = None) -> dict[str, Any]:
+        """Build a Chrome trace-event document.
+
+        Args:
+            window: Only include requests received in the last ``window`` seconds
+
+        Returns:
+            Trace document
+        """
+        since = time.time() - window if window else 0.0
+        events: list[dict[str, Any]] = []
+        for trace in self.traces:
+            if trace.wall_start >= since:
+                events.extend(trace.chrome_events())
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+
+_tracer: SlowRequestTracer | None = None
+_current_trace: ContextVar[RequestTrace | None] = ContextVar('current_trace', default=None)
+
+
+def get_tracer() -> SlowRequestTracer | None:
+    """Get the configured slow-request tracer."""
+    return _tracer
+
+
+def current_trace() -> RequestTrace | None:
+    """Get the trace of the request being routed."""
+    if _tracer is None:
+        return None
+    return _current_trace.get()
+
+
+def set_current_trace(trace: RequestTrace | None) -> None:
+    """Set the trace of the request being routed."""
+    _current_trace.set(trace)
+
+
+def configure_tracing(
+    threshold_ms: float | None = None,
+    buffer_size: int = DEFAULT_BUFFER_SIZE,
+) -> None:
+    """Configure slow-request tracing.
+
+    Args:
+        threshold_ms: Capture threshold in milliseconds, or None to disable
+        buffer_size: Maximum captured requests
+    """
+    global _tracer
+    if threshold_ms is None:
+        _tracer = None
+        return
+    _tracer = SlowRequestTracer(threshold_ms, buffer_size)
+    logger.info(f'Slow-request tracing enabled: threshold {threshold_ms} ms')
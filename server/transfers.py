@@ -0,0 +1,585 @@
+"""Synthetic file download/upload endpoints for transfer benchmarks.
+
+``--transfer-port`` 在独立端口上提供文件传输的 HTTP/1.1 端点，用于在本地
+测试客户端传输代码的吞吐量（可达数 GB）：
+
+- ``GET``/``HEAD /files/{path}``：下载。内容由固定的伪随机模式循环生成，
+  大小由 ``?size=`` 指定（如 ``4G``），默认为 ``--transfer-size``；上传后
+  仍保留在存储中的文件返回上传的内容。支持单个 ``Range`` 区间（206/416）；
+- ``PUT``/``POST /files/{path}``：上传。请求体（``Content-Length`` 或
+  ``chunked``）按块读取后丢弃，或在 ``--upload-store`` 指定的容量内保存
+  （超出容量时淘汰最早的文件）；
+- 主服务器的 ``GET /debug/transfers`` 报告各方向的次数、字节数与吞吐量，以及
+  进行中的传输。
+
+生成的内容写入一个临时文件（``PATTERN_SIZE`` 字节）并映射到内存：下载经
+``loop.sendfile`` 由内核直接从页缓存发送（``os.sendfile``，零拷贝），不可用
+时退回到发送内存映射的切片。WebSocket 传输使用的 HTTP 解析（ASGI、websockets）
+不支持流式请求体与 sendfile，uvloop 也没有实现 ``loop.sendfile``，因此传输
+端点运行在独立线程中的标准 asyncio 事件循环上，大文件传输也不会延迟
+WebSocket 响应。
+"""
+
+import asyncio
+import logging
+import mmap
+import random
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from typing import Any, AsyncIterator
+from urllib.parse import parse_qsl, unquote
+
+from server import codec
+
+
+logger = logging.getLogger(__name__)
+
+
+TRANSFER_PREFIX = '/files/'
+
+# 下载内容循环使用的模式大小
+PATTERN_SIZE = 4 * 1024 * 1024
+# 上传请求体每次读取的字节数
+CHUNK_SIZE = 256 * 1024
+# 未指定 size 时合成文件的默认大小
+DEFAULT_SIZE = '100M'
+# /debug/transfers 保留的最近完成的传输数
+RECENT_TRANSFERS = 50
+# 等待传输端点开始监听的秒数
+START_TIMEOUT = 10.0
+
+_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+
+
+def parse_size(text: str) -> int:
+    """Parse a byte size such as ``1048576``, ``512K``, ``100M`` or ``4G`` (binary units).
+
+    Raises:
+        ValueError: If the size is malformed or negative
+    """
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([KMGT]?)(?:i?B)?\s*', text, re.IGNORECASE)
+    if not match:
+        raise ValueError(f'Invalid size: {text}')
+    return int(float(match.group(1)) * _UNITS[match.group(2).upper()])
+
+
+def parse_range(header: str | None, size: int) -> tuple[int, int] | None:
+    """Parse a ``Range`` header for a resource of ``size`` bytes.
+
+    只支持单个区间；缺失、格式错误或包含多个区间的 Range 被忽略（返回完整
+    内容，符合 RFC 9110）。
+
+    Args:
+        header: ``Range`` header value
+        size: Resource size in bytes
+
+    Returns:
+        (start, end) byte positions (inclusive), or None for the whole resource
+
+    Raises:
+        ValueError: If the range cannot be satisfied (416)
+    """
+    match = re.fullmatch(r'\s*bytes\s*=\s*(\d*)\s*-\s*(\d*)\s*', header or '')
+    if not match or not (match.group(1) or match.group(2)):
+        return None
+    first, last = match.groups()
+    if not first:
+        # 后缀区间：最后 N 个字节
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError('Range not satisfiable')
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or (last and int(last) < start):
+        raise ValueError('Range not satisfiable')
+    return start, end
+
+
+@dataclass(eq=False)
+class Transfer:
+    """One download or upload in progress."""
+
+    direction: str
+    path: str
+    size: int | None
+    started: float = field(default_factory=time.perf_counter)
+    bytes: int = 0
+
+    def to_dict(self, now: float | None = None) -> dict[str, Any]:
+        seconds = (time.perf_counter() if now is None else now) - self.started
+        return {
+            'direction': self.direction,
+            'path': self.path,
+            'size': self.size,
+            'bytes': self.bytes,
+            'seconds': round(seconds, 3),
+            'throughputMBps': round(self.bytes / seconds / 1e6, 1) if seconds > 0 else None,
+        }
+
+
+class TransferStats:
+    """Throughput accounting of the transfer endpoints."""
+
+    def __init__(self) -> None:
+        self.active: set[Transfer] = set()
+        self.recent: deque[dict[str, Any]] = deque(maxlen=RECENT_TRANSFERS)
+        # 方向 -> [完成次数, 字节数, 耗时秒数, 失败次数]
+        self.totals = {direction: [0, 0, 0.0, 0] for direction in ('download', 'upload')}
+        self._lock = threading.Lock()
+
+    def begin(self, direction: str, path: str, size: int | None) -> Transfer:
+        """Register a transfer that is starting."""
+        transfer = Transfer(direction, path, size)
+        with self._lock:
+            self.active.add(transfer)
+        return transfer
+
+    def finish(self, transfer: Transfer, ok: bool = True) -> dict[str, Any]:
+        """Account a finished (or aborted) transfer and return its summary."""
+        summary = transfer.to_dict()
+        with self._lock:
+            self.active.discard(transfer)
+            totals = self.totals[transfer.direction]
+            totals[1] += transfer.bytes
+            totals[2] += summary['seconds']
+            if ok:
+                totals[0] += 1
+                self.recent.append(summary)
+            else:
+                totals[3] += 1
+        return summary
+
+    def summary(self) -> dict[str, Any]:
+        """Return the counters, the transfers in progress and the recent ones."""
+        now = time.perf_counter()
+        with self._lock:
+            return {
+                **{
+                    direction: {
+                        'completed': completed,
+                        'failed': failed,
+                        'bytes': total,
+                        'seconds': round(seconds, 3),
+                        'throughputMBps': round(total / seconds / 1e6, 1) if seconds > 0 else None,
+                    }
+                    for direction, (completed, total, seconds, failed) in self.totals.items()
+                },
+                'active': [t.to_dict(now) for t in self.active],
+                'recent': list(self.recent),
+            }
+
+
+class UploadStore:
+    """Uploaded files kept in memory within a byte budget (oldest evicted first)."""
+
+    def __init__(self, capacity: int) -> None:
+        """Create a store.
+
+        Args:
+            capacity: Total bytes kept, 0 to discard every upload
+        """
+        self.capacity = capacity
+        self.used = 0
+        self._files: OrderedDict[str, bytes] = OrderedDict()
+
+    def get(self, path: str) -> bytes | None:
+        """Return the content of a stored upload."""
+        return self._files.get(path)
+
+    def put(self, path: str, data: bytes) -> bool:
+        """Store an upload, evicting older ones to make room.
+
+        Returns:
+            Whether the upload fits in the store
+        """
+        self.discard(path)
+        if len(data) > self.capacity:
+            return False
+        while self.used + len(data) > self.capacity:
+            _, evicted = self._files.popitem(last=False)
+            self.used -= len(evicted)
+        self._files[path] = data
+        self.used += len(data)
+        return True
+
+    def discard(self, path: str) -> None:
+        """Remove a stored upload."""
+        data = self._files.pop(path, None)
+        if data is not None:
+            self.used -= len(data)
+
+
+class _BadRequest(Exception):
+    """Raised for a malformed HTTP request (the connection is closed)."""
+
+
+class TransferServer:
+    """HTTP/1.1 download/upload server running on its own thread and loop."""
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        default_size: int,
+        store_capacity: int = 0,
+        reuse_port: bool = False,
+    ) -> None:
+        """Create the server.
+
+        Args:
+            host: Listen host
+            port: Listen port (0 for a free port)
+            default_size: Size of synthetic downloads without ``?size=``
+            store_capacity: Bytes of uploads kept for download, 0 to discard
+            reuse_port: Set ``SO_REUSEPORT`` so that the old and new hot-restart
+                workers can listen at the same time
+        """
+        self.host = host
+        self.port = port
+        self.reuse_port = reuse_port
+        self.default_size = default_size
+        self.store = UploadStore(store_capacity)
+        self.stats = TransferStats()
+        self.zero_copy = True
+
+        # 下载内容：确定性的伪随机模式，写入临时文件供 sendfile 使用并映射到内存
+        self._file = tempfile.TemporaryFile()
+        self._file.write(random.Random(0).randbytes(PATTERN_SIZE))
+        self._file.flush()
+        self._map = mmap.mmap(self._file.fileno(), PATTERN_SIZE, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._server: asyncio.Server | None = None
+        self._thread: threading.Thread | None = None
+
+    def content(self, start: int, length: int) -> bytes:
+        """Return synthetic download bytes (for clients verifying what they received)."""
+        result = bytearray()
+        while length > 0:
+            offset = start % PATTERN_SIZE
+            n = min(length, PATTERN_SIZE - offset)
+            result += self._view[offset:offset + n]
+            start += n
+            length -= n
+        return bytes(result)
+
+    def start(self) -> None:
+        """Start listening on a background thread.
+
+        Raises:
+            OSError: If the port cannot be bound
+        """
+        ready = threading.Event()
+        errors: list[BaseException] = []
+
+        def run() -> None:
+            loop = self._loop = asyncio.new_event_loop()
+            try:
+                # 读缓冲与上传的读取块大小一致；只有热重启的 worker 设置
+                # SO_REUSEPORT，单独运行时端口被占用应启动失败，而不是与
+                # 另一个进程分摊连接
+                self._server = loop.run_until_complete(asyncio.start_server(
+                    self._handle, self.host, self.port,
+                    limit=CHUNK_SIZE, reuse_port=self.reuse_port or None, backlog=2048,
+                ))
+            except BaseException as e:
+                errors.append(e)
+                ready.set()
+                loop.close()
+                return
+            self.port = self._server.sockets[0].getsockname()[1]
+            ready.set()
+            try:
+                loop.run_forever()
+            finally:
+                loop.close()
+
+        self._thread = threading.Thread(target=run, name='transfers', daemon=True)
+        self._thread.start()
+        ready.wait(START_TIMEOUT)
+        if errors:
+            raise errors[0]
+        logger.info(f'Transfer endpoints listening on {self.host}:{self.port}{TRANSFER_PREFIX}')
+
+    def stop(self) -> None:
+        """Stop the server and its thread."""
+        if self._loop is None or self._thread is None:
+            return
+
+        async def close() -> None:
+            self._server.close()
+            self._loop.stop()
+
+        asyncio.run_coroutine_threadsafe(close(), self._loop)
+        self._thread.join(START_TIMEOUT)
+        self._view.release()
+        self._map.close()
+        self._file.close()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve the requests of one connection (keep-alive)."""
+        try:
+            while await self._serve_one(reader, writer):
+                pass
+        except (_BadRequest, asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                ConnectionError) as e:
+            logger.debug(f'Transfer connection closed: {e!r}')
+        except Exception as e:
+            logger.error(f'Error handling transfer request: {e}')
+        finally:
+            writer.close()
+
+    async def _serve_one(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> bool:
+        """Serve one request.
+
+        Returns:
+            Whether the connection stays open for another request
+        """
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+        except asyncio.IncompleteReadError as e:
+            if e.partial.strip():
+                raise
+            return False
+        lines = head.decode('latin-1').split('\r\n')
+        try:
+            method, target, version = lines[0].split(' ')
+        except ValueError:
+            raise _BadRequest(f'Malformed request line: {lines[0]!r}') from None
+        headers = {}
+        for line in lines[1:]:
+            name, sep, value = line.partition(':')
+            if sep:
+                headers[name.strip().lower()] = value.strip()
+        keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+
+        path, _, query = target.partition('?')
+        if not path.startswith(TRANSFER_PREFIX) or len(path) == len(TRANSFER_PREFIX):
+            await self._send_error(writer, HTTPStatus.NOT_FOUND, 'Not Found', keep_alive)
+            return keep_alive and not self._has_body(headers)
+        name = unquote(path[len(TRANSFER_PREFIX):])
+        params = dict(parse_qsl(query))
+
+        if method in ('GET', 'HEAD'):
+            await self._download(writer, name, params, headers, method == 'HEAD', keep_alive)
+            return keep_alive
+        if method in ('PUT', 'POST'):
+            return await self._upload(reader, writer, name, headers, keep_alive)
+        await self._send_error(writer, HTTPStatus.METHOD_NOT_ALLOWED,
+                               f'Method not allowed: {method}', keep_alive)
+        return keep_alive and not self._has_body(headers)
+
+    @staticmethod
+    def _has_body(headers: dict[str, str]) -> bool:
+        return int(headers.get('content-length') or 0) > 0 or 'transfer-encoding' in headers
+
+    @staticmethod
+    def _head(status: HTTPStatus, headers: dict[str, str], keep_alive: bool) -> bytes:
+        lines = [f'HTTP/1.1 {status.value} {status.phrase}']
+        lines += [f'{name}: {value}' for name, value in headers.items()]
+        lines.append('Connection: ' + ('keep-alive' if keep_alive else 'close'))
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+    async def _send_json(self, writer: asyncio.StreamWriter, status: HTTPStatus,
+                         body: dict[str, Any], keep_alive: bool) -> None:
+        payload = codec.dumps(body).encode('utf-8')
+        writer.write(self._head(status, {
+            'Content-Type': 'application/json',
+            'Content-Length': str(len(payload)),
+        }, keep_alive) + payload)
+        await writer.drain()
+
+    async def _send_error(self, writer: asyncio.StreamWriter, status: HTTPStatus,
+                          message: str, keep_alive: bool) -> None:
+        await self._send_json(writer, status, {'detail': message}, keep_alive)
+
+    async def _download(self, writer: asyncio.StreamWriter, name: str, params: dict[str, str],
+                        headers: dict[str, str], head_only: bool, keep_alive: bool) -> None:
+        """Serve a synthetic file (or a stored upload)."""
+        stored = self.store.get(name)
+        if stored is not None:
+            size = len(stored)
+        else:
+            try:
+                size = parse_size(params['size']) if 'size' in params else self.default_size
+            except ValueError as e:
+                await self._send_error(writer, HTTPStatus.BAD_REQUEST, str(e), keep_alive)
+                return
+
+        response_headers = {'Content-Type': 'application/octet-stream', 'Accept-Ranges': 'bytes'}
+        try:
+            byte_range = parse_range(headers.get('range'), size)
+        except ValueError:
+            response_headers['Content-Range'] = f'bytes */{size}'
+            response_headers['Content-Length'] = '0'
+            writer.write(self._head(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE,
+                                    response_headers, keep_alive))
+            await writer.drain()
+            return
+        status = HTTPStatus.OK
+        start, length = 0, size
+        if byte_range is not None:
+            status = HTTPStatus.PARTIAL_CONTENT
+            start, length = byte_range[0], byte_range[1] - byte_range[0] + 1
+            response_headers['Content-Range'] = f'bytes {byte_range[0]}-{byte_range[1]}/{size}'
+        response_headers['Content-Length'] = str(length)
+        writer.write(self._head(status, response_headers, keep_alive))
+        if head_only:
+            await writer.drain()
+            return
+
+        transfer = self.stats.begin('download', name, length)
+        ok = False
+        try:
+            if stored is not None:
+                writer.write(memoryview(stored)[start:start + length])
+                await writer.drain()
+                transfer.bytes = length
+            else:
+                await self._send_pattern(writer, start, length, transfer)
+            ok = True
+        finally:
+            self.stats.finish(transfer, ok)
+
+    async def _send_pattern(self, writer: asyncio.StreamWriter, start: int, length: int,
+                            transfer: Transfer) -> None:
+        """Send ``length`` bytes of the pattern starting at ``start``."""
+        loop = asyncio.get_running_loop()
+        while length > 0:
+            offset = start % PATTERN_SIZE
+            n = min(length, PATTERN_SIZE - offset)
+            sent = False
+            if self.zero_copy:
+                try:
+                    await loop.sendfile(writer.transport, self._file, offset, n, fallback=False)
+                    sent = True
+                except asyncio.SendfileNotAvailableError as e:
+                    logger.info(f'sendfile not available, serving from memory: {e}')
+                    self.zero_copy = False
+            if not sent:
+                writer.write(self._view[offset:offset + n])
+                await writer.drain()
+            start += n
+            length -= n
+            transfer.bytes += n
+
+    async def _upload(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                      name: str, headers: dict[str, str], keep_alive: bool) -> bool:
+        """Receive an upload into the discard sink or the bounded store.
+
+        Returns:
+            Whether the connection stays open for another request
+        """
+        chunked = 'chunked' in headers.get('transfer-encoding', '').lower()
+        if not chunked and 'content-length' not in headers:
+            await self._send_error(writer, HTTPStatus.LENGTH_REQUIRED, 'Length required', False)
+            return False
+        try:
+            length = None if chunked else int(headers['content-length'])
+        except ValueError:
+            raise _BadRequest(f'Invalid Content-Length: {headers["content-length"]}') from None
+        if headers.get('expect', '').lower() == '100-continue':
+            writer.write(b'HTTP/1.1 100 Continue\r\n\r\n')
+
+        # 只有可能放得下的上传才在内存中累积
+        keep = self.store.capacity > 0 and (length is None or length <= self.store.capacity)
+        chunks: list[bytes] | None = [] if keep else None
+        transfer = self.stats.begin('upload', name, length)
+        ok = False
+        try:
+            async for chunk in self._body(reader, length):
+                transfer.bytes += len(chunk)
+                if chunks is not None:
+                    chunks.append(chunk)
+                    if transfer.bytes > self.store.capacity:
+                        chunks = None
+            ok = True
+        finally:
+            summary = self.stats.finish(transfer, ok)
+
+        stored = chunks is not None and self.store.put(name, b''.join(chunks))
+        if not stored:
+            self.store.discard(name)
+        await self._send_json(writer, HTTPStatus.CREATED, {**summary, 'stored': stored},
+                              keep_alive)
+        return keep_alive
+
+    async def _body(self, reader: asyncio.StreamReader, length: int | None) -> AsyncIterator[bytes]:
+        """Yield the request body in chunks (``Content-Length`` or ``chunked``)."""
+        if length is not None:
+            async for chunk in self._read(reader, length):
+                yield chunk
+            return
+        while True:
+            line = await reader.readuntil(b'\r\n')
+            try:
+                size = int(line.split(b';', 1)[0], 16)
+            except ValueError:
+                raise _BadRequest(f'Invalid chunk size: {line!r}') from None
+            if size == 0:
+                # 跳过 trailer
+                while await reader.readuntil(b'\r\n') != b'\r\n':
+                    pass
+                return
+            async for chunk in self._read(reader, size):
+                yield chunk
+            await reader.readexactly(2)
+
+    @staticmethod
+    async def _read(reader: asyncio.StreamReader, length: int) -> AsyncIterator[bytes]:
+        """Yield exactly ``length`` bytes in chunks of at most ``CHUNK_SIZE``."""
+        while length > 0:
+            chunk = await reader.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                raise asyncio.IncompleteReadError(b'', length)
+            length -= len(chunk)
+            yield chunk
+
+
+_server: TransferServer | None = None
+
+
+def get_transfer_server() -> TransferServer | None:
+    """Get the configured transfer server (None when disabled)."""
+    return _server
+
+
+def configure_transfers(
+    host: str,
+    port: int | None,
+    default_size: str = DEFAULT_SIZE,
+    store_capacity: str = '0',
+    reuse_port: bool = False,
+) -> None:
+    """Configure the transfer endpoints (started by ``start_transfers``).
+
+    Args:
+        host: Listen host
+        port: Listen port, or None to disable the endpoints
+        default_size: Size of synthetic downloads without ``?size=``
+        store_capacity: Bytes of uploads kept for download, ``0`` to discard
+        reuse_port: Share the port with other processes (hot-restart workers)
+
+    Raises:
+        ValueError: If a size is malformed
+    """
+    global _server
+    if port is None:
+        _server = None
+        return
+    _server = TransferServer(
+        host, port, parse_size(default_size), parse_size(store_capacity), reuse_port
+    )
+
+
+def start_transfers() -> None:
+    """Start the configured transfer endpoints on their own thread."""
+    if _server is not None:
+        _server.start()
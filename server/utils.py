@@ -1,25 +1,24 @@
-"""Utility functions for fnOS Mock Server."""
+"""Utility functions for fnOS Mock Server.
+
+pycryptodome 与测试密钥文件在首次使用时才加载（登录、获取公钥），
+不计入服务器的启动时间。
+"""
 
 import base64
 import secrets
 import logging
 from pathlib import Path
-from Crypto.Random import get_random_bytes
-from Crypto.Cipher import AES
-from Crypto.Util.Padding import pad
+from typing import Any
 
 
 logger = logging.getLogger(__name__)
 
 
-# 读取固定的测试 RSA 公钥
-def _load_fixed_rsa_public_key() -> str:
-    """Load the fixed test RSA public key from file."""
-    key_path = Path(__file__).parent.parent / 'public_key.pem'
-    with open(key_path, 'r') as f:
-        return f.read()
+KEY_DIR = Path(__file__).parent.parent
 
-_FIXED_RSA_PUBLIC_KEY = _load_fixed_rsa_public_key()
+# 首次使用时加载的密钥
+_fixed_rsa_public_key: str | None = None
+_rsa_private_key: Any = None
 
 
 def get_fixed_rsa_public_key() -> str:
@@ -28,7 +27,26 @@ def get_fixed_rsa_public_key() -> str:
     Returns:
         PEM formatted RSA public key string
     """
-    return _FIXED_RSA_PUBLIC_KEY
+    global _fixed_rsa_public_key
+    if _fixed_rsa_public_key is None:
+        with open(KEY_DIR / 'public_key.pem', 'r') as f:
+            _fixed_rsa_public_key = f.read()
+    return _fixed_rsa_public_key
+
+
+def get_rsa_private_key() -> Any:
+    """Get the fixed test RSA private key.
+
+    Returns:
+        ``Crypto.PublicKey.RSA.RsaKey`` parsed from ``private_key.pem``
+    """
+    global _rsa_private_key
+    if _rsa_private_key is None:
+        from Crypto.PublicKey import RSA
+
+        with open(KEY_DIR / 'private_key.pem', 'r') as f:
+            _rsa_private_key = RSA.import_key(f.read())
+    return _rsa_private_key
 
 
 def generate_random_token(length: int = 32) -> str:
@@ -58,6 +76,10 @@ def generate_encrypted_secret() -> str:
     Returns:
         Base64 encoded encrypted secret
     """
+    from Crypto.Cipher import AES
+    from Crypto.Random import get_random_bytes
+    from Crypto.Util.Padding import pad
+
     # 生成随机 AES 密钥
     aes_key = get_random_bytes(32)
 
@@ -73,4 +95,52 @@ def generate_encrypted_secret() -> str:
     encrypted_secret = cipher.encrypt(padded_secret)
 
     # 返回 base64 编码的结果
-    return base64.b64encode(encrypted_secret).decode('utf-8')
\ No newline at end of file
+    return base64.b64encode(encrypted_secret).decode('utf-8')
+
+
+def get_int_param(request: dict[str, Any], name: str, default: int | None) -> int | None:
+    """Read an optional integer request parameter.
+
+    Args:
+        request: Parsed request dictionary
+        name: Parameter name
+        default: Value used when the parameter is missing or empty
+
+    Returns:
+        Parameter value
+
+    Raises:
+        ValueError: If the parameter is not an integer
+    """
+    value = request.get(name)
+    if value is None or value == '':
+        return default
+    # 参数来自客户端：只接受整数与整数字符串，列表、对象等不能交给 int()
+    if isinstance(value, (int, str)):
+        try:
+            return int(value)
+        except ValueError:
+            pass
+    raise ValueError(f'Parameter "{name}" must be an integer: {value!r}')
+
+
+def get_page_params(request: dict[str, Any], default_limit: int) -> tuple[int, int]:
+    """Read pagination parameters of a list request.
+
+    支持 offset/limit 与 page/pageSize（page 从 1 开始）两种形式。
+
+    Args:
+        request: Parsed request dictionary
+        default_limit: Page size used when none is given
+
+    Returns:
+        Offset and limit
+    """
+    limit = get_int_param(request, 'limit', None)
+    if limit is None:
+        limit = get_int_param(request, 'pageSize', default_limit)
+    offset = get_int_param(request, 'offset', None)
+    if offset is None:
+        page = get_int_param(request, 'page', 1)
+        offset = (max(page, 1) - 1) * limit
+    return max(offset, 0), max(limit, 0)
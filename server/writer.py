@@ -0,0 +1,280 @@
+"""Per-connection writer task with a bounded outbound queue.
+
+请求处理循环只把响应帧放入连接的出站队列，由独立的写任务发送，因此读取
+缓慢的客户端不会阻塞请求处理；写任务每次取出队列中积压的所有帧（至多
+``max_batch`` 个）一起发送，raw 传输会把它们合并为一次 transport 写入。
+
+队列满时的溢出策略：
+
+- ``block``：请求处理循环等待队列腾出空间（背压）；
+- ``drop-oldest``：丢弃最早的未发送帧；
+- ``disconnect``：断开该连接。
+"""
+
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable
+
+
+logger = logging.getLogger(__name__)
+
+
+POLICIES = ('block', 'drop-oldest', 'disconnect')
+
+DEFAULT_QUEUE_SIZE = 256
+DEFAULT_MAX_BATCH = 64
+
+
+SendMany = Callable[[list[str]], Awaitable[None]]
+
+
+class WriteQueueOverflow(Exception):
+    """Raised when a connection exceeds its queue under the disconnect policy."""
+
+
+class WriterStats:
+    """Counters aggregated over all connections."""
+
+    def __init__(self) -> None:
+        self.frames = 0
+        self.writes = 0
+        self.dropped = 0
+        self.overflows = 0
+        self.max_depth = 0
+
+    def to_dict(self) -> dict[str, int]:
+        return {
+            'frames': self.frames,
+            'writes': self.writes,
+            'dropped': self.dropped,
+            'overflows': self.overflows,
+            'maxDepth': self.max_depth,
+        }
+
+
+def sequential_send_many(send: Callable[[str], Awaitable[None]]) -> SendMany:
+    """Adapt a single-frame send function to batch sending."""
+    async def send_many(frames: list[str]) -> None:
+        for frame in frames:
+            await send(frame)
+    return send_many
+
+
+class ConnectionWriter:
+    """Bounded outbound queue drained by a dedicated task."""
+
+    def __init__(
+        self,
+        send_many: SendMany,
+        max_queue: int = DEFAULT_QUEUE_SIZE,
+        policy: str = 'block',
+        max_batch: int = DEFAULT_MAX_BATCH,
+        stats: WriterStats | None = None,
+    ) -> None:
+        """Create the writer.
+
+        Args:
+            send_many: Coroutine function sending a batch of text frames in order
+            max_queue: Maximum queued frames
+            policy: Overflow policy, one of ``POLICIES``
+            max_batch: Maximum frames per transport write
+            stats: Aggregated counters to update
+
+        Raises:
+            ValueError: If the policy is unknown
+        """
+        if policy not in POLICIES:
+            raise ValueError(f'Unknown overflow policy: {policy}')
+        self._send_many = send_many
+        self.max_queue = max(max_queue, 1)
+        self.policy = policy
+        self.max_batch = max(max_batch, 1)
+        self.stats = stats or WriterStats()
+
+        self._queue: deque[str] = deque()
+        self._pending = asyncio.Event()
+        self._space = asyncio.Event()
+        self._space.set()
+        self._error: BaseException | None = None
+        self._task: asyncio.Task | None = None
+        # 入队的帧总数，与 (帧序号, 回调) 队列：帧写出后调用回调
+        self._appended = 0
+        self._callbacks: deque[tuple[int, Callable[[], None]]] = deque()
+
+        self.frames = 0
+        self.writes = 0
+        self.dropped = 0
+        self.max_depth = 0
+
+    @property
+    def depth(self) -> int:
+        """Number of queued frames."""
+        return len(self._queue)
+
+    def start(self) -> None:
+        """Start the writer task on the running loop."""
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def send(self, frame: str) -> None:
+        """Queue one frame, applying the overflow policy when the queue is full.
+
+        Raises:
+            WriteQueueOverflow: If the queue is full under the disconnect policy
+            Exception: The error that stopped the writer task
+        """
+        if self._error is not None:
+            raise self._error
+
+        if len(self._queue) >= self.max_queue:
+            if self.policy == 'block':
+                while len(self._queue) >= self.max_queue:
+                    self._space.clear()
+                    await self._space.wait()
+                    if self._error is not None:
+                        raise self._error
+            elif self.policy == 'drop-oldest':
+                self._queue.popleft()
+                self.dropped += 1
+                self.stats.dropped += 1
+            else:
+                self.stats.overflows += 1
+                raise WriteQueueOverflow(f'Outbound queue full ({self.max_queue} frames)')
+
+        self._queue.append(frame)
+        self._appended += 1
+        depth = len(self._queue)
+        if depth > self.max_depth:
+            self.max_depth = depth
+            if depth > self.stats.max_depth:
+                self.stats.max_depth = depth
+        self._pending.set()
+
+    def when_written(self, callback: Callable[[], None]) -> None:
+        """Call ``callback`` once the last queued frame was written (or dropped)."""
+        self._callbacks.append((self._appended, callback))
+
+    async def _run(self) -> None:
+        """Drain the queue in batches."""
+        queue = self._queue
+        try:
+            while True:
+                if not queue:
+                    self._pending.clear()
+                    await self._pending.wait()
+
+                batch = [queue.popleft() for _ in range(min(len(queue), self.max_batch))]
+                self._space.set()
+                await self._send_many(batch)
+
+                self.frames += len(batch)
+                self.writes += 1
+                self.stats.frames += len(batch)
+                self.stats.writes += 1
+
+                callbacks = self._callbacks
+                if callbacks:
+                    written = self._appended - len(queue)
+                    while callbacks and callbacks[0][0] <= written:
+                        callbacks.popleft()[1]()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # 连接已断开等错误交给请求处理循环在下一次 send 时抛出
+            self._error = e
+            self._space.set()
+
+    async def close(self) -> None:
+        """Stop the writer task, discarding unsent frames."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def to_dict(self) -> dict[str, Any]:
+        """Per-connection metrics."""
+        return {
+            'depth': self.depth,
+            'maxDepth': self.max_depth,
+            'frames': self.frames,
+            'writes': self.writes,
+            'dropped': self.dropped,
+        }
+
+
+# 写队列配置；max_queue 为 0 时在请求处理循环中直接发送
+_settings = {'max_queue': DEFAULT_QUEUE_SIZE, 'policy': 'block', 'max_batch': DEFAULT_MAX_BATCH}
+_stats = WriterStats()
+_writers: dict[int, ConnectionWriter] = {}
+
+
+def configure_writer(
+    max_queue: int = DEFAULT_QUEUE_SIZE,
+    policy: str = 'block',
+    max_batch: int = DEFAULT_MAX_BATCH,
+) -> None:
+    """Configure per-connection writers.
+
+    Args:
+        max_queue: Maximum queued frames per connection (0 to send inline)
+        policy: Overflow policy, one of ``POLICIES``
+        max_batch: Maximum frames per transport write
+
+    Raises:
+        ValueError: If the policy is unknown
+    """
+    if policy not in POLICIES:
+        raise ValueError(f'Unknown overflow policy: {policy}')
+    _settings.update(max_queue=max_queue, policy=policy, max_batch=max_batch)
+
+
+def create_writer(client_id: int, send_many: SendMany) -> ConnectionWriter | None:
+    """Create and start the writer of a connection.
+
+    Args:
+        client_id: Connection identifier
+        send_many: Coroutine function sending a batch of text frames
+
+    Returns:
+        Started writer, or None when writers are disabled
+    """
+    if _settings['max_queue'] <= 0:
+        return None
+    writer = ConnectionWriter(
+        send_many,
+        _settings['max_queue'],
+        _settings['policy'],
+        _settings['max_batch'],
+        _stats,
+    )
+    writer.start()
+    _writers[client_id] = writer
+    return writer
+
+
+async def release_writer(client_id: int) -> None:
+    """Stop and unregister the writer of a connection."""
+    writer = _writers.pop(client_id, None)
+    if writer is not None:
+        await writer.close()
+
+
+def writer_metrics() -> dict[str, Any]:
+    """Queue-depth metrics of all writers.
+
+    Returns:
+        Settings, aggregated counters and per-connection metrics
+    """
+    return {
+        'maxQueue': _settings['max_queue'],
+        'policy': _settings['policy'],
+        'totals': _stats.to_dict(),
+        'queued': sum(writer.depth for writer in _writers.values()),
+        'connections': {
+            str(client_id): writer.to_dict() for client_id, writer in _writers.items()
+        },
+    }
@@ -0,0 +1,57 @@
+"""Tests for the sampled access log."""
+
+import io
+import json
+import time
+
+import pytest
+
+from server import access_log as access_log_module
+from server.access_log import RATE_CACHE_SIZE, AccessLog, configure_access_log, parse_sample_rates
+
+
+def test_parse_sample_rates():
+    """Test the per-req sampling spec."""
+    assert parse_sample_rates("ping=0, user.*=0.25,*=0.5") == {
+        "ping": 0.0, "user.*": 0.25, "*": 0.5,
+    }
+    assert parse_sample_rates("0.1") == {"*": 0.1}
+    assert parse_sample_rates(None) == {}
+    with pytest.raises(ValueError):
+        parse_sample_rates("ping=2")
+
+
+def test_records_are_sampled_and_written():
+    """Test that sampled records are written as JSON lines by the writer thread."""
+    stream = io.StringIO()
+    access_log = AccessLog(stream, {"ping": 0.0, "user.*": 1.0, "*": 0.0})
+    assert access_log.rate_for("user.list") == 1.0
+    assert access_log.rate_for("stor.listDisk") == 0.0
+
+    start = time.perf_counter()
+    for req in ("ping", "user.list", "stor.listDisk", "user.info"):
+        access_log.record(1, "nas-01", req, "r1", "succ", 10, 20, start)
+    access_log.close()
+
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [r["req"] for r in records] == ["user.list", "user.info"]
+    assert records[0]["device"] == "nas-01"
+    assert records[0]["out"] == 20
+    assert access_log.written == 2
+
+
+def test_file_closed_and_rate_cache_bounded(monkeypatch, tmp_path):
+    """Test that the log file is closed on stop and random reqs do not grow the cache."""
+    monkeypatch.setattr(access_log_module, "_access_log", None)
+    path = tmp_path / "access.jsonl"
+    configure_access_log(str(path), "user.*=1,*=0")
+    access_log = access_log_module.get_access_log()
+    for i in range(RATE_CACHE_SIZE * 2):
+        access_log.record(1, None, f"random.{i}", "r", "succ", 1, 1, time.perf_counter())
+    access_log.record(1, None, "user.info", "r", "succ", 1, 1, time.perf_counter())
+    assert access_log.rate_for.cache_info().currsize == RATE_CACHE_SIZE
+
+    stream = access_log._stream
+    configure_access_log(None)
+    assert stream.closed
+    assert [json.loads(line)["req"] for line in path.read_text().splitlines()] == ["user.info"]
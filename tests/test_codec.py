@@ -0,0 +1,44 @@
+"""Tests for the pluggable JSON codec."""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from server import codec
+
+
+RESPONSES_DIR = Path(__file__).parent.parent / "responses"
+RESPONSE_FILES = sorted(RESPONSES_DIR.glob("*.json"))
+
+
+@pytest.fixture(params=codec.available_codecs())
+def backend(request):
+    """Select each installed backend in turn."""
+    previous = codec.name
+    codec.configure_codec(request.param)
+    yield request.param
+    codec.configure_codec(previous)
+
+
+@pytest.mark.parametrize("path", RESPONSE_FILES, ids=lambda p: p.name)
+def test_response_files_match_stdlib(backend, path):
+    """Test that every backend loads and re-encodes each response file identically."""
+    data = path.read_bytes()
+    expected = json.loads(data)
+    loaded = codec.loads(data)
+    assert loaded == expected
+    encoded = codec.dumps(loaded)
+    reference = json.dumps(expected, ensure_ascii=False, separators=(",", ":"))
+    assert encoded.encode("utf-8") == reference.encode("utf-8")
+
+
+def test_fallbacks_and_errors(backend):
+    """Test values fast backends cannot encode and the shared decode error type."""
+    for value in ({"n": 2 ** 70}, {1: "a", "b": [1.5, None, True]}, {"s": "\ud800"}):
+        assert codec.dumps(value) == json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+    assert codec.dumps({"s": "中文 "}) == '{"s":"中文 "}'
+    with pytest.raises(codec.DecodeError):
+        codec.loads('{"req": ')
+    with pytest.raises(ValueError):
+        codec.configure_codec("no-such-codec")
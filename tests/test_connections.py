@@ -0,0 +1,62 @@
+"""Tests for the connection registry and idle reaper."""
+
+import asyncio
+import json
+
+from server import connections
+from server.connections import ConnectionManager, TimerWheel
+from server.pytest_plugin import InMemoryConnection
+
+
+def test_timer_wheel_is_lazy():
+    """Test that activity reschedules a connection instead of reaping it."""
+    wheel = TimerWheel(tick=1.0, slots=8)
+    manager = ConnectionManager(idle_timeout=5.0)
+    manager.wheel = wheel
+    start = wheel.current * 1.0
+
+    async def close():
+        pass
+
+    idle = manager.register(1, close=close)
+    busy = manager.register(2, close=close)
+    gone = manager.register(3, close=close)
+    for info in (idle, busy, gone):
+        info.last_activity = start
+    manager.unregister(gone)
+    busy.last_activity = start + 4.0
+
+    async def reap(now):
+        return manager.reap(now)
+
+    assert asyncio.run(reap(start + 3.0)) == []
+    assert asyncio.run(reap(start + 6.5)) == [idle]
+    assert asyncio.run(reap(start + 9.5)) == [busy]
+    assert manager.reaped == 2
+    # 超过一整圈的截止时间会在槽到期时重新放回
+    wheel.schedule(busy, start + 100.0)
+    assert wheel.advance(start + 20.0) == [busy]
+
+
+async def test_idle_connection_is_closed(monkeypatch):
+    """Test that the reaper closes idle connections and keeps active ones."""
+    manager = ConnectionManager(idle_timeout=0.2, tick=0.05)
+    monkeypatch.setattr(connections, "_manager", manager)
+    manager.start()
+    idle = InMemoryConnection()
+    active = InMemoryConnection()
+    try:
+        await asyncio.sleep(0.05)
+        assert manager.count == 2
+        for i in range(8):
+            await active.send(json.dumps({"req": "user.isAdmin", "reqid": str(i)}))
+            await active.recv()
+            await asyncio.sleep(0.05)
+        assert idle._closed
+        assert manager.count == 1
+        summary = manager.summary()
+        assert summary["reaped"] == 1
+        assert summary["idlest"][0]["messages"] == 8
+    finally:
+        manager.stop()
+        await active.close()
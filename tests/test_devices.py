@@ -0,0 +1,85 @@
+"""Tests for multi-device virtualization."""
+
+from collections import OrderedDict
+
+import pytest
+from fnos import FnosClient
+
+from server import devices, storage
+from server.devices import (
+    build_device, configure_devices, device_id_from_path, get_device, merge_patch
+)
+from server.handlers import route_request
+from server.storage import StorageScenario, StorageTopology, parse_scenario_spec
+
+
+def test_device_id_from_path():
+    """Test device ID extraction from WebSocket paths."""
+    assert device_id_from_path("/websocket?type=main") is None
+    assert device_id_from_path("/websocket/nas-01") == "nas-01"
+    assert device_id_from_path("/nas-01/websocket?type=main") == "nas-01"
+    with pytest.raises(ValueError):
+        device_id_from_path("/other")
+
+
+def test_merge_patch_shares_untouched_subtrees():
+    """Test that merge patches copy only the modified path."""
+    base = {"data": {"a": 1}, "other": {"b": 2}}
+    patched = merge_patch(base, {"data": {"a": 3, "c": None}})
+    assert patched == {"data": {"a": 3}, "other": {"b": 2}}
+    assert patched["other"] is base["other"]
+    assert base["data"] == {"a": 1}
+
+
+def test_device_overlays():
+    """Test per-device responses on top of the shared fixtures."""
+    device = build_device("nas-01", {"users": [{"user": "alice", "uid": 1000}]})
+    hostname = route_request({"req": "appcgi.sysinfo.getHostName", "reqid": "1"}, device)
+    assert hostname["data"]["hostName"] == "nas-01"
+
+    users = route_request({"req": "user.list", "reqid": "2"}, device)
+    assert users["users"] == [{"user": "alice", "uid": 1000}]
+    assert users["reqid"] == "2"
+
+    default_users = route_request({"req": "user.list", "reqid": "3"})
+    assert default_users["users"] != users["users"]
+
+    machine = route_request({"req": "appcgi.sysinfo.getMachineId", "reqid": "4"}, device)
+    assert machine["data"]["machineId"] == device.machine_id
+
+
+@pytest.mark.asyncio
+async def test_device_endpoint(fnos_in_memory: str):
+    """Test connecting pyfnos to an emulated device."""
+    client = FnosClient()
+    await client.connect(f"{fnos_in_memory}/nas-02")
+    try:
+        await client.login("testuser", "testpass")
+        response = await client.request_payload_with_response("appcgi.sysinfo.getHostName", {})
+        assert response["data"]["hostName"] == "nas-02"
+    finally:
+        await client.close()
+
+
+def test_undeclared_devices_are_bounded(monkeypatch):
+    """Test that lazily created devices are evicted with their storage state."""
+    monkeypatch.setattr(devices, "_lazy_devices", OrderedDict())
+    monkeypatch.setattr(devices, "_device_specs", {"declared": {"hostName": "declared-nas"}})
+    monkeypatch.setattr(devices, "_devices", {})
+    monkeypatch.setattr(devices, "_max_devices", devices.MAX_DEVICES)
+    topology = StorageTopology.from_spec("2 pools, 6 disks")
+    topology.scenario = StorageScenario(parse_scenario_spec("degraded:10"), started=0.0)
+    monkeypatch.setattr(storage, "_topology", topology)
+    configure_devices(2)
+
+    for device_id in ("a", "b", "c", "b", "d"):
+        topology.state(get_device(device_id).device_id, now=1)
+    assert list(devices._lazy_devices) == ["b", "d"]
+    assert set(topology.scenario._schedules) == {"b", "d"}
+    assert {device for _, device in topology._live_views} == {"b", "d"}
+    assert get_device("a").machine_id == build_device("a").machine_id
+
+    configure_devices(0)
+    assert get_device("declared").host_name == "declared-nas"
+    with pytest.raises(ValueError):
+        get_device("e")
@@ -0,0 +1,70 @@
+"""Tests for the synthetic user directory."""
+
+import json
+
+import pytest
+
+from server import directory as directory_module
+from server.directory import UserDirectory, build_directory_response
+from server.handlers import handle_message
+from server.utils import get_int_param
+
+
+def test_indexes_and_memberships():
+    """Test uid/name lookups and CSR membership consistency."""
+    directory = UserDirectory(1000, 50, admins=3)
+    assert directory.find_user(uid=1500) == 500
+    assert directory.find_user(name="user000500") == 500
+    assert directory.find_group(name="Users") == 1
+    assert directory.find_user(uid=99) is None
+
+    assert directory.member_count(0) == 3
+    assert directory.member_count(1) == 1000
+    for row in (0, 10, 999):
+        for group in directory.groups_of(row):
+            assert row in directory.members_of(group)
+
+
+def test_paginated_responses():
+    """Test user.list/user.groupUsers pagination and user.info lookups."""
+    directory = UserDirectory(2500, 20)
+
+    page = build_directory_response(directory, "user.list", {"page": 3, "pageSize": 1000}, "r1")
+    assert page["total"] == 2500
+    assert [u["uid"] for u in page["users"][:1]] == [3000]
+    assert len(page["users"]) == 500
+
+    members = build_directory_response(
+        directory, "user.groupUsers", {"gid": 1001, "offset": 10, "limit": 5}, "r2"
+    )
+    assert members["groups"][0]["users"] == [1010, 1011, 1012, 1013, 1014]
+    assert members["groups"][0]["total"] == 2500
+
+    info = build_directory_response(directory, "user.info", {"user": "user000000"}, "r3")
+    assert info["data"]["isAdmin"] is True
+    assert info["data"]["groups"][:2] == ["administrators", "users"]
+    assert build_directory_response(directory, "user.info", {"uid": 1}, "r4")["result"] == "fail"
+
+    acl = build_directory_response(directory, "file.getAcl", {"files": ["/a", "/b"]}, "r5")
+    assert len(acl["data"]) == 2
+    assert acl == build_directory_response(directory, "file.getAcl", {"files": ["/a", "/b"]}, "r5")
+    assert build_directory_response(directory, "user.isAdmin", {}, "r6") is None
+
+
+def test_malformed_parameters_get_failure_replies(monkeypatch):
+    """Test that malformed parameters are answered with the reqid instead of an exception."""
+    assert get_int_param({"uid": "12"}, "uid", None) == 12
+    for value in ([1], {"a": 1}, "abc", 1.5):
+        with pytest.raises(ValueError):
+            get_int_param({"uid": value}, "uid", None)
+
+    monkeypatch.setattr(directory_module, "_directory", UserDirectory(10, 2))
+    for frame in (
+        {"req": "user.info", "reqid": "a", "uid": [1]},
+        {"req": "user.info", "reqid": "a", "uid": "abc"},
+        {"req": "user.info", "reqid": "a", "user": ["x"]},
+        {"req": "user.list", "reqid": "a", "limit": {"n": 1}},
+        {"req": "file.getAcl", "reqid": "a", "files": 5},
+    ):
+        reply = json.loads(handle_message(json.dumps(frame), 1))
+        assert (reply["result"], reply["reqid"]) == ("fail", "a")
@@ -0,0 +1,62 @@
+"""Tests for the synthetic container fleet."""
+
+import pytest
+
+pytest.importorskip("numpy")
+
+import json  # noqa: E402
+
+from server import codec, docker_fleet  # noqa: E402
+from server.docker_fleet import ContainerFleet  # noqa: E402
+from server.handlers import handle_message  # noqa: E402
+
+
+def test_fleet_views_are_consistent():
+    """Test that list, compose and stats views describe the same fleet."""
+    fleet = ContainerFleet(200, projects=10, templates=[{"Image": "busybox"}], seed=3)
+    containers = fleet.containers()
+    assert len(containers) == 200
+
+    running = {c["Id"] for c in containers if c["State"] == "running"}
+    assert set(fleet.stats()) == running
+
+    compose = fleet.compose()
+    assert sum(p["Containers"]["total"] for p in compose) == 200
+    assert sum(p["Containers"].get("running", 0) for p in compose) == len(running)
+
+
+def test_fleet_tick():
+    """Test that stats advance once per tick interval."""
+    fleet = ContainerFleet(50, tick_interval=1.0, seed=1)
+    first = fleet.stats()
+    assert fleet.stats() is first
+
+    fleet.maybe_tick(fleet._last_tick + 1.0)
+    second = fleet.stats()
+    assert second is not first
+    assert set(second) == set(first)
+    assert all(0.0 <= s["cpuUsage"] <= 1.0 for s in second.values())
+
+
+def test_responses_reuse_encoded_payload(monkeypatch):
+    """Test that each tick's payload is serialized once and only the reqid is spliced in."""
+    fleet = ContainerFleet(100, seed=2)
+    monkeypatch.setattr(docker_fleet, "_fleet", fleet)
+    calls = []
+    dumps = codec.dumps
+    monkeypatch.setattr(codec, "dumps", lambda obj: calls.append(type(obj)) or dumps(obj))
+
+    for req in ("appcgi.dockermgr.stats", "appcgi.dockermgr.containerList"):
+        for reqid in ("a", 'q"1'):
+            frame = handle_message(json.dumps({"req": req, "reqid": reqid}), 1)
+            response = json.loads(frame)
+            assert response["reqid"] == reqid
+            expected = fleet.stats() if req.endswith("stats") else fleet.containers()
+            assert frame == dumps({"reqid": reqid, "result": "succ", "rsp": expected})
+    assert calls.count(dict) == 1
+    assert calls.count(list) == 1
+
+    fleet.maybe_tick(fleet._last_tick + 1.0)
+    response = json.loads(handle_message('{"req":"appcgi.dockermgr.stats","reqid":"b"}', 1))
+    assert response["rsp"] == fleet.stats()
+    assert calls.count(dict) == 2
@@ -0,0 +1,90 @@
+"""Tests for the indexed event and notification history."""
+
+import json
+
+from server import events
+from server.events import EventStore, build_notify_list_response, generate_events
+from server.handlers import handle_message
+
+
+def _store() -> EventStore:
+    templates = [{"username": "admin", "content": "login"}]
+    return generate_events(templates, 1000, end_time=1_000_000, seed=1)
+
+
+def test_query_newest_first():
+    """Test that pages are returned newest first with a cursor."""
+    store = _store()
+    page = store.query(limit=10)
+    assert page.total == 1000
+    assert [row["id"] for row in page.rows] == list(range(1000, 990, -1))
+
+    next_page = store.query(limit=10, cursor=page.next_cursor)
+    assert next_page.rows[0]["id"] == 990
+    assert store.query(limit=10, offset=10).rows == next_page.rows
+
+
+def test_query_time_range_and_category():
+    """Test time range and category filters against a full scan."""
+    store = _store()
+    rows = [store.row(i) for i in range(len(store))]
+    start, end = rows[100]["eventtm"], rows[800]["eventtm"]
+    expected = [
+        r for r in reversed(rows)
+        if start <= r["eventtm"] <= end and r["module"] == 3 and r["level"] == 0
+    ]
+
+    filters = {"module": 3, "level": 0}
+    page = store.query(start_time=start, end_time=end, filters=filters, limit=7)
+    assert page.total == len(expected)
+
+    collected = list(page.rows)
+    while page.next_cursor is not None:
+        page = store.query(start_time=start, end_time=end, filters=filters, limit=7,
+                           cursor=page.next_cursor)
+        collected.extend(page.rows)
+    assert collected == expected
+
+
+def test_notify_list_response():
+    """Test notify.list pagination fields."""
+    rows = [{"id": i, "datetime": 100 + i, "cat": 1, "read": i % 2} for i in range(45)]
+    store = EventStore.from_rows(rows, "datetime", "id", ("cat", "read"))
+    response = build_notify_list_response(store, {"page": 3, "pageSize": 20}, "r1")
+    assert response["total"] == 45
+    assert response["page"] == 3
+    assert response["pageTotal"] == 3
+    assert [row["id"] for row in response["notifyList"]] == [4, 3, 2, 1, 0]
+    assert response["nextCursor"] is None
+    assert store.count("read", 0) == 23
+
+
+def test_combined_index_cache_is_bounded(monkeypatch):
+    """Test that client-chosen filters do not grow the index cache without bound."""
+    store = _store()
+    indexes = len(store._indexes)
+    for i in range(500):
+        assert store.query(filters={"username": f"user{i}", "level": 0}).total == 0
+    assert not store._combined
+
+    monkeypatch.setattr(events, "COMBINED_INDEX_CACHE_SIZE", 4)
+    for module in range(1, 7):
+        store.query(filters={"module": module, "level": 0})
+    assert list(store._combined) == [
+        (("level", 0), ("module", module)) for module in range(3, 7)
+    ]
+    assert len(store._indexes) == indexes
+
+
+def test_malformed_filters_get_failure_replies(monkeypatch):
+    """Test that malformed filters are answered with the reqid."""
+    monkeypatch.setattr(events, "_event_store", _store())
+    for params in (
+        {"username": ["u"]}, {"limit": [1]}, {"level": "x"}, {"cursor": "zz"},
+    ):
+        frame = {"req": "appcgi.eventlogger.common.list", "reqid": "e", **params}
+        reply = json.loads(handle_message(json.dumps(frame), 1))
+        assert (reply["result"], reply["reqid"]) == ("fail", "e")
+
+    frame = {"req": "appcgi.eventlogger.common.list", "reqid": "e", "level": "0", "cursor": ""}
+    assert json.loads(handle_message(json.dumps(frame), 1))["result"] == "succ"
@@ -0,0 +1,94 @@
+"""Tests for fault injection and connect/accept rates."""
+
+import asyncio
+import json
+
+import pytest
+
+from server import admin, connections, faults
+from server.admin import handle_admin_request
+from server.connections import ConnectionManager
+from server.faults import FaultInjector, RateMeter, parse_fault_spec
+from server.pytest_plugin import InMemoryConnection
+
+
+def test_parse_fault_spec_and_mangle():
+    """Test parsing the fault spec and corrupting/truncating frames."""
+    assert parse_fault_spec("drop=0.5, accept-delay=20,truncate=1") == {
+        "drop": 0.5, "accept-delay": 20.0, "truncate": 1.0,
+    }
+    assert parse_fault_spec(None) == {}
+    with pytest.raises(ValueError):
+        parse_fault_spec("explode=1")
+    with pytest.raises(ValueError):
+        parse_fault_spec("corrupt=2")
+
+    frame = json.dumps({"result": "succ", "reqid": "1"})
+    truncated = FaultInjector({"truncate": 1.0}, seed=1).mangle(frame)
+    assert len(truncated) < len(frame) and frame.startswith(truncated)
+
+    injector = FaultInjector({"corrupt": 1.0}, seed=1)
+    corrupted = injector.mangle(frame)
+    assert len(corrupted) == len(frame)
+    assert sum(a != b for a, b in zip(frame, corrupted)) == 1
+    assert injector.counters["corrupted"] == 1
+    assert FaultInjector().mangle(frame) == frame
+
+
+def test_rate_meter(monkeypatch):
+    """Test per-second connect rates over the sliding window."""
+    now = [1000.2]
+    monkeypatch.setattr(faults.time, "monotonic", lambda: now[0])
+    meter = RateMeter()
+    for _ in range(30):
+        meter.add()
+    now[0] = 1001.5
+    for _ in range(10):
+        meter.add()
+    now[0] = 1002.1
+    summary = meter.to_dict()
+    assert summary["total"] == 40
+    assert summary["last1s"] == 10.0
+    assert summary["last10s"] == 4.0
+    assert summary["peakPerSec"] == 30
+    # 超过窗口后旧计数被清除
+    now[0] = 1100.0
+    assert meter.rate(10) == 0.0
+
+
+async def test_restart_drops_and_refuses(monkeypatch):
+    """Test that a simulated restart drops connections and refuses new ones."""
+    monkeypatch.setattr(connections, "_manager", ConnectionManager())
+    injector = FaultInjector(seed=0)
+    monkeypatch.setattr(faults, "_injector", injector)
+    clients = [InMemoryConnection() for _ in range(3)]
+    await asyncio.sleep(0.01)
+    assert injector.accepts.total == 3
+
+    assert injector.restart(drop=1.0, refuse=60) == 3
+    await asyncio.sleep(0.01)
+    assert all(client._closed for client in clients)
+    assert connections.get_connection_manager().count == 0
+    assert not await injector.admit()
+    assert injector.counters == {
+        "refused": 1, "delayed": 0, "dropped": 3, "corrupted": 0, "truncated": 0,
+    }
+    assert injector.summary()["faults"]["refusingFor"] > 0
+
+
+async def test_restart_requires_post(monkeypatch):
+    """Test that the restart endpoint rejects GET unless GET actions are enabled."""
+    monkeypatch.setattr(connections, "_manager", ConnectionManager())
+    monkeypatch.setattr(faults, "_injector", FaultInjector(seed=0))
+    monkeypatch.setattr(admin, "_settings", {"get_actions": False})
+    params = {"drop": "1", "refuse": "0"}
+    status, _ = await handle_admin_request("/debug/faults/restart", params, "GET")
+    assert status == 405
+    status, body = await handle_admin_request("/debug/faults/restart", params, "POST")
+    assert (status, body) == (200, {"dropped": 0, "refuseSeconds": 0.0})
+    status, _ = await handle_admin_request("/debug/faults", {}, "POST")
+    assert status == 405
+
+    admin.configure_admin(get_actions=True)
+    status, _ = await handle_admin_request("/debug/faults/restart", params, "GET")
+    assert status == 200
@@ -0,0 +1,42 @@
+"""Tests for the event loop lag monitor and health report."""
+
+import asyncio
+import time
+
+from server import health
+from server.health import LoopLagMonitor, build_health
+
+
+def test_histogram_percentiles():
+    """Test lag histogram buckets and percentiles."""
+    monitor = LoopLagMonitor()
+    assert monitor.percentile(0.5) is None
+    for lag in (0.0005, 0.0005, 0.003, 0.15):
+        monitor.record(lag)
+    assert monitor.percentile(0.5) == 1.0
+    assert monitor.percentile(0.99) == 200.0
+    assert monitor.summary()["histogram"]["le5"] == 1
+    assert monitor.max_lag == 0.15
+
+
+async def test_stall_is_detected(monkeypatch):
+    """Test that a blocked loop is reported as overloaded and snapshotted."""
+    monkeypatch.setattr(health, "_monitor_settings", (0.01, 50.0))
+    monkeypatch.setattr(health, "_ready", health.threading.Event())
+    health.mark_ready()
+    monitor = health.start_lag_monitor()
+    try:
+        await asyncio.sleep(0.05)
+        assert build_health(3)[0] is True
+
+        time.sleep(0.2)
+        healthy, report = build_health(3)
+        assert healthy is False
+        assert report["status"] == "overloaded"
+        assert report["connections"] == 3
+        assert monitor.stalls == 1
+
+        await asyncio.sleep(0.05)
+        assert monitor.max_lag >= 0.1
+    finally:
+        health.stop_lag_monitor()
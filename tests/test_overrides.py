@@ -0,0 +1,146 @@
+"""Tests for runtime response overrides."""
+
+import asyncio
+import json
+from http import HTTPStatus
+
+import pytest
+
+from server import overrides
+from server.admin import handle_admin_request
+from server.devices import get_device
+from server.handlers import route_request
+from server.overrides import (
+    JsonPatchError,
+    JsonPatchTestFailed,
+    OverrideSnapshot,
+    apply_json_patch,
+    get_overrides,
+    patch_override,
+    put_override,
+)
+from server.pytest_plugin import InMemoryConnection
+
+
+@pytest.fixture(autouse=True)
+def empty_overrides(monkeypatch):
+    """Start every test without overrides."""
+    monkeypatch.setattr(overrides, "_snapshot", OverrideSnapshot())
+
+
+def test_apply_json_patch():
+    """Test RFC 6902 operations without modifying the original document."""
+    document = {"result": "succ", "data": {"list": [1, 2], "a/b": {"~": 0}}}
+    patched = apply_json_patch(document, [
+        {"op": "add", "path": "/data/list/-", "value": 3},
+        {"op": "add", "path": "/data/list/0", "value": 0},
+        {"op": "remove", "path": "/data/list/1"},
+        {"op": "replace", "path": "/result", "value": "fail"},
+        {"op": "copy", "from": "/data/a~1b/~0", "path": "/copied"},
+        {"op": "move", "from": "/data/a~1b", "path": "/moved"},
+        {"op": "test", "path": "/data/list", "value": [0, 2, 3]},
+    ])
+    assert patched == {
+        "result": "fail",
+        "data": {"list": [0, 2, 3]},
+        "copied": 0,
+        "moved": {"~": 0},
+    }
+    assert document == {"result": "succ", "data": {"list": [1, 2], "a/b": {"~": 0}}}
+
+    with pytest.raises(JsonPatchTestFailed):
+        apply_json_patch(document, [{"op": "test", "path": "/result", "value": "fail"}])
+    for bad in (
+        [{"op": "remove", "path": "/missing"}],
+        [{"op": "add", "path": "/data/list/5", "value": 1}],
+        [{"op": "move", "from": "/data", "path": "/data/inner"}],
+        [{"op": "replace", "path": "no-slash", "value": 1}],
+        {"op": "add"},
+    ):
+        with pytest.raises(JsonPatchError):
+            apply_json_patch(document, bad)
+
+
+def test_snapshots_are_copy_on_write():
+    """Test that writers publish new snapshots and readers keep theirs."""
+    put_override("user.isAdmin", {"result": "succ", "admin": False})
+    put_override("user.isAdmin", {"result": "succ", "admin": "device"}, device="nas-1")
+    before = get_overrides()
+
+    put_override("user.info", {"result": "succ"})
+    after = get_overrides()
+    assert after.version == before.version + 1
+    assert "user.info" not in before.responses
+    # 未修改的作用域与旧快照共享
+    assert after.devices is before.devices
+
+    assert after.lookup("user.isAdmin", None, None).response["admin"] is False
+    assert after.lookup("user.isAdmin", None, "nas-1").response["admin"] == "device"
+    assert after.lookup("user.isAdmin", None, "nas-2").response["admin"] is False
+    assert after.lookup("user.list", None, "nas-1") is None
+
+
+async def test_connection_override_via_admin_api():
+    """Test PUT/PATCH/DELETE of a per-connection override over the admin API."""
+    connection = InMemoryConnection()
+    other = InMemoryConnection()
+    await asyncio.sleep(0)
+    try:
+        async def call(method, req="", params=None, body=None):
+            path = "/admin/responses" + (f"/{req}" if req else "")
+            payload = json.dumps(body).encode() if body is not None else b""
+            return await handle_admin_request(path, params or {}, method, payload)
+
+        async def request(conn, req, reqid):
+            await conn.send(json.dumps({"req": req, "reqid": reqid}))
+            return json.loads(await conn.recv())
+
+        scope = {"connection": str(id(connection))}
+        status, body = await call("PUT", "user.isAdmin", scope, {"result": "succ", "admin": False})
+        assert status == HTTPStatus.OK
+        status, _ = await call("PATCH", "user.isAdmin", scope, [
+            {"op": "replace", "path": "/admin", "value": "patched"},
+        ])
+        assert status == HTTPStatus.OK
+        status, _ = await call("PATCH", "user.isAdmin", scope, [
+            {"op": "test", "path": "/admin", "value": False},
+        ])
+        assert status == HTTPStatus.CONFLICT
+        status, _ = await call("PUT", "user.isAdmin", {"connection": "1"}, {"result": "succ"})
+        assert status == HTTPStatus.NOT_FOUND
+        status, _ = await call("PUT", "user.isAdmin", {}, ["not", "an", "object"])
+        assert status == HTTPStatus.BAD_REQUEST
+
+        assert await request(connection, "user.isAdmin", "1") == {
+            "result": "succ", "admin": "patched", "reqid": "1",
+        }
+        assert (await request(other, "user.isAdmin", "2"))["admin"] is True
+
+        # 连接关闭后其覆盖被清除
+        await connection.close()
+        await asyncio.sleep(0)
+        status, body = await call("GET")
+        assert status == HTTPStatus.OK and body["connections"] == {}
+
+        await call("PUT", "user.isAdmin", {}, {"result": "succ", "admin": "global"})
+        assert (await request(other, "user.isAdmin", "3"))["admin"] == "global"
+        status, body = await call("DELETE", "user.isAdmin")
+        assert body["removed"] == 1
+        assert (await request(other, "user.isAdmin", "4"))["admin"] is True
+    finally:
+        await connection.close()
+        await other.close()
+
+
+def test_device_patch_keeps_device_overlay():
+    """Test that a device-scoped PATCH applies to the device's view of the fixture."""
+    machine_id = get_device("nas-1").machine_id
+    patch_override("appcgi.sysinfo.getMachineId", [
+        {"op": "test", "path": "/data/machineId", "value": machine_id},
+        {"op": "add", "path": "/patched", "value": True},
+    ], device="nas-1")
+
+    request = {"req": "appcgi.sysinfo.getMachineId", "reqid": "1"}
+    response = route_request(request, get_device("nas-1"))
+    assert response["data"]["machineId"] == machine_id
+    assert response["patched"] is True
@@ -0,0 +1,44 @@
+"""Tests for the sampling profiler."""
+
+import threading
+import time
+
+import pytest
+
+from server import profiler as profiler_module
+from server.profiler import SamplingProfiler, profile_thread
+
+
+def _busy_handler(req, stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_samples_are_tagged_with_req():
+    """Test that stacks are collapsed and tagged with the local ``req``."""
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy_handler, args=("user.list", stop))
+    worker.start()
+    try:
+        time.sleep(0.01)
+        result = profile_thread(worker.ident, 0.1, 0.002, _busy_handler.__code__)
+    finally:
+        stop.set()
+        worker.join()
+
+    assert result.samples > 0
+    lines = result.collapsed().splitlines()
+    stack, count = lines[0].rsplit(" ", 1)
+    assert stack.startswith("req:user.list;")
+    assert "test_profiler:_busy_handler" in stack
+    assert int(count) > 0
+
+
+def test_one_profile_at_a_time():
+    """Test argument validation and the single-profile lock."""
+    with pytest.raises(ValueError):
+        profile_thread(threading.get_ident(), 0)
+    with profiler_module._lock:
+        with pytest.raises(RuntimeError):
+            profile_thread(threading.get_ident(), 0.01)
+    assert SamplingProfiler(-1).collapsed() == ""
@@ -0,0 +1,50 @@
+"""Tests for the fnOS Mock Server pytest plugin."""
+
+import pytest
+from fnos import FnosClient
+
+from server.pytest_plugin import InMemoryConnection, MockServerInfo
+
+
+@pytest.fixture
+async def memory_client(fnos_in_memory: str):
+    """Create a client connected through the in-memory transport."""
+    client = FnosClient()
+    await client.connect(fnos_in_memory)
+    yield client
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_in_memory_connection():
+    """Test raw frames over the in-memory connection."""
+    connection = InMemoryConnection()
+    await connection.send('{"req":"ping"}')
+    assert await connection.recv() == '{"res":"pong"}'
+    await connection.close()
+
+
+@pytest.mark.asyncio
+async def test_in_memory_login(memory_client: FnosClient):
+    """Test login and request through the in-memory transport."""
+    assert memory_client.connected is True
+    assert memory_client.host_name == "www.timandes.cn"
+    result = await memory_client.login("testuser", "testpass")
+    assert result.get("result") == "succ"
+    response = await memory_client.request_payload_with_response("user.info", {})
+    assert response.get("req") == "user.info"
+
+
+@pytest.mark.asyncio
+async def test_session_server(fnos_mock_server: MockServerInfo):
+    """Test a client against the session-scoped server."""
+    assert fnos_mock_server.port != 0
+    client = FnosClient()
+    await client.connect(fnos_mock_server.endpoint)
+    try:
+        result = await client.login("testuser", "testpass")
+        assert result.get("result") == "succ"
+        response = await client.request_payload_with_response("appcgi.resmon.cpu", {})
+        assert response.get("result") == "succ"
+    finally:
+        await client.close()
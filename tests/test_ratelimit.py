@@ -0,0 +1,64 @@
+"""Tests for token-bucket rate limiting."""
+
+import json
+
+import pytest
+
+from server import ratelimit
+from server.pytest_plugin import InMemoryConnection
+from server.ratelimit import RateLimiter, parse_pattern_rates, parse_rate, peek_field
+
+
+def test_parse_and_peek():
+    """Test limit specs and raw field extraction."""
+    assert parse_rate("100") == (100.0, 100.0)
+    assert parse_rate("0.5/3") == (0.5, 3.0)
+    assert parse_pattern_rates("user.*=10/20, ping=1") == {
+        "user.*": (10.0, 20.0), "ping": (1.0, 1.0),
+    }
+    with pytest.raises(ValueError):
+        parse_rate("0")
+    with pytest.raises(ValueError):
+        parse_pattern_rates("10")
+
+    message = 'SIGNATURE{"req": "user.list", "reqid": "r1"}'
+    assert peek_field(message, "req") == "user.list"
+    assert peek_field(message, "reqid") == "r1"
+    assert peek_field("{}", "req") is None
+
+
+def test_buckets():
+    """Test per-connection, per-pattern and global buckets."""
+    limiter = RateLimiter((1000, 3), None, {"stor.*": (1000, 1)})
+    first, second = limiter.connection_bucket(), limiter.connection_bucket()
+    assert limiter.acquire(first, "stor.listDisk") == 0
+    # 模式桶由所有连接共享
+    assert limiter.acquire(second, "stor.listDisk") > 0
+    assert [limiter.acquire(second, "user.list") for _ in range(3)] == [0, 0, 0]
+    assert limiter.acquire(second, "user.list") > 0
+    assert limiter.stats()["limited"] == 2
+
+    # 任意 req 不会让匹配缓存无限增长
+    for i in range(ratelimit.MATCH_CACHE_SIZE * 2):
+        limiter.acquire(None, f"random.{i}")
+    assert limiter._match.cache_info().currsize == ratelimit.MATCH_CACHE_SIZE
+
+    delaying = RateLimiter(None, (10, 1), action="delay")
+    assert delaying.acquire(None, None) == 0
+    assert delaying.acquire(None, None) == pytest.approx(0.1, rel=0.1)
+    assert delaying.acquire(None, None) == pytest.approx(0.2, rel=0.1)
+
+
+async def test_rejected_requests(monkeypatch):
+    """Test that requests over the limit get a failure reply."""
+    monkeypatch.setattr(ratelimit, "_limiter", RateLimiter((0.001, 2)))
+    connection = InMemoryConnection()
+    try:
+        replies = []
+        for i in range(3):
+            await connection.send(json.dumps({"req": "user.isAdmin", "reqid": f"r{i}"}))
+            replies.append(json.loads(await connection.recv()))
+    finally:
+        await connection.close()
+    assert [r["result"] for r in replies] == ["succ", "succ", "fail"]
+    assert replies[2] == {"result": "fail", "errmsg": "Rate limit exceeded", "reqid": "r2"}
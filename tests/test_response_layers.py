@@ -0,0 +1,72 @@
+"""Tests for layered response directories."""
+
+import json
+from http import HTTPStatus
+
+import pytest
+
+from server import responses
+from server.admin import handle_admin_request
+from server.devices import get_device
+from server.handlers import route_request
+from server.responses import configure_responses, get_response_file_path
+
+
+@pytest.fixture(autouse=True)
+def restore_index(monkeypatch):
+    """Restore the built-in index after each test."""
+    monkeypatch.setattr(responses, "_index", None)
+    yield
+    configure_responses()
+
+
+def _write(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data), encoding="utf-8")
+
+
+def test_later_layers_win_per_req_and_device_variant(tmp_path, monkeypatch):
+    """Test layering of plain fixtures and device variants, independent of the cwd."""
+    base, team = tmp_path / "base", tmp_path / "team"
+    _write(base / "user.isAdmin.json", {"result": "succ", "admin": "base"})
+    _write(base / "custom.req.json", {"result": "succ", "from": "base"})
+    _write(base / "devices" / "nas-1" / "custom.req.json", {"result": "succ", "from": "base-nas-1"})
+    _write(team / "custom.req.json", {"result": "succ", "from": "team"})
+    _write(team / "devices" / "nas-1" / "custom.req.json", {"result": "succ", "from": "team-nas-1"})
+    monkeypatch.chdir(tmp_path)
+
+    index = configure_responses([str(base), str(team)])
+    assert index.overridden == 1 + 1
+    assert index.variants == {"nas-1": {"custom.req": str(team / "devices" / "nas-1" / "custom.req.json")}}
+
+    def route(req, device_id=None):
+        return route_request({"req": req, "reqid": "1"}, get_device(device_id))
+
+    assert route("user.isAdmin")["admin"] == "base"
+    assert route("custom.req")["from"] == "team"
+    assert route("custom.req", "nas-1")["from"] == "team-nas-1"
+    assert route("custom.req", "nas-2")["from"] == "team"
+    # 内置响应不依赖当前工作目录
+    assert route("appcgi.resmon.cpu")["result"] == "succ"
+    assert get_response_file_path("no.such.req").startswith(str(team))
+
+    with pytest.raises(NotADirectoryError):
+        configure_responses([str(tmp_path / "missing")])
+
+
+async def test_reload_picks_up_new_files(tmp_path):
+    """Test that /debug/fixtures/reload re-resolves the layers and drops caches."""
+    _write(tmp_path / "custom.req.json", {"result": "succ", "version": 1})
+    configure_responses([str(tmp_path)])
+    assert route_request({"req": "custom.req", "reqid": "1"})["version"] == 1
+    assert route_request({"req": "later.req", "reqid": "1"})["result"] != "succ"
+
+    _write(tmp_path / "custom.req.json", {"result": "succ", "version": 2})
+    _write(tmp_path / "later.req.json", {"result": "succ"})
+    status, _ = await handle_admin_request("/debug/fixtures/reload", {})
+    assert status == HTTPStatus.METHOD_NOT_ALLOWED
+    status, body = await handle_admin_request("/debug/fixtures/reload", {}, "POST")
+    assert status == HTTPStatus.OK
+    assert body["layers"][-1] == str(tmp_path) and body["preloaded"] == body["files"]
+    assert route_request({"req": "custom.req", "reqid": "1"})["version"] == 2
+    assert route_request({"req": "later.req", "reqid": "1"})["result"] == "succ"
@@ -0,0 +1,79 @@
+"""Tests for the HTTP REST mirror."""
+
+import json
+from http import HTTPStatus
+
+import pytest
+
+from server import handlers, overrides, responses
+from server.overrides import OverrideSnapshot, put_override
+from server.rest import etag_matches, handle_api_request
+
+
+@pytest.fixture(autouse=True)
+def empty_overrides(monkeypatch):
+    """Start every test without overrides."""
+    monkeypatch.setattr(overrides, "_snapshot", OverrideSnapshot())
+
+
+def test_static_fixture_etag_and_not_modified():
+    """Test that fixtures are served pre-encoded with a strong ETag and 304."""
+    status, body, headers = handle_api_request("appcgi.resmon.cpu", {})
+    assert status == HTTPStatus.OK
+    with open("responses/appcgi.resmon.cpu.json", encoding="utf-8") as f:
+        assert json.loads(body) == json.load(f)
+    etag = headers["ETag"]
+    assert etag.startswith('"') and not etag.startswith('W/')
+    # 与加载时预先序列化的字节是同一个对象
+    encoded = responses.get_encoded_response(responses.get_response_file_path("appcgi.resmon.cpu"))
+    assert body is encoded.body
+
+    status, body, _ = handle_api_request("appcgi.resmon.cpu", {}, if_none_match=etag)
+    assert status == HTTPStatus.NOT_MODIFIED and body == b""
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert not etag_matches('"other"', etag)
+    # POST 不做条件请求
+    status, _, _ = handle_api_request("appcgi.resmon.cpu", {}, "POST", b"", etag)
+    assert status == HTTPStatus.OK
+
+
+def test_fields_reqid_and_overrides_use_websocket_dispatch():
+    """Test that request fields, reqid and overrides behave like the WebSocket."""
+    status, body, _ = handle_api_request("user.isAdmin", {"reqid": "abc"})
+    assert status == HTTPStatus.OK
+    assert json.loads(body) == {"admin": True, "result": "succ", "reqid": "abc"}
+
+    status, body, _ = handle_api_request("appcgi.sysinfo.getHostName", {}, "POST", b'{"reqid":"r1"}')
+    assert json.loads(body)["reqid"] == "r1"
+
+    put_override("user.isAdmin", {"result": "succ", "admin": False})
+    _, body, headers = handle_api_request("user.isAdmin", {})
+    assert json.loads(body) == {"result": "succ", "admin": False, "reqid": "http"}
+    first = headers["ETag"]
+    put_override("user.isAdmin", {"result": "succ", "admin": "changed"})
+    _, _, headers = handle_api_request("user.isAdmin", {})
+    assert headers["ETag"] != first
+
+
+def test_errors():
+    """Test unknown request types and malformed requests."""
+    assert handle_api_request("no.such.request", {})[0] == HTTPStatus.NOT_FOUND
+    assert handle_api_request("../pyproject", {})[0] == HTTPStatus.NOT_FOUND
+    assert handle_api_request("ping", {}, "POST", b"{")[0] == HTTPStatus.BAD_REQUEST
+    assert handle_api_request("ping", {}, "POST", b"[1]")[0] == HTTPStatus.BAD_REQUEST
+    assert handle_api_request("ping", {}, "PUT")[0] == HTTPStatus.METHOD_NOT_ALLOWED
+
+
+def test_fixture_processing_error_returns_failure(monkeypatch):
+    """Test that an unexpected error while building a fixture response still yields a reply."""
+    def broken(response, reqid):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(handlers, "replace_reqid", broken)
+    status, body, _ = handle_api_request("user.isAdmin", {"reqid": "r1"})
+    assert status == HTTPStatus.OK
+    assert json.loads(body) == {
+        "result": "fail", "errmsg": "Error processing request: boom", "reqid": "r1",
+    }
+    response = json.loads(handlers.handle_message('{"req":"user.isAdmin","reqid":"r2"}', 1))
+    assert response["reqid"] == "r2" and response["result"] == "fail"
@@ -0,0 +1,96 @@
+"""Tests for strict request signature verification."""
+
+import base64
+import hashlib
+import hmac
+import json
+
+import pytest
+from fnos import FnosClient
+
+from server import signatures
+from server.pytest_plugin import InMemoryConnection
+from server.signatures import SignatureError, SignatureVerifier
+
+
+def sign(secret: bytes, body: str) -> str:
+    """Sign a frame the way pyfnos does."""
+    digest = hmac.new(secret, body.encode("utf-8"), hashlib.sha256).digest()
+    return base64.b64encode(digest).decode("utf-8") + body
+
+
+def test_verify_frames():
+    """Test signed, tampered, unsigned and token-adopted frames."""
+    verifier = SignatureVerifier()
+    secret = b"k" * 32
+    verifier.establish(1, secret, ("token-a",))
+    body = '{"req":"user.info","reqid":"r1"}'
+
+    assert verifier.verify(sign(secret, body), 1) == body
+    assert verifier.verify('{"req": "ping"}', 1) == '{"req": "ping"}'
+    with pytest.raises(SignatureError, match="Invalid"):
+        verifier.verify(sign(b"x" * 32, body), 1)
+    with pytest.raises(SignatureError, match="Invalid"):
+        verifier.verify(sign(secret, body)[:-2] + "}}", 1)
+    with pytest.raises(SignatureError, match="Missing"):
+        verifier.verify(body, 1)
+    # 只有顶层 req 决定帧是否可以不带签名
+    nested = '{"params":{"req":"ping"},"req":"user.info","reqid":"1"}'
+    with pytest.raises(SignatureError, match="Missing"):
+        verifier.verify(nested, 1)
+    with pytest.raises(SignatureError, match="Missing"):
+        verifier.verify('{"req": "ping"', 1)
+    with pytest.raises(SignatureError, match="Missing"):
+        verifier.verify('{"req": ["ping"], "reqid": "1"}', 1)
+
+    # 新连接以 token 登录时沿用该 token 的会话密钥
+    with pytest.raises(SignatureError, match="No session"):
+        verifier.verify(sign(secret, body), 2)
+    auth = '{"req":"user.authToken","reqid":"r2","token":"token-a"}'
+    assert verifier.verify(sign(secret, auth), 2) == auth
+    assert verifier.verify(sign(secret, body), 2) == body
+    verifier.discard(2)
+    with pytest.raises(SignatureError):
+        verifier.verify(sign(secret, body), 2)
+
+
+@pytest.mark.asyncio
+async def test_strict_login_and_token_login(monkeypatch, fnos_in_memory: str):
+    """Test that a pyfnos client passes strict verification, also after a token login."""
+    monkeypatch.setattr(signatures, "_verifier", SignatureVerifier())
+    client = FnosClient()
+    await client.connect(fnos_in_memory)
+    try:
+        login = await client.login("testuser", "testpass")
+        response = await client.request_payload_with_response("user.info", {})
+        assert response.get("result") == "succ"
+        secret = client.get_decrypted_secret()
+    finally:
+        await client.close()
+
+    client = FnosClient()
+    await client.connect(fnos_in_memory)
+    try:
+        result = await client.login_via_token(login["token"], login["longToken"], secret)
+        assert result.get("result") == "succ"
+        response = await client.request_payload_with_response("user.info", {})
+        assert response.get("result") == "succ"
+    finally:
+        await client.close()
+
+
+@pytest.mark.asyncio
+async def test_rejected_signature(monkeypatch):
+    """Test that a frame with a wrong signature gets a failure reply."""
+    monkeypatch.setattr(signatures, "_verifier", SignatureVerifier())
+    connection = InMemoryConnection()
+    try:
+        body = json.dumps({"req": "user.info", "reqid": "r1"})
+        await connection.send("A" * 43 + "=" + body)
+        reply = json.loads(await connection.recv())
+        await connection.send('{"req":"ping"}')
+        pong = json.loads(await connection.recv())
+    finally:
+        await connection.close()
+    assert reply == {"result": "fail", "errmsg": "No session secret for signed request", "reqid": "r1"}
+    assert pong == {"res": "pong"}
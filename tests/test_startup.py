@@ -0,0 +1,48 @@
+"""Tests for lazy imports and the startup report."""
+
+import subprocess
+import sys
+
+from server import responses
+from server.responses import preload_responses
+from server.startup import StartupReport
+
+
+def test_heavy_modules_load_lazily():
+    """Test that importing the server does not import FastAPI, crypto or numpy."""
+    code = (
+        "import sys, server.main, server.raw_transport, server.pytest_plugin\n"
+        "print(sorted(m for m in ('fastapi', 'uvicorn', 'Crypto', 'numpy') if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == "[]"
+
+
+def test_parallel_preload(monkeypatch):
+    """Test that threaded preloading loads the same files as sequential preloading."""
+    monkeypatch.setattr(responses, "_response_cache", {})
+    count = preload_responses(workers=4)
+    parallel = set(responses._response_cache)
+
+    monkeypatch.setattr(responses, "_response_cache", {})
+    assert preload_responses() == count
+    assert set(responses._response_cache) == parallel
+    assert count == len(parallel) > 0
+
+
+def test_report_prints_once_all_milestones_are_reached(capsys):
+    """Test that the report is printed once, after listening and preloading."""
+    report = StartupReport()
+    report.enabled = True
+    with report.phase("configure"):
+        pass
+    report.complete("listening")
+    assert capsys.readouterr().out == ""
+
+    report.complete("preloaded")
+    report.complete("listening")
+    out = capsys.readouterr().out
+    assert out.count("Startup report") == 1
+    assert "configure" in out and "preloaded" in out and "listening" in out
@@ -0,0 +1,133 @@
+"""Tests for the synthetic storage topology."""
+
+import json
+
+import pytest
+
+from server import overrides, storage
+from server.handlers import handle_message
+from server.overrides import OverrideSnapshot, put_override
+from server.storage import (
+    StorageScenario,
+    StorageTopology,
+    build_storage_response,
+    configure_storage,
+    disk_name,
+    parse_scenario_spec,
+    parse_topology_spec,
+)
+
+
+def test_parse_topology_spec():
+    """Test the compact topology spec."""
+    assert parse_topology_spec("4 pools, 60 disks, 3 failing") == {
+        "pools": 4, "disks": 60, "failing": 3, "level": None,
+    }
+    assert parse_topology_spec("pools=2,disks=8,raid6")["level"] == "raid6"
+    assert disk_name(0) == "sda"
+    assert disk_name(26) == "sdaa"
+
+
+def test_views_are_consistent():
+    """Test that every stor.* view refers to the same disks and pools."""
+    topology = StorageTopology.from_spec("4 pools, 60 disks, 3 failing")
+    names = {d["name"] for d in topology.list_disk()["disk"]}
+    assert len(names) == 60
+
+    members = {
+        disk["name"]
+        for array in topology.list_stor()["array"]
+        for md in array["md"]
+        for disk in md["disk"]
+    }
+    assert members == names
+
+    health = topology.disk_health()["diskHealth"]
+    assert {h["disk"] for h in health} == names
+    failing = {h["disk"] for h in health if not h["smartStatus"]["passed"]}
+    assert len(failing) == 3
+
+    uuids = {array["uuid"] for array in topology.list_stor()["array"]}
+    assert uuids == {state["uuid"] for state in topology.state2()["state"]}
+    assert topology.calc_space()["storTotal"] == 4
+
+
+def test_disk_smart_is_lazy():
+    """Test per-disk SMART lookup and caching."""
+    topology = StorageTopology.from_spec("2 pools, 100 disks, 1 failing")
+    assert topology._smart == {}
+
+    failing = next(d for d in topology.disks if d.failing)
+    response = build_storage_response(
+        topology, "stor.diskSmart", {"disk": f"/dev/{failing.name}"}, "r1"
+    )
+    assert response["smart"]["smart_status"]["passed"] is False
+    assert response["smart"] is topology.smart(failing)
+    assert list(topology._smart) == [failing.name]
+
+    missing = build_storage_response(topology, "stor.diskSmart", {"disk": "sdzz"}, "r2")
+    assert missing["result"] == "fail"
+
+
+def test_scenario_progress():
+    """Test that a pool moves through degraded and rebuilding on schedule."""
+    assert parse_scenario_spec("healthy:100, degraded:60,rebuilding:600") == [
+        ("healthy", 100.0), ("degraded", 60.0), ("rebuilding", 600.0),
+    ]
+    with pytest.raises(ValueError):
+        parse_scenario_spec("resyncing:10")
+    with pytest.raises(ValueError):
+        configure_storage(None, "healthy:10")
+
+    topology = StorageTopology.from_spec("2 pools, 5 disks")
+    scenario = topology.scenario = StorageScenario(parse_scenario_spec(
+        "healthy:100,degraded:60,rebuilding:600"
+    ))
+    # 让 1 号存储池在 now=0 时位于循环起点
+    scenario.started = scenario._offset(None, 1)[0]
+
+    def md(now):
+        return topology.state(now=now)["state"][0]["md"][0]
+
+    assert md(10)["syncAction"] == "idle"
+    degraded = md(105)
+    assert [d["arrState"] for d in degraded["disk"]].count("faulty") == 1
+    assert topology.state(now=106) is topology.state(now=107)
+
+    rebuilding = md(460)
+    sectors = topology.pools[0].disks[0].size // 512
+    assert (rebuilding["arrayState"], rebuilding["syncAction"]) == ("active", "recover")
+    assert rebuilding["syncCompleted"] == f"{sectors // 2} / {sectors}"
+    assert [d["arrState"] for d in rebuilding["disk"]].count("spare") == 1
+    states = [
+        d["storage"][0]["arrState"] for d in topology.list_disk(now=460)["disk"]
+        if d["storage"][0]["storId"] == 1
+    ]
+    assert states.count("spare") == 1
+    assert md(800)["syncCompleted"] == "none"
+
+
+def test_scenario_per_device():
+    """Test that devices have their own schedule and basic pools stay healthy."""
+    topology = StorageTopology.from_spec("20 pools, 60 disks")
+    topology.scenario = StorageScenario(
+        parse_scenario_spec("degraded:10,scrubbing:10"), started=0.0
+    )
+    default = build_storage_response(topology, "stor.state", {}, "r1")
+    device = build_storage_response(topology, "stor.state", {}, "r2", "nas-2")
+    actions = [[p["md"][0]["syncAction"] for p in r["state"]] for r in (default, device)]
+    assert actions[0] != actions[1]
+
+    single = StorageTopology.from_spec("1 pools, 1 disks")
+    single.scenario = StorageScenario(parse_scenario_spec("degraded:10"), started=0.0)
+    assert single.state(now=5)["state"][0]["md"][0]["disk"][0]["arrState"] == "in_sync"
+
+
+def test_non_string_req_is_rejected(monkeypatch):
+    """Test that a non-string req gets a failure reply instead of an exception."""
+    monkeypatch.setattr(storage, "_topology", StorageTopology.from_spec("1 pools, 2 disks"))
+    monkeypatch.setattr(overrides, "_snapshot", OverrideSnapshot())
+    put_override("stor.listDisk", {"result": "succ"})
+    for req in ("1", '["stor.listDisk"]', '{"a": 1}'):
+        reply = json.loads(handle_message(f'{{"req": {req}, "reqid": "x"}}', 1))
+        assert (reply["result"], reply["reqid"]) == ("fail", "x")
@@ -0,0 +1,64 @@
+"""Tests for the hot restart master process."""
+
+import asyncio
+import json
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import websockets
+
+from server.supervisor import worker_arguments
+
+
+def test_worker_arguments_drop_master_options():
+    """Test that master-only options are not passed to the workers."""
+    assert worker_arguments([
+        "--hot-restart", "-p", "8080", "--args-file", "extra.args",
+        "--args-file=other.args", "--transport", "raw",
+    ]) == ["-p", "8080", "--transport", "raw"]
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def test_sighup_replaces_worker_and_drains_connections():
+    """Test that SIGHUP serves new connections while old ones drain until the deadline."""
+    port = _free_port()
+    url = f"ws://127.0.0.1:{port}/websocket"
+    master = subprocess.Popen([
+        sys.executable, "-m", "server.main", "--hot-restart", "--transport", "raw",
+        "--host", "127.0.0.1", "-p", str(port), "--drain-timeout", "1", "--log-level", "WARNING",
+    ])
+    try:
+        for _ in range(200):
+            try:
+                old = await websockets.connect(url)
+                break
+            except OSError:
+                await asyncio.sleep(0.05)
+
+        master.send_signal(signal.SIGHUP)
+        # 切换期间新连接与旧连接都可用
+        deadline = time.monotonic() + 1.5
+        while time.monotonic() < deadline:
+            async with websockets.connect(url) as client:
+                await client.send(json.dumps({"req": "ping"}))
+                assert json.loads(await client.recv()) == {"res": "pong"}
+            await asyncio.sleep(0.05)
+
+        # 超过排空时间后旧连接以 1012 关闭
+        try:
+            await asyncio.wait_for(old.recv(), 5)
+        except websockets.ConnectionClosed as e:
+            assert e.rcvd.code == 1012
+        else:
+            raise AssertionError("old connection was not closed")
+    finally:
+        master.send_signal(signal.SIGTERM)
+        assert master.wait(15) == 0
@@ -0,0 +1,60 @@
+"""Tests for per-phase slow-request tracing."""
+
+import json
+
+from server import tracing
+from server.admin import handle_admin_request
+from server.handlers import handle_message
+from server.pytest_plugin import InMemoryConnection
+from server.responses import _response_cache, get_response_file_path
+
+
+def test_phases_are_captured(monkeypatch):
+    """Test that slow requests are captured with their phase breakdown."""
+    monkeypatch.setattr(tracing, "_tracer", tracing.SlowRequestTracer(threshold_ms=0))
+    _response_cache.pop(get_response_file_path("user.isAdmin"), None)
+
+    tracer = tracing.get_tracer()
+    trace = tracer.begin(1)
+    message = json.dumps({"req": "user.isAdmin", "reqid": "r1"})
+    response = json.loads(handle_message(message, 1, trace=trace))
+    tracer.finish(trace)
+    assert response["reqid"] == "r1"
+
+    captured = tracer.slow_requests()
+    assert captured[0]["req"] == "user.isAdmin"
+    assert set(captured[0]["phases"]) == {"parse", "route", "load", "encode"}
+    assert tracing.current_trace() is None
+
+    events = tracer.chrome_trace(window=60)["traceEvents"]
+    assert [e["name"] for e in events][:2] == ["user.isAdmin", "parse"]
+    assert all(e["ph"] == "X" for e in events)
+
+
+async def test_admin_endpoints(monkeypatch):
+    """Test the slow-request admin routes."""
+    monkeypatch.setattr(tracing, "_tracer", None)
+    status, _ = await handle_admin_request("/debug/slow-requests", {})
+    assert status == 404
+    assert await handle_admin_request("/debug/unknown", {}) is None
+
+    monkeypatch.setattr(tracing, "_tracer", tracing.SlowRequestTracer(threshold_ms=1000))
+    status, body = await handle_admin_request("/debug/slow-requests", {"limit": "5"})
+    assert status == 200
+    assert body["requests"] == []
+    status, _ = await handle_admin_request("/debug/trace", {"window": "abc"})
+    assert status == 400
+
+
+async def test_send_phase_through_writer(monkeypatch):
+    """Test that the send phase is recorded once the writer task wrote the frame."""
+    monkeypatch.setattr(tracing, "_tracer", tracing.SlowRequestTracer(threshold_ms=0))
+    connection = InMemoryConnection()
+    try:
+        await connection.send(json.dumps({"req": "user.isAdmin", "reqid": "r1"}))
+        await connection.recv()
+    finally:
+        await connection.close()
+    captured = tracing.get_tracer().slow_requests()
+    assert captured[0]["reqid"] == "r1"
+    assert "send" in captured[0]["phases"]
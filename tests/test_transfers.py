@@ -0,0 +1,111 @@
+"""Tests for the synthetic file download/upload endpoints."""
+
+import http.client
+import json
+
+import pytest
+
+from server.transfers import TransferServer, parse_range, parse_size
+
+
+@pytest.fixture
+def transfer_server():
+    """Start a transfer server on a free port."""
+    server = TransferServer("127.0.0.1", 0, parse_size("10M"), parse_size("1M"))
+    server.start()
+    yield server
+    server.stop()
+
+
+def test_parse_size_and_range():
+    """Test byte sizes and Range headers."""
+    assert parse_size("4096") == 4096
+    assert parse_size("512K") == 512 * 1024
+    assert parse_size("1.5g") == 3 * 1024 ** 3 // 2
+    with pytest.raises(ValueError):
+        parse_size("-1")
+
+    assert parse_range(None, 100) is None
+    assert parse_range("bytes=10-19", 100) == (10, 19)
+    assert parse_range("bytes=90-", 100) == (90, 99)
+    assert parse_range("bytes=-10", 100) == (90, 99)
+    assert parse_range("bytes=50-500", 100) == (50, 99)
+    assert parse_range("bytes=0-1,5-6", 100) is None
+    with pytest.raises(ValueError):
+        parse_range("bytes=100-", 100)
+
+
+def test_download_ranges(transfer_server: TransferServer):
+    """Test full, ranged and unsatisfiable downloads over one keep-alive connection."""
+    conn = http.client.HTTPConnection("127.0.0.1", transfer_server.port, timeout=10)
+    try:
+        conn.request("GET", "/files/vol1/big.bin?size=9M")
+        response = conn.getresponse()
+        body = response.read()
+        assert response.status == 200
+        assert response.getheader("Accept-Ranges") == "bytes"
+        assert body == transfer_server.content(0, 9 * 1024 * 1024)
+
+        # 跨越模式边界的区间
+        start = 4 * 1024 * 1024 - 10
+        conn.request("GET", "/files/vol1/big.bin?size=9M",
+                     headers={"Range": f"bytes={start}-{start + 19}"})
+        response = conn.getresponse()
+        assert response.status == 206
+        assert response.getheader("Content-Range") == f"bytes {start}-{start + 19}/9437184"
+        assert response.read() == transfer_server.content(start, 20)
+
+        conn.request("GET", "/files/vol1/big.bin", headers={"Range": "bytes=20000000-"})
+        response = conn.getresponse()
+        response.read()
+        assert response.status == 416
+        assert response.getheader("Content-Range") == f"bytes */{10 * 1024 * 1024}"
+
+        conn.request("HEAD", "/files/vol1/big.bin")
+        response = conn.getresponse()
+        response.read()
+        assert response.getheader("Content-Length") == str(10 * 1024 * 1024)
+    finally:
+        conn.close()
+    assert transfer_server.zero_copy is True
+    assert transfer_server.stats.summary()["download"]["completed"] == 2
+
+
+def test_upload_sink_and_store(transfer_server: TransferServer):
+    """Test uploads into the bounded store, chunked uploads and the discard sink."""
+    conn = http.client.HTTPConnection("127.0.0.1", transfer_server.port, timeout=10)
+    try:
+        data = bytes(range(256)) * 1024
+        conn.request("PUT", "/files/vol1/small.bin", body=data)
+        reply = json.loads(conn.getresponse().read())
+        assert (reply["bytes"], reply["stored"]) == (len(data), True)
+
+        conn.request("GET", "/files/vol1/small.bin", headers={"Range": "bytes=-256"})
+        assert conn.getresponse().read() == bytes(range(256))
+
+        chunks = (b"x" * 300_000 for _ in range(10))
+        conn.request("POST", "/files/vol1/large.bin", body=chunks, encode_chunked=True)
+        reply = json.loads(conn.getresponse().read())
+        assert (reply["bytes"], reply["stored"]) == (3_000_000, False)
+    finally:
+        conn.close()
+    summary = transfer_server.stats.summary()["upload"]
+    assert (summary["completed"], summary["bytes"]) == (2, len(data) + 3_000_000)
+    assert transfer_server.store.get("vol1/large.bin") is None
+
+
+def test_port_shared_only_by_hot_restart_workers(transfer_server: TransferServer):
+    """Test that a second server cannot silently share the port unless both opt in."""
+    other = TransferServer("127.0.0.1", transfer_server.port, parse_size("1M"))
+    with pytest.raises(OSError):
+        other.start()
+
+    first = TransferServer("127.0.0.1", 0, parse_size("1M"), reuse_port=True)
+    first.start()
+    second = TransferServer("127.0.0.1", first.port, parse_size("1M"), reuse_port=True)
+    try:
+        second.start()
+        assert second.port == first.port
+    finally:
+        second.stop()
+        first.stop()
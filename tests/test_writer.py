@@ -0,0 +1,97 @@
+"""Tests for the per-connection writer."""
+
+import asyncio
+import json
+
+import pytest
+from websockets.asyncio.client import connect
+
+from server import raw_transport
+from server.raw_transport import create_raw_server
+from server.writer import ConnectionWriter, WriteQueueOverflow
+
+
+class SlowSink:
+    """Batch sender that blocks until released."""
+
+    def __init__(self):
+        self.batches = []
+        self.release = asyncio.Event()
+
+    async def send_many(self, frames):
+        await self.release.wait()
+        self.batches.append(frames)
+
+
+async def test_coalescing_and_overflow_policies():
+    """Test batching and the drop-oldest/disconnect/block policies."""
+    sink = SlowSink()
+    writer = ConnectionWriter(sink.send_many, max_queue=3, policy="drop-oldest")
+    writer.start()
+    for i in range(6):
+        await writer.send(str(i))
+        await asyncio.sleep(0)
+    # 第一帧已被写任务取出，其余帧排队，队列满时丢弃最早的帧
+    assert writer.depth == 3
+    assert writer.dropped == 2
+    sink.release.set()
+    await asyncio.sleep(0.01)
+    assert sink.batches == [["0"], ["3", "4", "5"]]
+    assert writer.writes == 2
+    await writer.close()
+
+    sink = SlowSink()
+    writer = ConnectionWriter(sink.send_many, max_queue=1, policy="disconnect")
+    writer.start()
+    await writer.send("a")
+    await asyncio.sleep(0)
+    await writer.send("b")
+    with pytest.raises(WriteQueueOverflow):
+        await writer.send("c")
+    await writer.close()
+
+    sink = SlowSink()
+    writer = ConnectionWriter(sink.send_many, max_queue=1, policy="block")
+    writer.start()
+    await writer.send("a")
+    await asyncio.sleep(0)
+    await writer.send("b")
+    blocked = asyncio.create_task(writer.send("c"))
+    await asyncio.sleep(0.01)
+    assert not blocked.done()
+    sink.release.set()
+    await asyncio.wait_for(blocked, 1)
+    await writer.close()
+
+
+@pytest.mark.parametrize("batch_send", [True, False])
+async def test_raw_transport_pipelined_requests(monkeypatch, batch_send):
+    """Test that pipelined responses arrive complete and in order over the raw transport."""
+    # 已安装的 websockets 必须提供合并写入所需的内部接口，否则说明升级破坏了它
+    assert raw_transport.BATCH_SEND
+    monkeypatch.setattr(raw_transport, "BATCH_SEND", batch_send)
+    async with create_raw_server(host="127.0.0.1", port=0) as server:
+        port = server.sockets[0].getsockname()[1]
+        async with connect(f"ws://127.0.0.1:{port}/websocket") as websocket:
+            for i in range(200):
+                await websocket.send(json.dumps({"req": "user.isAdmin", "reqid": str(i)}))
+            reqids = [json.loads(await websocket.recv())["reqid"] for _ in range(200)]
+    assert reqids == [str(i) for i in range(200)]
+
+
+async def test_send_phase_ends_when_written():
+    """Test that when_written callbacks run after the frame is written, dropped frames included."""
+    sink = SlowSink()
+    writer = ConnectionWriter(sink.send_many, max_queue=1, policy="drop-oldest")
+    writer.start()
+    written = []
+    for frame in ("a", "b", "c"):
+        await writer.send(frame)
+        writer.when_written(lambda frame=frame: written.append((frame, len(sink.batches))))
+        await asyncio.sleep(0)
+    assert written == []
+    sink.release.set()
+    await asyncio.sleep(0.01)
+    # "b" 已被丢弃，其回调随 "a" 的写入一起调用
+    assert written == [("a", 1), ("b", 1), ("c", 2)]
+    await writer.close()